@@ -1,4 +1,6 @@
 import os
+import sys
+import time
 # --- FIX SALVAVITA PER MAC (BUS ERROR) ---
 os.environ["TOKENIZERS_PARALLELISM"] = "false"
 
@@ -6,69 +8,244 @@ import streamlit as st
 import pandas as pd
 import plotly.express as px
 import plotly.figure_factory as ff
-from sklearn.metrics import confusion_matrix, accuracy_score, classification_report
 
 # --- CONFIGURAZIONE E PERCORSI ---
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-DATA_RESULTS_DIR = os.path.join(BASE_DIR, 'data', 'results')
 
-# File da caricare
-ANALYSIS_RESULTS_FILE = os.path.join(DATA_RESULTS_DIR, 'sentiment_analysis_results.csv')      # Percentuali
-FULL_RESULTS_FILE = os.path.join(DATA_RESULTS_DIR, 'sentiment_analysis_results_full.csv')     # Dati completi per i conteggi
-VALIDATION_PREDICTIONS_FILE = os.path.join(DATA_RESULTS_DIR, 'validation_predictions.csv')    # Validazione
+# La dashboard legge solo l'artefatto degli aggregati prodotto da sentiment_processor
+# (mai i dati riga per riga): il caricamento non dipende dalla dimensione del corpus.
+sys.path.insert(0, os.path.join(BASE_DIR, 'code'))
+import aggregates
+import rollups
+import instrumentation
+import evaluation
+import videos
+import job_queue
+import search_index
+
+SEASONS = list(videos.load_groups())  # Gruppi del manifest dei video (videos.json), nell'ordine del file
+AUTO_REFRESH_SECONDS = (30, 60, 300, 900)  # Intervalli proposti per l'aggiornamento automatico (modalità watch)
 
 
 # --- CARICAMENTO DATI ---
 
+def load_aggregates():
+    """Artefatto corrente (file JSON di pochi KB, riletto a ogni interazione)."""
+    return aggregates.load()
+
+
 @st.cache_data
-def load_full_counts():
-    """Carica il dataset completo SOLO per calcolare i numeri assoluti (Counts)."""
-    if not os.path.exists(FULL_RESULTS_FILE):
-        return pd.DataFrame()
-    
-    try:
-        # Leggiamo solo le colonne necessarie per risparmiare memoria
-        df = pd.read_csv(FULL_RESULTS_FILE, usecols=['season', 'Predicted_Sentiment'])
-        # Filtriamo solo Pos/Neg
-        df = df[df['Predicted_Sentiment'].isin(['POSITIVE', 'NEGATIVE'])]
-        return df
-    except:
-        return pd.DataFrame()
+def build_season_frames(version, _artifact):
+    """Tabelle per i grafici, ricalcolate solo quando cambia la versione dell'artefatto."""
+    df = aggregates.seasons_frame(_artifact)
+    df = df[df['Predicted_Sentiment'].isin(aggregates.LABELS)]
+
+    df_counts = df[['season', 'Predicted_Sentiment', 'Conteggio']]
+    df_perc = df.rename(columns={'season': 'Stagione', 'Predicted_Sentiment': 'Sentiment'})
+    df_perc['Stagione'] = pd.Categorical(df_perc['Stagione'], categories=SEASONS, ordered=True)
+    return df_counts, df_perc[['Stagione', 'Sentiment', 'Percentuale']]
+
 
 @st.cache_data
-def load_analysis_percentages():
-    """Carica i dati aggregati (Percentuali) per i grafici."""
-    if not os.path.exists(ANALYSIS_RESULTS_FILE):
-        return pd.DataFrame()
-    
-    df = pd.read_csv(ANALYSIS_RESULTS_FILE)
-    df.rename(columns={'Percentage': 'Percentuale', 'season': 'Stagione', 'Predicted_Sentiment': 'Sentiment'}, inplace=True)
-    df['Stagione'] = pd.Categorical(df['Stagione'], categories=['S1', 'S2', 'S3', 'S4', 'S5'], ordered=True)
-    df = df[df['Sentiment'].isin(['POSITIVE', 'NEGATIVE'])]
-    return df
+def build_evaluation_frame(version, _artifact):
+    """Metriche per soglia e backend in formato lungo (ricalcolate solo a nuova versione)."""
+    return evaluation.evaluation_frame(_artifact.get('evaluation'))
+
 
 @st.cache_data
-def load_validation_predictions():
-    """Carica le previsioni di validazione per la matrice di confusione."""
-    if not os.path.exists(VALIDATION_PREDICTIONS_FILE):
-        return pd.DataFrame()
-    try:
-        df = pd.read_csv(VALIDATION_PREDICTIONS_FILE)
-        return df
-    except:
-        return pd.DataFrame()
+def load_rollup(granularity, version):
+    """Rollup giornaliero/orario per stagione (riletto solo quando cambia la versione dei rollup)."""
+    return rollups.read(granularity)
 
 
+@st.cache_data
+def load_run_manifest(path, mtime):
+    """Manifest di un run della pipeline (riletto solo se il file cambia)."""
+    return instrumentation.load_manifest(path)
+
 # --- FUNZIONI GRAFICHE ---
 
-def plot_confusion_matrix(y_true, y_pred, labels):
-    cm = confusion_matrix(y_true, y_pred, labels=labels)
+def plot_confusion_matrix(cm, labels, predicted_labels=None):
     cm_text = [[str(y) for y in x] for x in cm]
-    fig = ff.create_annotated_heatmap(z=cm, x=labels, y=labels, annotation_text=cm_text, colorscale='Blues')
+    fig = ff.create_annotated_heatmap(z=cm, x=predicted_labels or labels, y=labels, annotation_text=cm_text, colorscale='Blues')
     fig.update_layout(title='Matrice di Confusione', xaxis_title='Predizioni', yaxis_title='Reale')
     return fig
 
 
+def render_queue():
+    """Stato di ogni video nella coda dei job (acquisizione e analisi), letta in sola lettura."""
+    snapshot = job_queue.read_jobs()
+    if snapshot is None:
+        return
+    jobs, counts = snapshot
+    st.markdown("**Coda dei video**")
+    st.caption(" · ".join(f"{state}: {n}" for state, n in counts.items()))
+    df_jobs = pd.DataFrame(jobs)
+    if not df_jobs.empty:
+        df_jobs['updated_at'] = pd.to_datetime(df_jobs['updated_at'], unit='s').dt.strftime('%Y-%m-%d %H:%M:%S')
+        st.dataframe(
+            df_jobs.rename(columns={'key': 'Video', 'video_id': 'ID', 'grp': 'Gruppo', 'state': 'Stato',
+                                    'attempts': 'Tentativi', 'worker': 'Worker', 'error': 'Errore',
+                                    'rows': 'Righe', 'updated_at': 'Aggiornato'}),
+            hide_index=True, use_container_width=True
+        )
+
+
+def render_operations():
+    """Tab Operazioni: coda dei video, tempi per stadio, throughput, memoria e filtri dei run della pipeline."""
+    render_queue()
+    runs = instrumentation.list_runs()
+    if not runs:
+        st.info("Nessun run registrato. I comandi della pipeline salvano il manifest in data/results/runs/.")
+        return
+
+    path = st.selectbox("Run", options=runs, format_func=lambda p: os.path.basename(p)[:-len('.json')])
+    manifest = load_run_manifest(path, os.path.getmtime(path))
+    counters = manifest.get('counters', {})
+
+    col_cmd, col_time, col_mem, col_pages = st.columns(4)
+    col_cmd.metric("Comando", manifest['command'])
+    col_time.metric("Durata", f"{manifest['seconds']:.1f} s")
+    col_mem.metric("Picco RSS", f"{manifest['peak_rss_mb']:.0f} MB")
+    col_pages.metric("Pagine API", counters.get('pagine_api', 0))
+    st.caption(f"Avviato il {manifest['started_at']} · argomenti: {' '.join(manifest.get('argv', [])) or '-'}")
+
+    # --- Stadi ---
+    df_stages = pd.DataFrame.from_dict(manifest['stages'], orient='index').rename_axis('Stadio').reset_index()
+    if not df_stages.empty:
+        df_stages = df_stages.sort_values('seconds', ascending=False)
+        fig_stages = px.bar(
+            df_stages, x='seconds', y='Stadio', orientation='h', text_auto='.2f',
+            labels={'seconds': 'Secondi'}, title="Tempo per Stadio"
+        )
+        fig_stages.update_yaxes(autorange='reversed')
+        st.plotly_chart(fig_stages, use_container_width=True)
+        st.dataframe(
+            df_stages.rename(columns={'seconds': 'Secondi', 'calls': 'Chiamate', 'items': 'Item',
+                                      'items_per_sec': 'Item/s', 'peak_rss_mb': 'Picco RSS (MB)'}),
+            hide_index=True, use_container_width=True
+        )
+
+    # --- Filtri dell'acquisizione (righe scartate per filtro) ---
+    if manifest.get('filters'):
+        df_filters = pd.DataFrame([
+            {'Video': video, 'Filtro': name, 'Valutati': s['evaluated'], 'Passati': s['passed'], 'Scartati': s['rejected']}
+            for video, filters in manifest['filters'].items() for name, s in filters.items()
+        ])
+        fig_filters = px.bar(df_filters, x='Filtro', y='Scartati', color='Video', barmode='group',
+                             title="Commenti Scartati per Filtro")
+        st.plotly_chart(fig_filters, use_container_width=True)
+
+    col_counters, col_sections = st.columns(2)
+    with col_counters:
+        st.markdown("**Contatori**")
+        st.json(counters)
+    with col_sections:
+        for section in ('api', 'language_id', 'cache'):
+            if manifest.get(section):
+                st.markdown(f"**{section}**")
+                st.json(manifest[section])
+    if manifest.get('profile') and manifest['profile'].get('path'):
+        st.caption(f"Profilo cProfile di '{manifest['profile']['stage']}': {manifest['profile']['path']}")
+
+
+def render_search():
+    """Tab Commenti: ricerca full-text con filtri e paginazione, servita dall'indice SQLite FTS5."""
+    if not search_index.exists():
+        st.info("Indice di ricerca non trovato: lo crea l'analisi (o 'python cli.py aggregate').")
+        return
+    first, last = search_index.time_range()
+    if first is None:
+        st.info("Indice di ricerca vuoto.")
+        return
+    sort_labels = {'relevance': 'Rilevanza', 'newest': 'Più recenti', 'oldest': 'Meno recenti', 'score': 'Score'}
+
+    query = st.text_input("Parole cercate", placeholder="es. hype vecna* (tutte le parole; * = prefisso)")
+    col_seasons, col_labels, col_dates, col_sort = st.columns([2, 2, 2, 1])
+    with col_seasons:
+        seasons = st.multiselect("Stagioni", options=SEASONS, default=SEASONS)
+    with col_labels:
+        labels = st.multiselect("Sentiment", options=list(aggregates.LABELS), default=list(aggregates.LABELS))
+    with col_dates:
+        dates = st.date_input("Periodo", value=(first.date(), last.date()),
+                              min_value=first.date(), max_value=last.date())
+    with col_sort:
+        sort = st.selectbox("Ordine", options=list(sort_labels), format_func=sort_labels.get)
+    # Durante la selezione del periodo date_input restituisce solo la data di inizio
+    start, end = (dates[0], dates[-1]) if isinstance(dates, (list, tuple)) and dates else (None, None)
+    page = st.number_input("Pagina", min_value=1, value=1, step=1)
+
+    try:
+        df_page, total, elapsed_ms = search_index.search(
+            query, seasons=seasons, labels=labels, start=start, end=end, sort=sort,
+            limit=search_index.PAGE_SIZE, offset=(page - 1) * search_index.PAGE_SIZE)
+    except search_index.SearchQueryError as e:
+        st.warning(f"⚠️ {e}")
+        return
+
+    pages = max(1, -(-min(total, search_index.COUNT_LIMIT) // search_index.PAGE_SIZE))
+    found = f"oltre {search_index.COUNT_LIMIT}" if total > search_index.COUNT_LIMIT else str(total)
+    st.caption(f"{found} commenti · pagina {min(page, pages)} di {pages} · {elapsed_ms:.0f} ms")
+    if page > pages:
+        st.info(f"La ricerca ha {pages} pagine.")
+        return
+    if not df_page.empty:
+        st.dataframe(
+            df_page.rename(columns={'season': 'Stagione', 'time': 'Data', 'label': 'Sentiment', 'score': 'Score',
+                                    'text': 'Commento', 'key': 'Video'}),
+            hide_index=True, use_container_width=True
+        )
+
+
+def wait_and_refresh(interval):
+    """Conto alla rovescia e nuova esecuzione dello script (un'interazione lo interrompe subito)."""
+    placeholder = st.empty()
+    for remaining in range(interval, 0, -1):
+        placeholder.caption(f"🔄 Aggiornamento automatico tra {remaining}s")
+        time.sleep(1)
+    st.rerun()
+
+
+def render_threshold_evaluation(result, df_eval):
+    """Metriche per soglia di confidenza e backend, con intervalli bootstrap."""
+    st.subheader("🎚️ Soglia di Confidenza e Backend")
+    st.markdown(f"Sotto la soglia il modello si astiene (**{result['abstain_label']}**). "
+                f"Intervalli al {result['confidence'] * 100:.0f}% con {result['bootstrap_samples']} "
+                f"campioni bootstrap su {result['n']} commenti.")
+
+    models = list(result['models'])
+    col_models, col_metric = st.columns(2)
+    with col_models:
+        selected = st.multiselect("Backend", options=models, default=models)
+    with col_metric:
+        metric = st.selectbox("Metrica", options=list(dict.fromkeys(df_eval['metric'])))
+    df_plot = df_eval[(df_eval['metric'] == metric) & df_eval['model'].isin(selected)]
+
+    if not df_plot.empty:
+        fig_thr = px.line(
+            df_plot, x='threshold', y='value', color='model', markers=True,
+            error_y=df_plot['high'] - df_plot['value'], error_y_minus=df_plot['value'] - df_plot['low'],
+            labels={'threshold': 'Soglia di confidenza', 'value': metric, 'model': 'Backend'},
+            title=f"{metric} al variare della soglia"
+        )
+        st.plotly_chart(fig_thr, use_container_width=True)
+
+    threshold = st.select_slider("Soglia", options=result['thresholds'])
+    col_table, col_cm = st.columns([1, 1])
+    with col_table:
+        df_at = df_eval[(df_eval['threshold'] == threshold) & df_eval['model'].isin(selected)]
+        df_at = df_at.assign(intervallo=df_at.apply(lambda r: f"{r['low']:.2f} – {r['high']:.2f}", axis=1))
+        st.dataframe(df_at.pivot(index='metric', columns='model', values='value').style.format("{:.3f}"),
+                     use_container_width=True)
+        with st.expander("Intervalli di confidenza"):
+            st.dataframe(df_at.pivot(index='metric', columns='model', values='intervallo'), use_container_width=True)
+    with col_cm:
+        model = st.selectbox("Matrice di confusione del backend", options=selected or models)
+        cm = result['models'][model]['confusion_matrices'][result['thresholds'].index(threshold)]
+        st.plotly_chart(plot_confusion_matrix(cm, result['labels'], result['labels'] + [result['abstain_label']]),
+                        use_container_width=True)
+
+
 # --- DASHBOARD MAIN ---
 
 def main():
@@ -78,13 +255,29 @@ def main():
     colors = {'POSITIVE': '#D62728', 'NEGATIVE': '#1F77B4'} # Rosso vs Blu
 
     # --- DATI ---
-    df_full = load_full_counts()       # Per i numeri totali
-    df_perc = load_analysis_percentages() # Per i grafici %
-    df_val = load_validation_predictions() # Per la validazione
+    artifact = load_aggregates()
+    if artifact is not None:
+        df_counts, df_perc = build_season_frames(artifact['version'], artifact)  # Conteggi e grafici %
+        season_stats = artifact['seasons']   # Per i numeri totali
+        validation = artifact['validation']  # Per la validazione
+        duplicates = artifact.get('duplicates') or {}  # Quasi-duplicati per stagione
+    else:
+        df_counts, df_perc = pd.DataFrame(), pd.DataFrame()
+        season_stats, validation, duplicates = {}, None, {}
 
     # --- HEADER E DESCRIZIONE ---
     st.title("🔥 Stranger Things: Sentiment Analysis (S1-S5)")
     st.markdown("### 📊 Dashboard di Monitoraggio Hype")
+    if artifact is not None:
+        st.caption(f"Aggregati versione {artifact['version']} · generati il {artifact['generated_at']}")
+    # Con 'cli.py watch' attivo gli aggregati cambiano a ogni ciclo: i grafici dipendono dalla
+    # versione, quindi un aggiornamento senza novità non ricalcola nulla
+    col_refresh, col_interval = st.columns([1, 3])
+    with col_refresh:
+        auto_refresh = st.checkbox("Aggiornamento automatico", value=False)
+    with col_interval:
+        refresh_interval = st.select_slider("Ogni (secondi)", options=AUTO_REFRESH_SECONDS, value=60,
+                                            disabled=not auto_refresh)
     
     with st.expander("ℹ️  Dettagli del Progetto e Metodologia (Clicca per espandere)", expanded=True):
         st.markdown("""
@@ -99,126 +292,173 @@ def main():
 
     st.markdown("---")
 
-    # =================================================================
-    # SEZIONE 0: PANORAMICA NUMERICA (KPI)
-    # =================================================================
-    if not df_full.empty:
-        st.subheader("📈 Panoramica Dati Estratti")
+    tab_analysis, tab_search, tab_operations = st.tabs(["📊 Analisi", "🔎 Commenti", "⚙️ Operazioni"])
+
+    with tab_search:
+        render_search()
+
+    with tab_operations:
+        render_operations()
+
+    with tab_analysis:
+        # =================================================================
+        # SEZIONE 0: PANORAMICA NUMERICA (KPI)
+        # =================================================================
+        if season_stats:
+            st.subheader("📈 Panoramica Dati Estratti")
         
-        # Creiamo 5 colonne per le 5 stagioni
-        cols = st.columns(5)
-        seasons = ['S1', 'S2', 'S3', 'S4', 'S5']
+            # Una colonna per ogni stagione (gruppo) del manifest
+            cols = st.columns(len(SEASONS))
         
-        for i, season in enumerate(seasons):
-            # Filtriamo i dati per stagione
-            subset = df_full[df_full['season'] == season]
-            count_tot = len(subset)
-            count_pos = len(subset[subset['Predicted_Sentiment'] == 'POSITIVE'])
-            count_neg = len(subset[subset['Predicted_Sentiment'] == 'NEGATIVE'])
+            for i, season in enumerate(SEASONS):
+                # Conteggi già aggregati per stagione
+                counts = season_stats.get(season, {}).get('counts', {})
+                count_pos = counts.get('POSITIVE', 0)
+                count_neg = counts.get('NEGATIVE', 0)
+                count_tot = count_pos + count_neg
             
-            # Visualizziamo la metrica
-            with cols[i]:
-                st.metric(
-                    label=f"Stagione {season}",
-                    value=f"{count_tot} Comm.",
-                    delta=f"Pos: {count_pos} | Neg: {count_neg}",
-                    delta_color="off" # Grigio neutro
-                )
-    else:
-        st.error("Dati completi non trovati. Esegui 'python code/sentiment_processord.py'.")
+                # Visualizziamo la metrica
+                with cols[i]:
+                    st.metric(
+                        label=f"Stagione {season}",
+                        value=f"{count_tot} Comm.",
+                        delta=f"Pos: {count_pos} | Neg: {count_neg}",
+                        delta_color="off" # Grigio neutro
+                    )
+                    if season in duplicates:
+                        dup = duplicates[season]
+                        st.caption(f"Quasi-duplicati: {dup['duplicate_rate']:.1%} · "
+                                   f"cluster max {dup['largest_cluster']}")
+        else:
+            st.error("Aggregati non trovati. Esegui 'python code/sentiment_processor.py'.")
 
-    st.markdown("---")
+        st.markdown("---")
 
-    # =================================================================
-    # SEZIONE 1: ANALISI GLOBALE (ISTOGRAMMA COMPLETO)
-    # =================================================================
-    st.header("1. Evoluzione Temporale (Tutte le Stagioni)")
+        # =================================================================
+        # SEZIONE 1: ANALISI GLOBALE (ISTOGRAMMA COMPLETO)
+        # =================================================================
+        st.header("1. Evoluzione Temporale (Tutte le Stagioni)")
     
-    if not df_full.empty:
-        # Creiamo un grafico che conta i commenti (o usa le percentuali se preferisci)
-        # Qui usiamo i CONTEGGI ASSOLUTI per far vedere la mole di commenti
-        counts_by_season = df_full.groupby(['season', 'Predicted_Sentiment']).size().reset_index(name='Conteggio')
+        if not df_counts.empty:
+            # Creiamo un grafico che conta i commenti (o usa le percentuali se preferisci)
+            # Qui usiamo i CONTEGGI ASSOLUTI per far vedere la mole di commenti
+            fig_global = px.bar(
+                df_counts,
+                x='season',
+                y='Conteggio',
+                color='Predicted_Sentiment',
+                barmode='group',
+                color_discrete_map=colors,
+                title="Volume di Commenti Positivi vs Negativi per Stagione",
+                text_auto=True
+            )
+            st.plotly_chart(fig_global, use_container_width=True)
+    
+        st.markdown("---")
+
+
+        # =================================================================
+        # SEZIONE 2: CURVA DELL'HYPE VERSO L'USCITA
+        # =================================================================
+        st.header("2. Curva dell'Hype verso l'Uscita")
+    
+        rollup_version = rollups.load_state()['version']
+        if rollup_version:
+            col_gran, col_seas = st.columns([1, 3])
+            with col_gran:
+                granularity = st.radio("Granularità", options=['daily', 'hourly'],
+                                       format_func=lambda g: 'Giornaliera' if g == 'daily' else 'Oraria')
+            df_curve = load_rollup(granularity, rollup_version)
+            with col_seas:
+                curve_seasons = st.multiselect("Stagioni", options=sorted(df_curve['season'].unique()),
+                                               default=sorted(df_curve['season'].unique()))
         
-        fig_global = px.bar(
-            counts_by_season,
-            x='season',
-            y='Conteggio',
-            color='Predicted_Sentiment',
-            barmode='group',
-            color_discrete_map=colors,
-            title="Volume di Commenti Positivi vs Negativi per Stagione",
-            text_auto=True
-        )
-        st.plotly_chart(fig_global, use_container_width=True)
+            df_curve = df_curve[df_curve['season'].isin(curve_seasons)]
+            window = f"{rollups.ROLLING_DAYS} giorni" if granularity == 'daily' else f"{rollups.ROLLING_HOURS} ore"
+            fig_curve = px.line(
+                df_curve, x='days_before_release', y='rolling_positive_ratio', color='season',
+                hover_data=['total'],
+                labels={'days_before_release': "Giorni all'uscita", 'rolling_positive_ratio': 'Quota positivi',
+                        'season': 'Stagione', 'total': 'Commenti'},
+                title=f"Quota di Commenti Positivi (finestra mobile di {window})"
+            )
+            fig_curve.update_xaxes(autorange='reversed')  # L'uscita (giorno 0) a destra
+            fig_curve.update_yaxes(tickformat='.0%')
+            st.plotly_chart(fig_curve, use_container_width=True)
+        else:
+            st.info("Rollup temporali non ancora calcolati. Esegui 'python code/sentiment_processor.py'.")
     
-    st.markdown("---")
+        st.markdown("---")
 
 
-    # =================================================================
-    # SEZIONE 2: CONFRONTO DIRETTO A vs B
-    # =================================================================
-    st.header("2. Confronto Diretto (Focus Percentuale)")
+        # =================================================================
+        # SEZIONE 3: CONFRONTO DIRETTO A vs B
+        # =================================================================
+        st.header("3. Confronto Diretto (Focus Percentuale)")
     
-    # Sidebar Filtri (spostata qui logicamente)
-    if not df_perc.empty:
-        available_seasons = sorted(df_perc['Stagione'].dropna().unique())
-        col_sel1, col_sel2 = st.columns(2)
-        with col_sel1:
-            season_a = st.selectbox("Seleziona Stagione A", options=available_seasons, index=0)
-        with col_sel2:
-            season_b = st.selectbox("Seleziona Stagione B", options=available_seasons, index=1 if len(available_seasons)>1 else 0)
+        # Sidebar Filtri (spostata qui logicamente)
+        if not df_perc.empty:
+            available_seasons = sorted(df_perc['Stagione'].dropna().unique())
+            col_sel1, col_sel2 = st.columns(2)
+            with col_sel1:
+                season_a = st.selectbox("Seleziona Stagione A", options=available_seasons, index=0)
+            with col_sel2:
+                season_b = st.selectbox("Seleziona Stagione B", options=available_seasons, index=1 if len(available_seasons)>1 else 0)
         
-        df_compare = df_perc[df_perc['Stagione'].isin([season_a, season_b])]
+            df_compare = df_perc[df_perc['Stagione'].isin([season_a, season_b])]
         
-        col_bar, col_pie = st.columns([2, 1])
+            col_bar, col_pie = st.columns([2, 1])
         
-        with col_bar:
-            fig_stacked = px.bar(
-                df_compare, x='Stagione', y='Percentuale', color='Sentiment',
-                color_discrete_map=colors, text_auto='.1f', barmode='group',
-                title=f"Distribuzione Percentuale: {season_a} vs {season_b}"
-            )
-            st.plotly_chart(fig_stacked, use_container_width=True)
-
-        with col_pie:
-            # Filtriamo solo i positivi per vedere "Chi ha vinto l'Hype"
-            df_pos = df_compare[df_compare['Sentiment'] == 'POSITIVE']
-            if not df_pos.empty:
-                fig_pie = px.pie(
-                    df_pos, values='Percentuale', names='Stagione',
-                    title='Confronto Hype Relativo (Solo Positivi)',
-                    hole=0.4, color_discrete_sequence=['#FF4B4B', '#4B4BFF']
+            with col_bar:
+                fig_stacked = px.bar(
+                    df_compare, x='Stagione', y='Percentuale', color='Sentiment',
+                    color_discrete_map=colors, text_auto='.1f', barmode='group',
+                    title=f"Distribuzione Percentuale: {season_a} vs {season_b}"
                 )
-                st.plotly_chart(fig_pie, use_container_width=True)
+                st.plotly_chart(fig_stacked, use_container_width=True)
+
+            with col_pie:
+                # Filtriamo solo i positivi per vedere "Chi ha vinto l'Hype"
+                df_pos = df_compare[df_compare['Sentiment'] == 'POSITIVE']
+                if not df_pos.empty:
+                    fig_pie = px.pie(
+                        df_pos, values='Percentuale', names='Stagione',
+                        title='Confronto Hype Relativo (Solo Positivi)',
+                        hole=0.4, color_discrete_sequence=['#FF4B4B', '#4B4BFF']
+                    )
+                    st.plotly_chart(fig_pie, use_container_width=True)
     
-    st.markdown("---")
+        st.markdown("---")
     
-    # =================================================================
-    # SEZIONE 3: VALIDAZIONE
-    # =================================================================
-    st.header("3. Affidabilità del Modello (Validazione)")
-    st.markdown("Performance calcolata su Dataset Bilanciato (Ground Truth).")
+        # =================================================================
+        # SEZIONE 4: VALIDAZIONE
+        # =================================================================
+        st.header("4. Affidabilità del Modello (Validazione)")
+        st.markdown("Performance calcolata su Dataset Bilanciato (Ground Truth).")
     
-    if not df_val.empty:
-        y_true = df_val['Ground_Truth_Label']
-        y_pred = df_val['Predicted_Sentiment']
-        
-        accuracy = accuracy_score(y_true, y_pred)
-        report = classification_report(y_true, y_pred, output_dict=True, zero_division=0)
-        df_report = pd.DataFrame(report).transpose().drop(index=['accuracy', 'macro avg', 'weighted avg'], errors='ignore')
+        if validation:
+            df_report = pd.DataFrame(validation['per_label']).transpose()
+            df_report = df_report.rename(columns={'f1': 'f1-score'})[['precision', 'recall', 'f1-score', 'support']]
         
-        col_met, col_mat = st.columns([1, 2])
+            col_met, col_mat = st.columns([1, 2])
         
-        with col_met:
-            st.metric("Accuratezza Totale", f"{accuracy * 100:.2f}%")
-            st.dataframe(df_report.style.format("{:.2f}"), use_container_width=True)
+            with col_met:
+                st.metric("Accuratezza Totale", f"{validation['accuracy'] * 100:.2f}%")
+                st.dataframe(df_report.style.format("{:.2f}"), use_container_width=True)
             
-        with col_mat:
-            labels = sorted(list(set(y_true) | set(y_pred)))
-            fig_cm = plot_confusion_matrix(y_true, y_pred, labels)
-            st.plotly_chart(fig_cm, use_container_width=True)
-    else:
-        st.warning("⚠️ Dati di validazione non trovati.")
+            with col_mat:
+                fig_cm = plot_confusion_matrix(validation['confusion_matrix'], validation['labels'])
+                st.plotly_chart(fig_cm, use_container_width=True)
+        else:
+            st.warning("⚠️ Dati di validazione non trovati.")
+
+        # Soglie di astensione e backend, dagli score salvati (cli.py evaluate)
+        evaluation_result = artifact.get('evaluation') if artifact is not None else None
+        if evaluation_result and evaluation_result['models']:
+            render_threshold_evaluation(evaluation_result, build_evaluation_frame(artifact['version'], artifact))
+
+    if auto_refresh:
+        wait_and_refresh(refresh_interval)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,139 @@
+import os
+import json
+import hashlib
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+# --- ARTEFATTO DEGLI AGGREGATI PER LA DASHBOARD ---
+# sentiment_processor riassume i risultati in un piccolo file JSON:
+#   - per stagione: totale commenti, conteggi e percentuali per etichetta
+#   - validazione: accuratezza, matrice di confusione, precision/recall/f1 per etichetta
+#   - quasi-duplicati: per stagione commenti, cluster e quota di duplicati (near_dedup)
+# La dashboard legge solo questo file, quindi il caricamento non dipende dalla
+# dimensione del corpus. "version" è un hash del contenuto: cambia solo quando
+# cambiano i numeri ed è la chiave con cui l'app invalida la propria cache.
+
+SCHEMA_VERSION = 1
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+AGGREGATES_FILE = os.path.join(BASE_DIR, 'data', 'results', 'aggregates.json')
+LABELS = ('POSITIVE', 'NEGATIVE')
+
+
+def _season_entry(counts):
+    total = int(sum(counts.values()))
+    return {
+        'total': total,
+        'counts': {label: int(n) for label, n in counts.items() if n},
+        'percentages': {label: float(n / total * 100) for label, n in counts.items() if n},
+    }
+
+
+def season_summary(df_results):
+    """Totali, conteggi e percentuali per stagione da un DataFrame con season/Predicted_Sentiment."""
+    counts = (df_results[['season', 'Predicted_Sentiment']].astype(str)
+              .value_counts().unstack(fill_value=0).sort_index())
+    return {season: _season_entry(row.to_dict()) for season, row in counts.iterrows()}
+
+
+def merge_season_summary(summary, df_new):
+    """Riepilogo per stagione con in più le righe nuove (aggiornamento incrementale, senza rileggere i risultati)."""
+    counts = {season: dict(entry['counts']) for season, entry in (summary or {}).items()}
+    for season, entry in season_summary(df_new).items():
+        add_counts(counts, season, entry['counts'])
+    return summary_from_counts(counts)
+
+
+def add_counts(counts, season, label_counts):
+    """Somma label_counts ({etichetta: n}) ai contatori per stagione counts ({stagione: {etichetta: n}})."""
+    season_counts = counts.setdefault(season, {})
+    for label, n in label_counts.items():
+        season_counts[label] = season_counts.get(label, 0) + int(n)
+
+
+def summary_from_counts(counts):
+    """Riepilogo per stagione (come season_summary) da contatori {stagione: {etichetta: n}}."""
+    return {season: _season_entry(c) for season, c in sorted(counts.items()) if sum(c.values())}
+
+
+def validation_summary(y_true, y_pred):
+    """Accuratezza, matrice di confusione e metriche per etichetta (calcolate con NumPy)."""
+    y_true = np.asarray(y_true, dtype=str)
+    y_pred = np.asarray(y_pred, dtype=str)
+    labels = sorted(set(y_true) | set(y_pred))
+    index = {label: i for i, label in enumerate(labels)}
+
+    matrix = np.zeros((len(labels), len(labels)), dtype=np.int64)
+    np.add.at(matrix, ([index[t] for t in y_true], [index[p] for p in y_pred]), 1)
+
+    tp = np.diag(matrix)
+    support = matrix.sum(axis=1)
+    predicted = matrix.sum(axis=0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        precision = np.where(predicted > 0, tp / predicted, 0.0)
+        recall = np.where(support > 0, tp / support, 0.0)
+        f1 = np.where(precision + recall > 0, 2 * precision * recall / (precision + recall), 0.0)
+
+    return {
+        'n': int(len(y_true)),
+        'accuracy': float(tp.sum() / len(y_true)) if len(y_true) else 0.0,
+        'labels': labels,
+        'confusion_matrix': matrix.tolist(),
+        'per_label': {
+            label: {'precision': float(precision[i]), 'recall': float(recall[i]),
+                    'f1': float(f1[i]), 'support': int(support[i])}
+            for i, label in enumerate(labels)
+        },
+    }
+
+
+def load(path=None):
+    """Artefatto corrente (None se assente o di uno schema diverso); path: default AGGREGATES_FILE."""
+    path = path or AGGREGATES_FILE
+    try:
+        with open(path, encoding='utf-8') as f:
+            artifact = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return artifact if artifact.get('schema') == SCHEMA_VERSION else None
+
+
+def _content_version(artifact):
+    payload = json.dumps({k: v for k, v in artifact.items() if k not in ('version', 'generated_at')}, sort_keys=True)
+    return f"{SCHEMA_VERSION}-{hashlib.sha256(payload.encode('utf-8')).hexdigest()[:12]}"
+
+
+def update(path=None, **sections):
+    """Aggiorna le sezioni indicate (seasons=..., validation=..., duplicates=..., meta=...) e salva in modo atomico."""
+    path = path or AGGREGATES_FILE
+    artifact = load(path) or {'schema': SCHEMA_VERSION, 'seasons': {}, 'validation': None, 'meta': {}}
+    for name, value in sections.items():
+        if name == 'meta':
+            artifact['meta'] = {**artifact.get('meta', {}), **value}
+        else:
+            artifact[name] = value
+
+    version = _content_version(artifact)
+    if version == artifact.get('version'):
+        return artifact  # Nessun cambiamento: la cache della dashboard resta valida
+    artifact['version'] = version
+    artifact['generated_at'] = datetime.now(timezone.utc).isoformat(timespec='seconds')
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(artifact, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+    return artifact
+
+
+def seasons_frame(artifact):
+    """Tabella lunga season / Predicted_Sentiment / Conteggio / Percentuale per i grafici."""
+    rows = [
+        {'season': season, 'Predicted_Sentiment': label, 'Conteggio': n,
+         'Percentuale': data['percentages'].get(label, 0.0)}
+        for season, data in sorted((artifact or {}).get('seasons', {}).items())
+        for label, n in data['counts'].items()
+    ]
+    return pd.DataFrame(rows, columns=['season', 'Predicted_Sentiment', 'Conteggio', 'Percentuale'])
@@ -0,0 +1,99 @@
+import os
+import gzip
+import json
+import hashlib
+import threading
+
+# --- REGISTRAZIONE E RIPRODUZIONE DELLE PAGINE DELL'API ---
+# Le risposte grezze dell'API (una pagina di commentThreads o di comments) vengono salvate
+# compresse su disco, una per file:
+#
+#   data/api_pages/<risorsa>/<video o thread>/<token>-<parametri>.json.gz
+#
+# dove <token> è il pageToken (o 'first' per la prima pagina) e <parametri> un'impronta
+# degli altri parametri della richiesta (part, fields, order, ...): pagine chieste in
+# modalità diverse non si mescolano.
+#
+#   off    : nessuna registrazione (default)
+#   record : usa le pagine già su disco, scarica e salva le altre
+#   replay : solo disco, nessuna richiesta (una pagina mancante è un errore): rifare i filtri
+#            o l'acquisizione costa solo la lettura dei file e i test girano offline
+#
+# Le pagine riprodotte non passano dal rate limiter e non consumano quota.
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PAGES_DIR = os.path.join(BASE_DIR, 'data', 'api_pages')
+MODES = ('off', 'record', 'replay')
+COMPRESSION_LEVEL = 6
+
+# Parametri che identificano la sequenza di pagine (la cartella) e la singola pagina (il file)
+_OWNER_PARAMS = ('videoId', 'parentId')
+_PAGE_PARAM = 'pageToken'
+
+
+class MissingPageError(LookupError):
+    """In modalità replay la pagina richiesta non è stata registrata."""
+
+
+def _safe(name):
+    return ''.join(c if c.isalnum() or c in '-_' else '_' for c in str(name))
+
+
+class PageRecorder:
+    """Pagine dell'API su disco (thread-safe: ogni pagina è un file scritto in modo atomico)."""
+
+    def __init__(self, mode='off', pages_dir=PAGES_DIR):
+        if mode not in MODES:
+            raise ValueError(f"Modalità di registrazione '{mode}' non valida (usa: {', '.join(MODES)})")
+        self.mode = mode
+        self.pages_dir = pages_dir
+        self.stats = {'replayed': 0, 'recorded': 0, 'bytes_on_disk': 0}
+        self._lock = threading.Lock()
+
+    def path(self, resource, params):
+        owner = next((params[p] for p in _OWNER_PARAMS if params.get(p)), 'all')
+        rest = {k: v for k, v in params.items() if k not in _OWNER_PARAMS and k != _PAGE_PARAM}
+        digest = hashlib.sha1(json.dumps(rest, sort_keys=True).encode('utf-8')).hexdigest()[:10]
+        token = params.get(_PAGE_PARAM) or 'first'
+        return os.path.join(self.pages_dir, resource, _safe(owner), f"{_safe(token)}-{digest}.json.gz")
+
+    def load(self, resource, params):
+        path = self.path(resource, params)
+        try:
+            with gzip.open(path, 'rt', encoding='utf-8') as f:
+                page = json.load(f)
+        except FileNotFoundError:
+            return None
+        with self._lock:
+            self.stats['replayed'] += 1
+        return page
+
+    def save(self, resource, params, page):
+        path = self.path(resource, params)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with gzip.open(tmp_path, 'wt', encoding='utf-8', compresslevel=COMPRESSION_LEVEL) as f:
+            json.dump(page, f, separators=(',', ':'))
+        os.replace(tmp_path, path)
+        with self._lock:
+            self.stats['recorded'] += 1
+            self.stats['bytes_on_disk'] += os.path.getsize(path)
+
+    def fetch(self, resource, params, request):
+        """Pagina dal disco se disponibile, altrimenti request() (e salvataggio in modalità record)."""
+        if self.mode == 'off':
+            return request()
+        page = self.load(resource, params)
+        if page is not None:
+            return page
+        if self.mode == 'replay':
+            raise MissingPageError(f"Pagina non registrata: {self.path(resource, params)}")
+        page = request()
+        self.save(resource, params, page)
+        return page
+
+    def report(self):
+        if self.mode == 'off':
+            return
+        print(f"   Pagine API ({self.mode}): {self.stats['replayed']} dal disco, {self.stats['recorded']} registrate "
+              f"({self.stats['bytes_on_disk'] / 1024:.0f} KB compressi)")
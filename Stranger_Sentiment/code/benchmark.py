@@ -0,0 +1,319 @@
+import os
+import sys
+import io
+import json
+import time
+import shutil
+import argparse
+import platform
+import contextlib
+
+import numpy as np
+import pandas as pd
+
+import storage
+import aggregates
+import rollups
+import synthetic_corpus
+import near_dedup
+from instrumentation import PeakRSS
+
+# --- BENCHMARK DELLA PIPELINE ---
+# Misura gli stadi critici su un corpus sintetico deterministico (10k/100k/1M righe),
+# senza rete e con un modello minuscolo creato in locale al posto di DistilBERT:
+#
+#   pre_release_filter : is_comment_pre_release su ogni commento
+#   language_id        : rilevamento lingua a batch (langdetect)
+#   near_dedup         : cluster di quasi-duplicati per stagione (MinHash + LSH)
+#   predict_sentiment  : predict_sentiment_batch (cache vuota: misura l'inferenza)
+#   storage_read       : lettura per video + concat dei testi, come in run_full_analysis
+#   create_sample      : create_validation_sample.create_sample
+#   dashboard_loaders  : caricamento di aggregati e rollup come in app.py
+#
+# Per ogni stadio: throughput (righe/s), latenza p50/p95 per chiamata e RSS di picco.
+# Il risultato va in un JSON che si può confrontare con un baseline (--baseline).
+#
+# Esempio (dalla cartella code/):
+#   python benchmark.py --sizes 10000 100000 --output bench.json
+#   python benchmark.py --sizes 10000 100000 --baseline bench.json
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BENCH_WORK_DIR = os.path.join(BASE_DIR, 'data', 'cache', 'benchmark')
+TINY_MODEL_DIR = os.path.join(BASE_DIR, 'data', 'cache', 'benchmark_model')
+DEFAULT_OUTPUT = os.path.join(BASE_DIR, 'data', 'results', 'benchmark.json')
+
+DEFAULT_SIZES = (10_000, 100_000, 1_000_000)
+STAGES = ('pre_release_filter', 'language_id', 'near_dedup', 'predict_sentiment', 'storage_read',
+          'create_sample', 'dashboard_loaders')
+BATCH_ROWS = 1000   # Righe per chiamata negli stadi che lavorano a blocchi
+MODEL_ROWS = 10_000  # Tetto di righe per gli stadi lenti (lingua, inferenza)
+REPEATS = 5         # Ripetizioni degli stadi che lavorano sull'intero dataset
+TOLERANCE = 0.2     # Regressione: throughput -20% o p95 +20% rispetto al baseline
+
+
+# --- MODELLO LOCALE ---
+
+def build_tiny_model(path=TINY_MODEL_DIR, seed=0):
+    """DistilBERT minuscolo (pesi casuali, tokenizer WordPiece addestrato sul corpus sintetico).
+
+    Ha la stessa architettura e interfaccia del modello vero, ma si crea in pochi secondi
+    senza scaricare nulla: i tempi misurano la pipeline, non la qualità delle predizioni.
+    """
+    if os.path.exists(os.path.join(path, 'config.json')):
+        return path
+
+    import torch
+    from tokenizers import Tokenizer, models, normalizers, pre_tokenizers, trainers
+    from tokenizers.processors import TemplateProcessing
+    from transformers import PreTrainedTokenizerFast, DistilBertConfig, DistilBertForSequenceClassification
+
+    print(f"[BENCH] Creazione del modello locale in {path}...")
+    specials = ["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]"]
+    tok = Tokenizer(models.WordPiece(unk_token="[UNK]"))
+    tok.normalizer = normalizers.BertNormalizer(lowercase=True)
+    tok.pre_tokenizer = pre_tokenizers.BertPreTokenizer()
+    corpus = synthetic_corpus.generate(5000, seed=seed)['text']
+    tok.train_from_iterator(corpus, trainers.WordPieceTrainer(vocab_size=1000, special_tokens=specials))
+    tok.post_processor = TemplateProcessing(
+        single="[CLS] $A [SEP]",
+        special_tokens=[("[CLS]", tok.token_to_id("[CLS]")), ("[SEP]", tok.token_to_id("[SEP]"))],
+    )
+    tokenizer = PreTrainedTokenizerFast(tokenizer_object=tok, unk_token="[UNK]", pad_token="[PAD]",
+                                        cls_token="[CLS]", sep_token="[SEP]", mask_token="[MASK]",
+                                        model_max_length=512)
+
+    torch.manual_seed(seed)
+    config = DistilBertConfig(vocab_size=tokenizer.vocab_size, dim=64, hidden_dim=128, n_layers=2, n_heads=2,
+                              max_position_embeddings=512, id2label={0: 'NEGATIVE', 1: 'POSITIVE'},
+                              label2id={'NEGATIVE': 0, 'POSITIVE': 1})
+    DistilBertForSequenceClassification(config).save_pretrained(path)
+    tokenizer.save_pretrained(path)
+    return path
+
+
+# --- AMBIENTE ISOLATO ---
+
+@contextlib.contextmanager
+def _use_work_dir(work_dir, model_path):
+    """Punta storage, cache, modello e output dei moduli della pipeline dentro work_dir.
+
+    All'uscita ripristina i valori precedenti e rimuove work_dir: un altro comando eseguito
+    dopo il benchmark nello stesso processo lavora di nuovo sui dati veri.
+    """
+    import sentiment_processor as sp
+    import create_validation_sample as cvs
+
+    datasets = dict(storage.DATASETS)
+    saved = [(module, name, getattr(module, name)) for module, name in (
+        (rollups, 'STATE_FILE'), (cvs, 'OUTPUT_FILE'), (cvs, 'LABELED_FILE'), (sp, 'MODEL_NAME'),
+        (sp, 'PREDICTION_CACHE_FILE'), (sp, 'sentiment_pipeline'), (sp, '_tokenizer'))]
+    if sp.prediction_cache is not None:
+        sp.prediction_cache.close()
+
+    shutil.rmtree(work_dir, ignore_errors=True)
+    for dataset in storage.DATASETS:
+        storage.DATASETS[dataset] = os.path.join(work_dir, dataset)
+    rollups.STATE_FILE = os.path.join(storage.DATASETS['rollups'], 'state.json')
+    cvs.OUTPUT_FILE = os.path.join(work_dir, 'sample.csv')
+    cvs.LABELED_FILE = os.path.join(work_dir, 'labeled.csv')
+
+    sp.MODEL_NAME = model_path
+    sp.PREDICTION_CACHE_FILE = os.path.join(work_dir, 'predictions.sqlite')
+    sp.prediction_cache = sp.sentiment_pipeline = sp._tokenizer = None
+    try:
+        yield
+    finally:
+        if sp.prediction_cache is not None:
+            sp.prediction_cache.close()
+        sp.prediction_cache = None  # Riaperta al prossimo uso, con il percorso ripristinato
+        storage.DATASETS.update(datasets)
+        for module, name, value in saved:
+            setattr(module, name, value)
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def _write_corpus(df):
+    """Scrive il corpus come dati processati (una chiave per stagione, parti da 50k righe)."""
+    for season, group in df.groupby('season'):
+        group = group[['text', 'time', 'season']]
+        for index, start in enumerate(range(0, len(group), 50_000)):
+            storage.write_part('processed', f"{season}_Hype", season, group.iloc[start:start + 50_000], index)
+
+
+# --- MISURE ---
+
+def _run_stage(stage, size, calls):
+    """Esegue le chiamate (righe, funzione) e restituisce le metriche dello stadio."""
+    latencies, rows = [], 0
+    with PeakRSS() as rss:
+        start = time.perf_counter()
+        for n_rows, fn in calls:
+            t0 = time.perf_counter()
+            fn()
+            latencies.append(time.perf_counter() - t0)
+            rows += n_rows
+        elapsed = time.perf_counter() - start
+
+    latencies = np.array(latencies) * 1000
+    result = {
+        'stage': stage,
+        'size': size,
+        'rows': rows,
+        'calls': len(latencies),
+        'seconds': elapsed,
+        'throughput_rows_per_s': rows / elapsed if elapsed else float('nan'),
+        'p50_ms': float(np.percentile(latencies, 50)),
+        'p95_ms': float(np.percentile(latencies, 95)),
+        'peak_rss_mb': rss.peak / 2 ** 20,
+    }
+    print(f"   {stage:<20} {rows:>9} righe  {result['throughput_rows_per_s']:>12,.0f} righe/s  "
+          f"p50 {result['p50_ms']:8.2f} ms  p95 {result['p95_ms']:8.2f} ms  RSS {result['peak_rss_mb']:7.0f} MB")
+    return result
+
+
+def _chunks(items, size=BATCH_ROWS):
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def _stage_calls(stage, df, seed, model_rows, release_dates):
+    """Le chiamate da misurare per lo stadio, più l'eventuale preparazione (non misurata)."""
+    import data_acquisition as da
+    import sentiment_processor as sp
+    import create_validation_sample as cvs
+    from language_id import LanguageIdentifier
+
+    size = len(df)
+    sample = df.sample(n=min(size, model_rows), random_state=seed)['text'].tolist()
+
+    if stage == 'pre_release_filter':
+        pairs = list(zip(df['time'], df['season'].map(release_dates)))
+        return [(len(c), lambda c=c: [da.is_comment_pre_release(t, r) for t, r in c]) for c in _chunks(pairs)]
+
+    if stage == 'language_id':
+        identifier = LanguageIdentifier(workers=1)
+        return [(len(c), lambda c=c: identifier.is_target_batch(c)) for c in _chunks(sample)]
+
+    if stage == 'near_dedup':
+        # Come in run_full_analysis: un raggruppamento per video (qui per stagione)
+        return [(len(g), lambda g=g: near_dedup.cluster(g['text'].tolist())) for _, g in df.groupby('season')]
+
+    if stage == 'predict_sentiment':
+        sp.get_pipeline()  # Il caricamento del modello non rientra nelle misure
+        return [(len(c), lambda c=c: sp.predict_sentiment_batch(pd.Series(c))) for c in _chunks(sample)]
+
+    if stage == 'storage_read':
+        prefixes = [f"{season}_Hype" for season in sorted(release_dates)]
+
+        def read_all():
+            frames = [storage.read('processed', key=prefix) for prefix in prefixes]
+            pd.concat([f['text'] for f in frames if not f.empty], ignore_index=True)
+        return [(size, read_all)] * REPEATS
+
+    if stage == 'create_sample':
+        def sample_once():
+            with contextlib.redirect_stdout(io.StringIO()):
+                cvs.create_sample(seed=seed)
+            os.remove(cvs.OUTPUT_FILE)
+        return [(size, sample_once)] * REPEATS
+
+    if stage == 'dashboard_loaders':
+        # Preparazione: aggregati e rollup con etichette casuali (la dashboard non fa inferenza)
+        rng = np.random.default_rng(seed)
+        labelled = df[['season', 'time']].assign(
+            Predicted_Sentiment=np.where(rng.random(size) < 0.6, 'POSITIVE', 'NEGATIVE'))
+        path = os.path.join(os.path.dirname(storage.DATASETS['rollups']), 'aggregates.json')
+        aggregates.update(path=path, seasons=aggregates.season_summary(labelled))
+        rollups.update([(f"{s}_Hype", s, g[['time', 'Predicted_Sentiment']]) for s, g in labelled.groupby('season')],
+                       {f"{s}_Hype": date for s, date in release_dates.items()})
+
+        def load_dashboard():
+            artifact = aggregates.load(path)
+            aggregates.seasons_frame(artifact)
+            rollups.read('daily')
+            rollups.read('hourly')
+        return [(size, load_dashboard)] * (REPEATS * 4)
+
+    raise ValueError(f"Stadio sconosciuto '{stage}'. Disponibili: {', '.join(STAGES)}")
+
+
+def run_benchmarks(sizes=DEFAULT_SIZES, stages=STAGES, seed=0, model_rows=MODEL_ROWS, work_dir=BENCH_WORK_DIR):
+    """Esegue gli stadi per ogni dimensione del corpus e restituisce il report."""
+    release_dates = synthetic_corpus.DEFAULT_RELEASE_DATES
+    model_path = build_tiny_model() if 'predict_sentiment' in stages else TINY_MODEL_DIR
+    results = []
+    for size in sizes:
+        print(f"\n--- BENCHMARK: {size:,} commenti sintetici (seed {seed}) ---")
+        with _use_work_dir(work_dir, model_path):
+            df = synthetic_corpus.generate(size, seed=seed, release_dates=release_dates)
+            _write_corpus(df)
+            for stage in stages:
+                results.append(_run_stage(stage, size, _stage_calls(stage, df, seed, model_rows, release_dates)))
+
+    return {
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'seed': seed,
+        'model_rows': model_rows,
+        'batch_rows': BATCH_ROWS,
+        'results': results,
+    }
+
+
+# --- CONFRONTO CON IL BASELINE ---
+
+def compare_with_baseline(report, baseline, tolerance=TOLERANCE):
+    """Stampa le variazioni rispetto al baseline e restituisce le regressioni trovate."""
+    reference = {(r['stage'], r['size']): r for r in baseline['results']}
+    regressions = []
+    print(f"\n--- CONFRONTO CON IL BASELINE ({baseline.get('created_at', '?')}) ---")
+    for r in report['results']:
+        base = reference.get((r['stage'], r['size']))
+        if base is None:
+            continue
+        speed = r['throughput_rows_per_s'] / base['throughput_rows_per_s'] - 1
+        p95 = r['p95_ms'] / base['p95_ms'] - 1 if base['p95_ms'] else 0.0
+        worse = speed < -tolerance or p95 > tolerance
+        if worse:
+            regressions.append({'stage': r['stage'], 'size': r['size'], 'throughput_change': speed, 'p95_change': p95})
+        print(f"   {'REGRESSIONE' if worse else 'ok':<11} {r['stage']:<20} {r['size']:>9}  "
+              f"throughput {speed:+7.1%}  p95 {p95:+7.1%}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark degli stadi della pipeline su un corpus sintetico.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(DEFAULT_SIZES), help="Righe del corpus")
+    parser.add_argument('--stages', nargs='+', choices=STAGES, default=list(STAGES), help="Stadi da misurare")
+    parser.add_argument('--seed', type=int, default=0, help="Seed del corpus sintetico")
+    parser.add_argument('--model-rows', type=int, default=MODEL_ROWS,
+                        help="Righe usate negli stadi lenti (lingua, inferenza)")
+    parser.add_argument('--output', default=DEFAULT_OUTPUT, help="File JSON dei risultati")
+    parser.add_argument('--baseline', help="JSON di un run precedente da confrontare")
+    parser.add_argument('--tolerance', type=float, default=TOLERANCE, help="Peggioramento tollerato (0.2 = 20%%)")
+    args = parser.parse_args(argv)
+
+    # Il baseline si legge prima: --output può essere lo stesso file
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+
+    report = run_benchmarks(args.sizes, args.stages, args.seed, args.model_rows)
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"\n[OK] Risultati salvati in: {args.output}")
+
+    if baseline is not None:
+        regressions = compare_with_baseline(report, baseline, args.tolerance)
+        if regressions:
+            print(f"[ERRORE] {len(regressions)} regressioni oltre il {args.tolerance:.0%}.")
+            return 1
+        print("[OK] Nessuna regressione.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,299 @@
+import time
+_T_START = time.perf_counter()
+
+import sys
+import argparse
+import importlib
+
+# --- CLI UNIFICATA DELLA PIPELINE ---
+# Esempi (dalla cartella code/):
+#   python cli.py acquire --groups S5 --replies --api-pages record
+#   python cli.py acquire --api-pages replay --refetch
+#   python cli.py analyze --workers 4 --timings
+#   python cli.py analyze --chunk-rows 50000
+#   python cli.py run --tags trailer
+#   python cli.py queue
+#   python cli.py watch --interval 600
+#   python cli.py validate
+#   python cli.py sample --seed 42
+#   python cli.py aggregate
+#   python cli.py compare-backends
+#   python cli.py evaluate --bootstrap 2000
+#   python cli.py bench --sizes 10000 100000 --baseline bench.json
+#   python cli.py --profile inferenza.modello analyze
+#
+# I moduli della pipeline vengono importati solo dal sottocomando che li usa, e
+# modello/librerie pesanti (torch, transformers, googleapiclient, langdetect)
+# solo quando servono davvero: i comandi senza inferenza partono in una frazione di secondo.
+
+_import_timings = {}
+
+# Duplicati di inference_backends.BACKENDS, data_acquisition.FETCH_MODES e api_recorder.MODES
+# per non importare i moduli solo per costruire il parser
+BACKEND_CHOICES = ('pytorch', 'quantized', 'onnx')
+FETCH_MODE_CHOICES = ('minimal', 'full')
+API_PAGES_CHOICES = ('off', 'record', 'replay')
+
+
+def _load(module_name):
+    """Importa un modulo della pipeline registrandone il tempo di import."""
+    start = time.perf_counter()
+    module = importlib.import_module(module_name)
+    _import_timings[module_name] = time.perf_counter() - start
+    return module
+
+
+def _batch_kwargs(args):
+    """Argomenti comuni ai comandi di inferenza (applica anche il backend scelto)."""
+    if getattr(args, 'backend', None):
+        sys.modules['sentiment_processor'].set_backend(args.backend)
+    kwargs = {}
+    if args.batch_size is not None:
+        kwargs['batch_size'] = args.batch_size
+    return kwargs
+
+
+# --- SOTTOCOMANDI ---
+
+def _acquire(args):
+    da = _load('data_acquisition')
+    if args.lang_workers is not None:
+        da.LANGUAGE_WORKERS = args.lang_workers
+    if args.fetch_mode:
+        da.FETCH_MODE = args.fetch_mode
+    if args.api_pages:
+        da.RECORDER = _load('api_recorder').PageRecorder(args.api_pages)
+    da.acquire_all(workers=args.workers if args.workers is not None else da.ACQUISITION_WORKERS,
+                   groups=args.groups, tags=args.tags, replies=args.replies or None, refetch=args.refetch)
+
+
+def _analyze(args, acquisition_running=None):
+    sp = _load('sentiment_processor')
+    kwargs = _batch_kwargs(args)
+    if getattr(args, 'inference_workers', None) is not None:
+        kwargs['workers'] = args.inference_workers
+    try:
+        sp.run_full_analysis(export_csv=args.export_csv, dedup=not args.no_dedup, rescore=args.rescore,
+                             groups=args.groups, tags=args.tags, acquisition_running=acquisition_running,
+                             chunk_rows=args.chunk_rows, **kwargs)
+    finally:
+        sp.shutdown_worker_pool()
+    sp.report_cache()
+
+
+def cmd_acquire(args):
+    _acquire(args)
+
+
+def cmd_analyze(args):
+    _analyze(args)
+
+
+def cmd_run(args):
+    """Acquisizione in un thread; l'analisi prende i video dalla coda man mano che sono scaricati."""
+    from concurrent.futures import ThreadPoolExecutor
+    _load('data_acquisition')
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        acquisition = pool.submit(_acquire, args)
+        try:
+            _analyze(args, acquisition_running=lambda: not acquisition.done())
+        finally:
+            acquisition.result()
+
+
+def cmd_queue(args):
+    videos = _load('videos')
+    job_queue = _load('job_queue')
+    queue = job_queue.open_queue(videos.load())
+    try:
+        if args.reset_stale:
+            print(f"[CODA] Job in corso rimessi in coda: {queue.reset_stale(max_age=0)}")
+        for job in queue.jobs():
+            rows = '' if job['rows'] is None else f" | righe: {job['rows']}"
+            error = f" | errore: {job['error']}" if job['error'] else ''
+            print(f"   {job['key']:<24} {job['grp']:<6} {job['state']:<9} tentativi: {job['attempts']}{rows}{error}")
+        queue.report()
+    finally:
+        queue.close()
+
+
+def cmd_watch(args):
+    watch = _load('watch')
+    sp = sys.modules['sentiment_processor']
+    kwargs = _batch_kwargs(args)
+    if args.inference_workers is not None:
+        kwargs['workers'] = args.inference_workers
+    watch.watch(interval=args.interval if args.interval is not None else watch.POLL_INTERVAL_SECONDS,
+                cycles=args.cycles, groups=args.groups, tags=args.tags, include_released=args.include_released,
+                dedup=not args.no_dedup, **kwargs)
+    sp.report_cache()
+
+
+def cmd_validate(args):
+    sp = _load('sentiment_processor')
+    sp.validate_and_save(export_csv=args.export_csv, **_batch_kwargs(args))
+    sp.report_cache()
+
+
+def cmd_sample(args):
+    cvs = _load('create_validation_sample')
+    cvs.create_sample(args.size if args.size is not None else cvs.SAMPLE_SIZE, args.seed,
+                      args.allocation, args.low_confidence)
+
+
+def cmd_evaluate(args):
+    sp = _load('sentiment_processor')
+    kwargs = {}
+    if args.thresholds:
+        kwargs['thresholds'] = tuple(args.thresholds)
+    if args.bootstrap is not None:
+        kwargs['n_boot'] = args.bootstrap
+    sp.run_evaluation(**kwargs)
+
+
+def cmd_aggregate(args):
+    _load('sentiment_processor').aggregate_results()
+
+
+def cmd_compare_backends(args):
+    sp = _load('sentiment_processor')
+    backends = args.backends or _load('inference_backends').BACKENDS
+    sp.compare_backends(backends=backends, **_batch_kwargs(args))
+
+
+def cmd_bench(args):
+    status = _load('benchmark').main(args.bench_args)
+    if status:
+        sys.exit(status)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='cli.py', description="Pipeline Stranger Sentiment: acquisizione, analisi e validazione.")
+    parser.add_argument('--timings', action='store_true', help="Mostra i tempi di avvio, import ed esecuzione")
+    parser.add_argument('--profile', metavar='STADIO',
+                        help="Registra con cProfile uno stadio del run (es. inferenza.modello, acquisizione.filtri)")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    def add_selection(p):
+        p.add_argument('--groups', nargs='+', help="Solo i video di questi gruppi del manifest (es. S1 S2)")
+        p.add_argument('--tags', nargs='+', help="Solo i video con almeno uno di questi tag")
+
+    def add_acquisition(p, workers_flag):
+        p.add_argument(workers_flag, dest='workers', type=int, help="Video scaricati in contemporanea")
+        p.add_argument('--lang-workers', type=int, help="Processi per il rilevamento lingua")
+        p.add_argument('--replies', action='store_true', help="Scarica anche le risposte ai commenti")
+        p.add_argument('--fetch-mode', choices=FETCH_MODE_CHOICES,
+                       help="minimal (default): solo i campi usati, una sessione HTTP gzip; full: snippet completo")
+        p.add_argument('--api-pages', choices=API_PAGES_CHOICES,
+                       help="Registra le pagine dell'API su disco (record) o riproducile senza rete (replay)")
+        p.add_argument('--refetch', action='store_true', help="Riacquisisce da capo anche i video già scaricati")
+
+    def add_analysis(p, workers_flag):
+        p.add_argument('--batch-size', type=int, help="Commenti per forward pass")
+        p.add_argument(workers_flag, dest='inference_workers', type=int, help="Processi di inferenza su CPU")
+        p.add_argument('--backend', choices=BACKEND_CHOICES, help="Backend di inferenza (default: pytorch)")
+        p.add_argument('--export-csv', action='store_true', help="Esporta anche i risultati nei vecchi file CSV")
+        p.add_argument('--no-dedup', action='store_true', help="Classifica tutti i commenti, anche i quasi-duplicati")
+        p.add_argument('--rescore', action='store_true', help="Rianalizza anche i video già analizzati")
+        p.add_argument('--chunk-rows', type=int,
+                       help="Modalità streaming: ogni video a blocchi di N righe (memoria costante al crescere del corpus)")
+
+    p = sub.add_parser('acquire', help="Scarica e filtra i commenti dei video del manifest (YouTube API)")
+    add_acquisition(p, '--workers')
+    add_selection(p)
+    p.set_defaults(func=cmd_acquire)
+
+    p = sub.add_parser('analyze', help="Analisi sentiment dei video acquisiti e non ancora analizzati")
+    add_analysis(p, '--workers')
+    add_selection(p)
+    p.set_defaults(func=cmd_analyze)
+
+    p = sub.add_parser('run', help="Acquisizione e analisi insieme: ogni video è analizzato appena scaricato")
+    add_acquisition(p, '--workers')
+    add_analysis(p, '--inference-workers')
+    add_selection(p)
+    p.set_defaults(func=cmd_run)
+
+    p = sub.add_parser('queue', help="Stato della coda dei job per video")
+    p.add_argument('--reset-stale', action='store_true',
+                   help="Rimette in coda i job rimasti 'in corso' (solo se nessun altro processo sta lavorando)")
+    p.set_defaults(func=cmd_queue)
+
+    p = sub.add_parser('watch', help="Aggiorna di continuo i video non ancora usciti con i soli commenti nuovi",
+                       epilog="Solo i thread nuovi: le risposte aggiunte dopo a thread già raccolti non vengono "
+                              "lette (serve una nuova acquisizione completa del video).")
+    p.add_argument('--interval', type=int, help="Secondi tra un ciclo e l'altro (default: 300)")
+    p.add_argument('--cycles', type=int, help="Numero di cicli (default: finché non si interrompe con Ctrl+C)")
+    p.add_argument('--include-released', action='store_true', help="Segue anche i video già usciti")
+    p.add_argument('--batch-size', type=int, help="Commenti per forward pass")
+    p.add_argument('--inference-workers', type=int, help="Processi di inferenza su CPU")
+    p.add_argument('--backend', choices=BACKEND_CHOICES, help="Backend di inferenza (default: pytorch)")
+    p.add_argument('--no-dedup', action='store_true', help="Classifica tutti i commenti, anche i quasi-duplicati")
+    add_selection(p)
+    p.set_defaults(func=cmd_watch)
+
+    p = sub.add_parser('validate', help="Validazione del modello sul set etichettato")
+    p.add_argument('--batch-size', type=int, help="Commenti per forward pass")
+    p.add_argument('--backend', choices=BACKEND_CHOICES, help="Backend di inferenza (default: pytorch)")
+    p.add_argument('--export-csv', action='store_true', help="Esporta anche le previsioni nel vecchio file CSV")
+    p.set_defaults(func=cmd_validate)
+
+    p = sub.add_parser('sample', help="Crea un nuovo campione di validazione da etichettare")
+    p.add_argument('--size', type=int, help="Commenti da estrarre (default: 300)")
+    p.add_argument('--seed', type=int, help="Seed per ripetere la stessa estrazione")
+    p.add_argument('--allocation', choices=('proportional', 'equal'), default='proportional',
+                   help="Quote per stagione: proporzionali ai commenti o uguali")
+    p.add_argument('--low-confidence', action='store_true',
+                   help="Sovracampiona le previsioni incerte (richiede gli score salvati dall'analisi)")
+    p.set_defaults(func=cmd_sample)
+
+    p = sub.add_parser('evaluate', help="Metriche per soglia di confidenza e backend dagli score salvati (senza inferenza)")
+    p.add_argument('--thresholds', nargs='+', type=float, help="Soglie di astensione (default: 0.50 ... 0.95)")
+    p.add_argument('--bootstrap', type=int, help="Campioni bootstrap per gli intervalli di confidenza (default: 1000)")
+    p.set_defaults(func=cmd_evaluate)
+
+    p = sub.add_parser('aggregate', help="Ricalcola le percentuali per stagione (senza inferenza)")
+    p.set_defaults(func=cmd_aggregate)
+
+    p = sub.add_parser('compare-backends', help="Accuratezza e velocità dei backend sul set etichettato")
+    p.add_argument('--backends', nargs='+', choices=BACKEND_CHOICES, help="Backend da confrontare (default: tutti)")
+    p.add_argument('--batch-size', type=int, help="Commenti per forward pass")
+    p.set_defaults(func=cmd_compare_backends)
+
+    p = sub.add_parser('bench', add_help=False, help="Benchmark degli stadi su un corpus sintetico (opzioni: bench --help)")
+    p.set_defaults(func=cmd_bench)
+
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args, extra = parser.parse_known_args(argv)
+    if args.command == 'bench':
+        args.bench_args = extra  # Le opzioni del benchmark le interpreta benchmark.py
+    elif extra:
+        parser.error(f"argomenti non riconosciuti: {' '.join(extra)}")
+    t_ready = time.perf_counter()
+
+    # Ogni comando (tranne il benchmark, che ha il proprio report) scrive un manifest del run
+    instrumentation = None if args.command == 'bench' else _load('instrumentation')
+    if instrumentation:
+        instrumentation.start_run(args.command, profile_stage=args.profile)
+    try:
+        args.func(args)
+    finally:
+        if instrumentation:
+            instrumentation.finish_run()
+    t_end = time.perf_counter()
+
+    if args.timings:
+        print("\n[TEMPI]")
+        print(f"   Avvio CLI: {t_ready - _T_START:.3f}s")
+        for module_name, seconds in _import_timings.items():
+            print(f"   Import {module_name}: {seconds:.3f}s")
+        print(f"   Comando '{args.command}' (import inclusi): {t_end - t_ready:.3f}s")
+        print(f"   Totale: {t_end - _T_START:.3f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+import time
+
+# --- PIPELINE DI FILTRI COMPONIBILE ---
+# I filtri vengono applicati a stadi su una pagina intera di commenti, dal più economico
+# al più costoso: un commento scartato da un filtro veloce (es. la data) non arriva mai
+# a quelli lenti (es. langdetect). Per ogni filtro si tengono contatori e tempi.
+
+
+class CommentFilter:
+    """Un predicato sui commenti con un costo relativo (usato solo per l'ordinamento).
+
+    Con batch=True il predicato riceve la lista dei commenti e restituisce una lista di bool,
+    utile per stadi che conviene eseguire in blocco.
+    """
+
+    def __init__(self, name, predicate, cost, batch=False):
+        self.name = name
+        self.predicate = predicate
+        self.cost = cost
+        self.batch = batch
+
+    def apply(self, comments):
+        if self.batch:
+            return list(self.predicate(comments))
+        return [self.predicate(c) for c in comments]
+
+
+class FilterPipeline:
+    """Applica i filtri in ordine di costo crescente e ne registra pass/reject e tempi."""
+
+    def __init__(self, filters):
+        self.filters = sorted(filters, key=lambda f: f.cost)
+        self.stats = {f.name: {'evaluated': 0, 'passed': 0, 'rejected': 0, 'seconds': 0.0} for f in self.filters}
+
+    def filter_page(self, comments):
+        """Restituisce i commenti che superano tutti i filtri, nell'ordine originale."""
+        survivors = list(comments)
+        for f in self.filters:
+            if not survivors:
+                break
+            start = time.perf_counter()
+            keep = f.apply(survivors)
+            stats = self.stats[f.name]
+            stats['seconds'] += time.perf_counter() - start
+            stats['evaluated'] += len(survivors)
+            survivors = [c for c, ok in zip(survivors, keep) if ok]
+            stats['passed'] += len(survivors)
+            stats['rejected'] = stats['evaluated'] - stats['passed']
+        return survivors
+
+    def report(self):
+        print("   Filtri (in ordine di applicazione):")
+        for f in self.filters:
+            s = self.stats[f.name]
+            per_item = s['seconds'] / s['evaluated'] * 1000 if s['evaluated'] else 0.0
+            print(f"     - {f.name}: valutati {s['evaluated']}, passati {s['passed']}, scartati {s['rejected']} "
+                  f"({s['seconds']:.2f}s, {per_item:.3f} ms/commento)")
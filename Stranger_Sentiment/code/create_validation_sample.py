@@ -1,58 +1,180 @@
 import os
+import argparse
+import numpy as np
 import pandas as pd
-import glob
+import storage
+import instrumentation
+import text_normalization
+from instrumentation import timer
 
 # --- CONFIGURAZIONE ---
 BASE_DIR = os.path.dirname(os.path.dirname(__file__))
-DATA_PROCESSED_DIR = os.path.join(BASE_DIR, 'data', 'processed')
 VALIDATION_DIR = os.path.join(BASE_DIR, 'validation')
 OUTPUT_FILE = os.path.join(VALIDATION_DIR, 'new_validation_set_to_label.csv')
+LABELED_FILE = os.path.join(VALIDATION_DIR, 'validation_set_labeled.csv')
 
-def create_sample():
+# Ne prendiamo 300 così puoi cancellare quelli brutti e te ne restano 250
+SAMPLE_SIZE = 300
+SEED = None               # None = seed casuale (viene stampata per poter ripetere l'estrazione)
+ALLOCATIONS = ('proportional', 'equal')  # Quota di ogni stagione: proporzionale ai commenti o uguale
+CHUNK_SIZE = 50_000       # Righe lette per blocco
+# Campionamento attivo: i commenti con Sentiment_Score vicino a 0.5 (previsione incerta)
+# pesano fino a 1 + LOW_CONFIDENCE_WEIGHT volte quelli con previsione sicura
+SCORE_COLUMN = 'Sentiment_Score'
+LOW_CONFIDENCE_WEIGHT = 5.0
+
+# --- CAMPIONAMENTO A SERBATOIO PER STAGIONE ---
+# Ogni riga riceve una chiave casuale Exp(1) / peso e per ogni stagione si tengono le
+# sample_size chiavi più piccole (reservoir sampling pesato di Efraimidis-Spirakis, con peso 1
+# è un campione uniforme). I file si leggono a blocchi, solo con le colonne necessarie: in
+# memoria restano un blocco e i serbatoi, non l'intero corpus. Alla fine un testo presente in
+# più stagioni resta solo nel serbatoio dove ha la chiave più piccola, poi le quote delle
+# stagioni si estraggono dai rispettivi serbatoi (che sono già campioni casuali): una stagione
+# rimasta senza righe sufficienti cede la differenza alle altre.
+
+
+def _labeled_texts():
+    """Testi già presenti nel set etichettato (da non riproporre).
+
+    Il set etichettato può contenere testi grezzi (etichettati prima della normalizzazione),
+    mentre i dati processati hanno il testo normalizzato: si escludono entrambe le forme.
+    """
+    try:
+        texts = pd.read_csv(LABELED_FILE, usecols=['text'])['text'].dropna()
+    except (OSError, ValueError):
+        return set()
+    return set(texts) | set(text_normalization.normalize_texts(texts))
+
+
+def _read_chunks(dataset, key, columns):
+    """Blocchi di una chiave, misurando anche il tempo di lettura."""
+    batches = storage.iter_batches(dataset, columns=columns, batch_size=CHUNK_SIZE, key=key)
+    while True:
+        with timer('campione.lettura') as t:
+            chunk = next(batches, None)
+            t.items += len(chunk) if chunk is not None else 0
+        if chunk is None:
+            return
+        yield chunk
+
+
+def _weights(chunk, low_confidence):
+    if not low_confidence or SCORE_COLUMN not in chunk.columns:
+        return np.ones(len(chunk))
+    score = pd.to_numeric(chunk[SCORE_COLUMN], errors='coerce').fillna(1.0).to_numpy()
+    # score = probabilità dell'etichetta prevista (0.5 = massima incertezza)
+    uncertainty = np.clip(2 * (1 - score), 0, 1)
+    return 1 + LOW_CONFIDENCE_WEIGHT * uncertainty
+
+
+def _update_reservoir(reservoir, candidates, size):
+    """Tiene le size chiavi più piccole, un solo esemplare per testo."""
+    if reservoir is not None and len(reservoir) >= size:
+        candidates = candidates[candidates['_key'] < reservoir['_key'].iloc[-1]]
+        if candidates.empty:
+            return reservoir
+    merged = pd.concat([reservoir, candidates]) if reservoir is not None else candidates
+    merged = merged.sort_values('_key', kind='stable').drop_duplicates('text')
+    return merged.head(size)
+
+
+def _allocate(sizes, available, sample_size, allocation):
+    """Quote per stagione (metodo dei resti più grandi), ridistribuendo ciò che manca.
+
+    sizes: commenti letti per stagione (pesi delle quote proporzionali);
+    available: righe nel serbatoio di ogni stagione (tetto della quota).
+    """
+    quotas = {season: 0 for season in available}
+    remaining = sample_size
+    while remaining > 0:
+        open_seasons = [s for s in available if available[s] > quotas[s]]
+        if not open_seasons:
+            break
+        weights = np.array([1.0 if allocation == 'equal' else sizes[s] for s in open_seasons])
+        exact = remaining * weights / weights.sum()
+        share = np.floor(exact).astype(int)
+        for i in np.argsort(-(exact - share), kind='stable')[:remaining - share.sum()]:
+            share[i] += 1
+        for season, n in zip(open_seasons, share):
+            n = min(n, available[season] - quotas[season])
+            quotas[season] += n
+            remaining -= n
+    return quotas
+
+
+def stratified_sample(sample_size=SAMPLE_SIZE, seed=None, allocation='proportional', low_confidence=False,
+                      exclude=()):
+    """Campione stratificato per stagione letto in streaming (testo e stagione)."""
+    rng = np.random.default_rng(seed)
+    exclude = set(exclude)
+    dataset = 'results' if low_confidence else 'processed'
+    columns = ['text', 'season'] + ([SCORE_COLUMN] if low_confidence else [])
+
+    reservoirs, seen = {}, {}
+    scores_found = False
+    for key in storage.list_keys(dataset):
+        for chunk in _read_chunks(dataset, key, columns):
+            with timer('campione.estrazione', items=len(chunk)):
+                if 'season' not in chunk.columns:
+                    chunk['season'] = key.split('_')[0]  # Vecchi CSV: il prefisso inizia con la stagione
+                scores_found |= SCORE_COLUMN in chunk.columns
+                # Le chiavi si estraggono per tutte le righe: la sequenza dipende solo da seed e dati
+                keys = rng.exponential(size=len(chunk)) / _weights(chunk, low_confidence)
+                chunk = pd.DataFrame({'text': chunk['text'].to_numpy(), '_key': keys,
+                                      'season': chunk['season'].astype(str).to_numpy()})
+                chunk = chunk[chunk['text'].notna() & ~chunk['text'].isin(exclude)]
+                for season, group in chunk.groupby('season', sort=False):
+                    seen[season] = seen.get(season, 0) + len(group)
+                    reservoirs[season] = _update_reservoir(reservoirs.get(season), group, sample_size)
+
+    if low_confidence and not scores_found:
+        print(f"⚠️ Colonna '{SCORE_COLUMN}' assente nei risultati: campionamento uniforme.")
+    if not reservoirs:
+        return pd.DataFrame(columns=['text', 'season']), seen
+
+    # Testi uguali in più stagioni: uno solo, prima delle quote (così il campione ha sample_size righe)
+    pooled = pd.concat(reservoirs.values()).sort_values('_key', kind='stable').drop_duplicates('text')
+    reservoirs = {season: group for season, group in pooled.groupby('season', sort=True)}
+    quotas = _allocate(seen, {s: len(r) for s, r in reservoirs.items()}, sample_size, allocation)
+    sample = pd.concat([reservoirs[s].head(n) for s, n in quotas.items() if n])
+    # Ordine casuale (per chiave) invece che raggruppato per stagione
+    sample = sample.sort_values('_key', kind='stable')
+    return sample[['text', 'season']].reset_index(drop=True), seen
+
+
+def create_sample(sample_size=SAMPLE_SIZE, seed=SEED, allocation='proportional', low_confidence=False):
     print("--- GENERAZIONE NUOVO VALIDATION SET (FORMATO CORRETTO) ---")
-    
-    # 1. Cerca tutti i file CSV processati (S1...S5)
-    csv_pattern = os.path.join(DATA_PROCESSED_DIR, "*_processed.csv")
-    files = glob.glob(csv_pattern)
-    
-    if not files:
-        print(f"❌ Nessun file trovato in {DATA_PROCESSED_DIR}")
-        print("   Esegui prima 'data_acquisition.py'!")
+
+    # 1. Cerca tutti i dati processati (S1...S5), o i risultati per il campionamento attivo
+    dataset = 'results' if low_confidence else 'processed'
+    keys = storage.list_keys(dataset)
+
+    if not keys:
+        print(f"❌ Nessun file trovato in {storage.DATASETS[dataset]}")
+        print("   Esegui prima l'analisi!" if low_confidence else "   Esegui prima 'data_acquisition.py'!")
         return
 
-    print(f"📂 Trovati {len(files)} file dati. Unione in corso...")
+    if seed is None:
+        seed = int(np.random.default_rng().integers(2 ** 31))
+    exclude = _labeled_texts()
+    print(f"📂 Trovati {len(keys)} video. Lettura a blocchi (seed {seed}, quote {allocation}"
+          f"{', sovracampionando le previsioni incerte' if low_confidence else ''})...")
+    if exclude:
+        print(f"   Esclusi {len(exclude)} testi già etichettati.")
 
-    # 2. Legge e unisce tutti i dati
-    df_list = []
-    for f in files:
-        try:
-            df = pd.read_csv(f)
-            if 'text' in df.columns:
-                # Carichiamo solo il testo per ora
-                df_list.append(df)
-        except Exception as e:
-            print(f"⚠️ Errore lettura {os.path.basename(f)}: {e}")
+    # 2. Estrazione stratificata per stagione, senza caricare tutto il corpus
+    sample_df, seen = stratified_sample(sample_size, seed, allocation, low_confidence, exclude)
 
-    if not df_list:
+    if sample_df.empty:
         print("❌ Nessun dato valido trovato.")
         return
 
-    full_df = pd.concat(df_list, ignore_index=True)
-    total_comments = len(full_df)
-    
-    # 3. Estrazione Casuale con BUFFER (300 commenti)
-    # Ne prendiamo 300 così puoi cancellare quelli brutti e te ne restano 250
-    SAMPLE_SIZE = 300
-    
-    print(f"📊 Estraggo {SAMPLE_SIZE} commenti casuali da un totale di {total_comments}...")
-    
-    if total_comments < SAMPLE_SIZE:
-        sample_df = full_df.copy()
-    else:
-        # random_state=None per avere commenti diversi ogni volta
-        sample_df = full_df.sample(n=SAMPLE_SIZE)
+    print(f"📊 Estratti {len(sample_df)} commenti da un totale di {sum(seen.values())}:")
+    counts = sample_df['season'].value_counts()
+    for season in sorted(seen):
+        print(f"   {season}: {counts.get(season, 0)} su {seen[season]}")
 
-    # 4. Preparazione Colonne (ESATTAMENTE COME RICHIESTO)
+    # 3. Preparazione Colonne (ESATTAMENTE COME RICHIESTO)
     # Creiamo la colonna vuota
     sample_df['Ground_Truth_Label'] = ''
 
@@ -62,20 +184,35 @@ def create_sample():
     # 2. Ground_Truth_Label (Vuota)
     sample_df = sample_df[['text', 'Ground_Truth_Label']]
 
-    # 5. Salvataggio con controllo esistenza
+    # 4. Salvataggio con controllo esistenza
     if os.path.exists(OUTPUT_FILE):
         print(f"⚠️ ATTENZIONE: Il file '{OUTPUT_FILE}' esiste già!")
         print("   Cancellalo o rinominalo prima di rieseguire lo script, per non perdere il tuo lavoro.")
     else:
         os.makedirs(VALIDATION_DIR, exist_ok=True)
-        sample_df.to_csv(OUTPUT_FILE, index=False)
-        
+        with timer('campione.scrittura', items=len(sample_df)):
+            sample_df.to_csv(OUTPUT_FILE, index=False)
+
         print(f"\n✅ FILE CREATO: {OUTPUT_FILE}")
         print("👉 ISTRUZIONI:")
         print("   1. Apri il file (vedrai colonna 'text' e colonna vuota 'Ground_Truth_Label').")
         print("   2. Elimina le righe 'spazzatura' finché non ne restano 250.")
         print("   3. Scrivi POSITIVE o NEGATIVE nella seconda colonna.")
-        print("   4. Salva come 'validation_set_labeled.csv'.")
+        print("   4. Aggiungi le righe a 'validation_set_labeled.csv'.")
+
 
 if __name__ == "__main__":
-    create_sample()
+    parser = argparse.ArgumentParser(description="Crea un nuovo campione di validazione da etichettare.")
+    parser.add_argument('--size', type=int, default=SAMPLE_SIZE, help="Commenti da estrarre")
+    parser.add_argument('--seed', type=int, default=SEED, help="Seed per ripetere la stessa estrazione")
+    parser.add_argument('--allocation', choices=ALLOCATIONS, default='proportional',
+                        help="Quote per stagione: proporzionali ai commenti o uguali")
+    parser.add_argument('--low-confidence', action='store_true',
+                        help=f"Sovracampiona le previsioni incerte (colonna {SCORE_COLUMN} dei risultati)")
+    args = parser.parse_args()
+
+    instrumentation.start_run('create_validation_sample')
+    try:
+        create_sample(args.size, args.seed, args.allocation, args.low_confidence)
+    finally:
+        instrumentation.finish_run()
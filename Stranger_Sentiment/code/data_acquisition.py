@@ -2,34 +2,113 @@ import os
 import json
 import time
 import sys
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 import pandas as pd
-from googleapiclient.discovery import build
-from langdetect import detect, DetectorFactory
-
-# Imposta la seed per la riproducibilità di langdetect
-DetectorFactory.seed = 0
-
-# Importa la chiave API dal file che devi creare manualmente
-try:
-    from api_key import YOUTUBE_API_KEY
-    YOUTUBE = build('youtube', 'v3', developerKey=YOUTUBE_API_KEY)
-except ImportError:
-    print("ERRORE: Devi creare il file 'code/api_key.py' con la tua YOUTUBE_API_KEY.")
-    sys.exit(1)
-except Exception as e:
-    print(f"ERRORE: Impossibile inizializzare l'API di YouTube. {e}")
-    sys.exit(1)
-
-# --- CONFIGURAZIONE GLOBALE (CON DATE RIGOROSE) ---
-VIDEO_MAP_HYPE = {
-    'S1': {'ID': 'b9EkMc79ZSU', 'FILE_PREFIX': 'S1_Hype', 'RELEASE_DATE': '2016-07-15'},
-    'S2': {'ID': 'R1ZXOOLMJ8s', 'FILE_PREFIX': 'S2_Hype', 'RELEASE_DATE': '2017-10-27'},
-    'S3': {'ID': 'PH3kBCSfL-4', 'FILE_PREFIX': 'S3_Hype', 'RELEASE_DATE': '2019-07-04'},
-    'S4': {'ID': 'oB2GYwbIAlM', 'FILE_PREFIX': 'S4_Hype', 'RELEASE_DATE': '2022-05-27'}, 
-    # S5 con ID video corretto e data di rilascio del Volume 1
-    'S5': {'ID': 'PssKpzB0Ah0', 'FILE_PREFIX': 'S5_Hype', 'RELEASE_DATE': '2025-11-26'} 
-}
+from comment_filters import CommentFilter, FilterPipeline
+from youtube_api import QuotaRateLimiter, execute_with_retry, build_client, SessionClient
+from api_recorder import PageRecorder, MODES
+from language_id import LanguageIdentifier, DEFAULT_DETECTOR, default_workers
+import storage
+import videos
+import text_normalization
+import job_queue
+import instrumentation
+from instrumentation import timer
+
+# NOTA: googleapiclient/requests e langdetect vengono importati al primo utilizzo,
+# così importare il modulo (es. dalla CLI) non paga il loro tempo di caricamento.
+# Se YOUTUBE viene assegnato (es. un client finto), è usato da tutti i thread.
+YOUTUBE = None
+_thread_local = threading.local()
+_shared_client = None
+_client_lock = threading.Lock()
+
+# Modalità di download:
+#   'minimal' : solo i campi usati (parametro fields= della risposta parziale), testo originale
+#               (textOriginal) e un unico client REST con sessione HTTP condivisa e gzip
+#   'full'    : snippet completo e textDisplay (HTML), un client googleapiclient per thread
+FETCH_MODES = ('minimal', 'full')
+FETCH_MODE = 'minimal'
+_COMMENT_FIELDS = "id,snippet(textOriginal,publishedAt)"
+THREAD_FIELDS = f"nextPageToken,items(id,snippet(totalReplyCount,topLevelComment({_COMMENT_FIELDS})))"
+THREAD_FIELDS_WITH_REPLIES = (f"nextPageToken,items(id,snippet(totalReplyCount,topLevelComment({_COMMENT_FIELDS})),"
+                              f"replies(comments({_COMMENT_FIELDS})))")
+REPLY_FIELDS = f"nextPageToken,items({_COMMENT_FIELDS})"
+
+# Pagine grezze dell'API registrate su disco e riprodotte (vedi api_recorder.py):
+# 'off', 'record' o 'replay' (solo disco, nessuna richiesta né quota)
+RECORDER = PageRecorder(os.environ.get('STRANGER_API_PAGES', 'off'))
+
+# Limite condiviso da tutte le stagioni scaricate in parallelo
+RATE_LIMITER = QuotaRateLimiter(requests_per_second=5.0, burst=5)
+ACQUISITION_WORKERS = 3  # Video scaricati in contemporanea
+
+# Risposte ai commenti (facoltative, --replies): commentThreads restituisce al più qualche
+# risposta per thread; se non sono tutte, le altre si scaricano con comments().list su un
+# pool di REPLY_WORKERS thread condiviso dai video (stesso rate limiter, 1 unità di quota per pagina)
+HARVEST_REPLIES = False
+REPLY_WORKERS = 4
+_reply_pool = None
+_reply_pool_lock = threading.Lock()
+
+# Rilevamento lingua a batch (vedi language_id.py), condiviso da tutte le stagioni
+LANGUAGE_DETECTOR = DEFAULT_DETECTOR
+LANGUAGE_WORKERS = default_workers()
+_language_identifier = None
+
+
+def _new_client():
+    # Importa la chiave API dal file che devi creare manualmente
+    try:
+        from api_key import YOUTUBE_API_KEY
+        return SessionClient(YOUTUBE_API_KEY) if FETCH_MODE == 'minimal' else build_client(YOUTUBE_API_KEY)
+    except ImportError:
+        print("ERRORE: Devi creare il file 'code/api_key.py' con la tua YOUTUBE_API_KEY.")
+        sys.exit(1)
+    except Exception as e:
+        print(f"ERRORE: Impossibile inizializzare l'API di YouTube. {e}")
+        sys.exit(1)
+
+
+def get_youtube():
+    """Client YouTube Data API, creato alla prima richiesta.
+
+    In modalità 'minimal' un unico client (una sessione HTTP) per tutti i thread;
+    in modalità 'full' un client googleapiclient per thread (httplib2 non è thread-safe).
+    """
+    global _shared_client
+    if YOUTUBE is not None:
+        return YOUTUBE
+    if FETCH_MODE == 'minimal':
+        with _client_lock:
+            if _shared_client is None:
+                _shared_client = _new_client()
+            return _shared_client
+
+    client = getattr(_thread_local, 'youtube', None)
+    if client is None:
+        client = _thread_local.youtube = _new_client()
+    return client
+
+
+def _list_page(resource, live=False, **params):
+    """Una pagina di commentThreads/comments: dal disco (RECORDER) o dall'API con rate limit e retry.
+
+    live=True salta le pagine registrate (modalità watch: la prima pagina cambia a ogni nuovo commento).
+    """
+    params = {k: v for k, v in params.items() if v is not None}
+    if FETCH_MODE == 'minimal':
+        params['fields'] = {'comments': REPLY_FIELDS, 'commentThreads': (
+            THREAD_FIELDS_WITH_REPLIES if 'replies' in params['part'] else THREAD_FIELDS)}[resource]
+    request = lambda: execute_with_retry(lambda: getattr(get_youtube(), resource)().list(**params), RATE_LIMITER)
+    return request() if live else RECORDER.fetch(resource, params, request)
+
+# --- CONFIGURAZIONE GLOBALE ---
+# I video (id, stagione/gruppo e data di uscita rigorosa) sono elencati nel manifest
+# videos.json (vedi videos.py); lo stato di ogni video è nella coda dei job (job_queue.py).
 
 # Definisce i percorsi delle cartelle relative
 BASE_DIR = os.path.dirname(os.path.dirname(__file__))
@@ -40,119 +119,548 @@ os.makedirs(VALIDATION_DIR, exist_ok=True)
 
 # --- FUNZIONI DI FILTRAGGIO ---
 
+def get_language_identifier():
+    global _language_identifier
+    if _language_identifier is None:
+        # Filtro Rigoroso: solo lingua 'en' (inglese)
+        _language_identifier = LanguageIdentifier(LANGUAGE_DETECTOR, target='en', workers=LANGUAGE_WORKERS)
+    return _language_identifier
+
+
 def detect_language(text):
     """Verifica se il testo del commento è in inglese usando langdetect."""
-    if not text or len(text.split()) < 3: 
-        return False
-    try:
-        # Filtro Rigoroso: solo lingua 'en' (inglese)
-        return detect(text) == 'en'
-    except:
-        return False
+    return get_language_identifier().is_target(text)
+
+
+def detect_language_batch(texts):
+    """Come detect_language su una lista di testi (memo + pool di processi)."""
+    return get_language_identifier().is_target_batch(texts)
 
 def is_comment_pre_release(comment_time_str, release_date_str):
     """Verifica se il commento è rigorosamente prima della data di rilascio (compreso il giorno stesso)."""
     try:
         # Converti la data di rilascio a mezzanotte
         release_dt = datetime.strptime(release_date_str, '%Y-%m-%d')
-        
+    except ValueError as e:
+        return False
+    return is_comment_on_or_before(comment_time_str, release_dt.date())
+
+
+def is_comment_on_or_before(comment_time_str, release_date):
+    """Come is_comment_pre_release, ma con la data di rilascio già convertita (una volta per stagione)."""
+    try:
         # Converti il timestamp API (ISO 8601) e rimuovi fuso orario per confronto
         comment_dt = datetime.fromisoformat(comment_time_str.replace('Z', '+00:00')).replace(tzinfo=None)
         
         # Filtro Rigoroso: commento DEVE essere prima o al massimo il giorno della release
-        return comment_dt.date() <= release_dt.date()
+        return comment_dt.date() <= release_date
         
     except ValueError as e:
         return False
 
+
+def build_filter_pipeline(release_date_str):
+    """Filtri di una stagione, applicati dal più economico al più costoso.
+
+    Con order="time" i commenti arrivano dal più recente: per un trailer recente le prime
+    pagine sono quasi tutte post-uscita. Mettendo il controllo della data prima di langdetect,
+    quella regione viene attraversata senza mai eseguire il rilevamento della lingua.
+    """
+    # Valore precalcolato una sola volta per stagione (non a ogni commento)
+    release_date = datetime.strptime(release_date_str, '%Y-%m-%d').date()
+    return FilterPipeline([
+        CommentFilter('almeno_3_parole', lambda c: bool(c['text']) and len(c['text'].split()) >= 3, cost=1),
+        CommentFilter('pre_uscita', lambda c: is_comment_on_or_before(c['time'], release_date), cost=2),
+        CommentFilter('inglese', lambda cs: detect_language_batch([c['text'] for c in cs]), cost=100, batch=True),
+    ])
+
+# --- CHECKPOINT DI ACQUISIZIONE ---
+# I commenti validi vengono scritti a blocchi (una "parte" del dataset 'processed' per blocco,
+# vedi storage.py) man mano che arrivano le pagine; dopo ogni blocco il checkpoint salva il
+# prossimo pageToken, i contatori e il numero di parti scritte. Un run interrotto riprende
+# da lì invece di ricominciare da capo.
+
+# parent_id: id del commento a cui si risponde (vuoto per i commenti principali); depth: 0 o 1
+# text è il testo normalizzato (vedi text_normalization.py), text_raw quello restituito dall'API
+OUTPUT_COLUMNS = ['text', 'time', 'season', 'comment_id', 'parent_id', 'depth', 'text_raw']
+FLUSH_EVERY_ROWS = 1000  # Righe valide tenute in memoria prima di scriverle su disco
+
+
+def checkpoint_path(file_prefix):
+    return os.path.join(DATA_PROCESSED_DIR, f"{file_prefix}_checkpoint.json")
+
+
+def load_checkpoint(file_prefix):
+    path = checkpoint_path(file_prefix)
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_checkpoint(file_prefix, state):
+    """Scrittura atomica: un crash durante il salvataggio non corrompe il checkpoint."""
+    path = checkpoint_path(file_prefix)
+    tmp_path = path + '.tmp'
+    state['updated_at'] = datetime.now().isoformat(timespec='seconds')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def _write_rows(file_prefix, rows, part_index, season=None):
+    """Scrive un blocco di righe come nuova parte del dataset 'processed'."""
+    season = season or file_prefix.split('_')[0]
+    storage.write_part('processed', file_prefix, season, pd.DataFrame(rows, columns=OUTPUT_COLUMNS), index=part_index)
+
+
+# --- RISPOSTE AI COMMENTI ---
+
+def _comment_row(comment, parent_id=None, depth=0):
+    """Riga di un commento (principale o risposta) dalla risorsa 'comment' dell'API."""
+    snippet = comment['snippet']
+    return {
+        'text': snippet.get('textOriginal', snippet.get('textDisplay', '')),
+        'time': snippet.get('publishedAt', ''),
+        'comment_id': comment.get('id'),
+        'parent_id': parent_id,
+        'depth': depth,
+    }
+
+
+def _fetch_replies(thread_id):
+    """Tutte le risposte di un thread con comments().list (a pagine di 100)."""
+    replies, page_token = [], None
+    while True:
+        with timer('acquisizione.pagine_risposte') as t:
+            response = _list_page('comments', part="snippet", parentId=thread_id, maxResults=100, pageToken=page_token)
+            t.items += len(response['items'])
+        instrumentation.count('pagine_risposte')
+        replies.extend(_comment_row(r, parent_id=thread_id, depth=1) for r in response['items'])
+        page_token = response.get('nextPageToken')
+        if not page_token:
+            return replies
+
+
+def get_reply_pool():
+    global _reply_pool
+    with _reply_pool_lock:
+        if _reply_pool is None:
+            _reply_pool = ThreadPoolExecutor(max_workers=REPLY_WORKERS, thread_name_prefix='risposte')
+        return _reply_pool
+
+
+def close_reply_pool():
+    global _reply_pool
+    with _reply_pool_lock:
+        if _reply_pool is not None:
+            _reply_pool.shutdown()
+            _reply_pool = None
+
+
+def _normalize_rows(rows):
+    """Normalizza il testo di una pagina di righe (tutta insieme), conservando l'originale in text_raw."""
+    if not rows:
+        return rows
+    texts = text_normalization.normalize_texts([r['text'] for r in rows])
+    for row, text in zip(rows, texts.tolist()):
+        row['text_raw'] = row['text']
+        row['text'] = text
+    return rows
+
+
+def _thread_rows(items, reply_pool=None):
+    """Righe di una pagina di commentThreads: commenti principali e, con reply_pool, le risposte.
+
+    Le risposte incluse nella pagina bastano se sono tutte (totalReplyCount); per gli
+    altri thread si scaricano in parallelo sul pool.
+    """
+    rows, incomplete = [], []
+    for item in items:
+        top = item['snippet']['topLevelComment']
+        thread_id = item.get('id') or top.get('id')
+        rows.append(_comment_row(top))
+        if reply_pool is None or not item['snippet'].get('totalReplyCount'):
+            continue
+        inline = item.get('replies', {}).get('comments', [])
+        if len(inline) >= item['snippet']['totalReplyCount']:
+            rows.extend(_comment_row(r, parent_id=thread_id, depth=1) for r in inline)
+        else:
+            incomplete.append(thread_id)
+    for replies in reply_pool.map(_fetch_replies, incomplete) if incomplete else ():
+        rows.extend(replies)
+    return rows
+
+
+def _is_seen(item, watermark, seen_ids):
+    """Thread già visto: pubblicato prima del più recente visto (o nello stesso istante e già letto)."""
+    top = item['snippet']['topLevelComment']
+    published = top['snippet'].get('publishedAt', '')
+    return watermark is not None and (published < watermark or
+                                      (published == watermark and (item.get('id') or top.get('id')) in seen_ids))
+
+
+def _advance_watermark(state, items):
+    """Salva nel checkpoint il publishedAt più recente visto e gli id dei thread con quell'istante."""
+    newest, ids = state.get('newest_published_at'), set(state.get('newest_ids', []))
+    for item in items:
+        top = item['snippet']['topLevelComment']
+        published = top['snippet'].get('publishedAt', '')
+        thread_id = item.get('id') or top.get('id')
+        if newest is None or published > newest:
+            newest, ids = published, {thread_id}
+        elif published == newest:
+            ids.add(thread_id)
+    state['newest_published_at'], state['newest_ids'] = newest, sorted(ids)
+
+
 # --- PROCESSO PRINCIPALE DI ACQUISIZIONE E FILTRAGGIO ---
 
-def raccogli_e_filtra_dati(video_id, file_prefix, release_date_str):
-    """Esegue lo scraping, applica i filtri e salva i dati processati."""
-    
-    output_path_processed = os.path.join(DATA_PROCESSED_DIR, f"{file_prefix}_processed.csv")
-    
-    if os.path.exists(output_path_processed) and os.path.getsize(output_path_processed) > 100:
-        print(f"[PROCESSATO] File processato {output_path_processed} esiste già. Salto la raccolta/filtro.")
+def raccogli_e_filtra_dati(video_id, file_prefix, release_date_str, season=None, heartbeat=None, replies=None,
+                           restart=False):
+    """Esegue lo scraping, applica i filtri e salva i dati processati (a blocchi, con ripresa da checkpoint).
+
+    season: gruppo del manifest (default: il prefisso della chiave, es. 'S1' da 'S1_Hype');
+    heartbeat: chiamata a ogni checkpoint, segnala alla coda che il job è ancora vivo;
+    replies: scarica anche le risposte (default HARVEST_REPLIES);
+    restart: ignora checkpoint e dati esistenti e riparte dalla prima pagina (es. per rifare
+    i filtri sulle pagine registrate).
+    """
+    season = season or file_prefix.split('_')[0]
+    replies = HARVEST_REPLIES if replies is None else replies
+
+    legacy_csv = os.path.join(DATA_PROCESSED_DIR, f"{file_prefix}_processed.csv")
+    state = None if restart else load_checkpoint(file_prefix)
+
+    if state is not None and state.get('completed'):
+        print(f"[PROCESSATO] Raccolta per {file_prefix} già completata. Salto la raccolta/filtro.")
         return 0 # Ritorna 0 per non alterare il conteggio totale
 
-    print(f"\n--- INIZIO: Raccolta e Filtro per {file_prefix} (Video ID: {video_id}) ---")
+    if state is None and not restart and os.path.exists(legacy_csv) and os.path.getsize(legacy_csv) > 100:
+        # File prodotto da una versione precedente (senza checkpoint): lo consideriamo completo
+        print(f"[PROCESSATO] File processato {legacy_csv} esiste già. Salto la raccolta/filtro.")
+        return 0
+
+    # I checkpoint delle versioni precedenti (senza 'parts') non sono riprendibili: si ricomincia.
+    # Anche un cambio di modalità (con/senza risposte, FETCH_MODE) riparte da capo, per non mescolarle.
+    if (state is None or state.get('video_id') != video_id or 'parts' not in state
+            or state.get('replies', False) != replies or state.get('fetch', 'full') != FETCH_MODE):
+        state = {
+            'video_id': video_id,
+            'replies': replies,
+            'fetch': FETCH_MODE,
+            'next_page_token': None,
+            'pages': 0,
+            'commenti_totali_letti': 0,
+            'risposte_lette': 0,
+            'commenti_validi': 0,
+            'parts': 0,
+            'completed': False,
+        }
+        storage.remove_parts('processed', file_prefix)
+        print(f"\n--- INIZIO: Raccolta e Filtro per {file_prefix} (Video ID: {video_id}) ---")
+    else:
+        # Scarta eventuali parti scritte dopo l'ultimo checkpoint (verranno riscaricate)
+        storage.remove_parts('processed', file_prefix, keep=state['parts'])
+        print(f"\n--- RIPRESA: Raccolta e Filtro per {file_prefix} (Video ID: {video_id}) ---")
+        print(f"   Dal checkpoint: {state['pages']} pagine, {state['commenti_totali_letti']} letti, {state['commenti_validi']} validi")
     print(f"   Filtro Temporale Rigoroso: SOLO commenti PRIMA o IL {release_date_str}")
+    if replies:
+        print(f"   Anche le risposte (thread incompleti scaricati su {REPLY_WORKERS} worker)")
     
-    commenti_validi = []
-    commenti_totali_letti = 0
-    next_page_token = None
+    buffer = []
+    filtri = build_filter_pipeline(release_date_str)
+    validi_iniziali = state['commenti_validi']
+    next_page_token = state['next_page_token']
+
+    def flush(token):
+        # Il checkpoint viene scritto DOPO le righe: punta sempre a dati già su disco
+        if buffer:
+            with timer('acquisizione.scrittura', items=len(buffer)):
+                _write_rows(file_prefix, buffer, state['parts'], season)
+            state['parts'] += 1
+            state['commenti_validi'] += len(buffer)
+            buffer.clear()
+        state['next_page_token'] = token
+        save_checkpoint(file_prefix, state)
+        if heartbeat is not None:
+            heartbeat()
     
+    reply_pool = get_reply_pool() if replies else None
+
     # L'API è limitata a 100 commenti per pagina
     while True:
         try:
-            request = YOUTUBE.commentThreads().list(
-                part="snippet",
+            # Rate limit condiviso + retry con backoff sugli errori transitori (403/429/5xx)
+            with timer('acquisizione.pagine_api') as t:
+                response = _list_page(
+                    'commentThreads',
+                    part="snippet,replies" if replies else "snippet",
+                    videoId=video_id,
+                    maxResults=100,
+                    pageToken=next_page_token,
+                    order="time",
+                )
+                t.items += len(response['items'])
+            # Le risposte della pagina fanno parte della stessa unità di lavoro (stesso checkpoint)
+            commenti = _thread_rows(response['items'], reply_pool)
+        except Exception as e:
+            print(f"[ERRORE API] Errore durante la richiesta: {e}")
+            print(f"   Progressi salvati: il prossimo run riprenderà da questo punto.")
+            flush(next_page_token)
+            break
+
+        _advance_watermark(state, response['items'])
+        n_risposte = sum(1 for c in commenti if c['depth'])
+        state['commenti_totali_letti'] += len(commenti)
+        state['risposte_lette'] = state.get('risposte_lette', 0) + n_risposte
+        instrumentation.count('pagine_api')
+        instrumentation.count('commenti_letti', len(commenti))
+        if n_risposte:
+            instrumentation.count('risposte_lette', n_risposte)
+
+        # Markup ed entità tolti prima dei filtri: la lingua si rileva sul testo pulito
+        with timer('acquisizione.normalizzazione', items=len(commenti)):
+            _normalize_rows(commenti)
+
+        # Filtri (Pre-uscita Rigoroso + Inglese) applicati all'intera pagina
+        with timer('acquisizione.filtri', items=len(commenti)):
+            validi = filtri.filter_page(commenti)
+        for c in validi:
+            buffer.append({
+                'text': c['text'],
+                'time': c['time'],
+                'season': season,
+                'comment_id': c['comment_id'],
+                'parent_id': c['parent_id'],
+                'depth': c['depth'],
+                'text_raw': c['text_raw'],
+            })
+
+        state['pages'] += 1
+        next_page_token = response.get('nextPageToken')
+        
+        if not next_page_token:
+            state['completed'] = True
+            flush(None)
+            break
+
+        if len(buffer) >= FLUSH_EVERY_ROWS:
+            flush(next_page_token)
+
+    if state['completed'] and state['parts'] == 0:
+        # Nessun commento valido: salviamo comunque una parte vuota (con le colonne)
+        _write_rows(file_prefix, [], 0, season)
+    
+    stato = "completati" if state['completed'] else "interrotti (riprendibili)"
+    print(f"[SUCCESSO] Raccolta e Filtro {stato} per {file_prefix}.")
+    print(f"   Commenti totali letti: {state['commenti_totali_letti']}"
+          + (f" (di cui {state['risposte_lette']} risposte)" if replies else ""))
+    print(f"   Commenti validi/filtrati (Inglese, Pre-uscita): {state['commenti_validi']}")
+    filtri.report()
+    instrumentation.record('filters', filtri.stats, key=file_prefix)
+    print(f"   Dati salvati in: {storage.DATASETS['processed']} ({state['parts']} parti)")
+    
+    return state['commenti_validi'] - validi_iniziali
+
+
+# --- MODALITÀ WATCH: SOLO I COMMENTI NUOVI ---
+# Il checkpoint ricorda il publishedAt più recente visto (newest_published_at). Con order="time"
+# i thread arrivano dal più recente: si sfogliano le pagine solo finché non compare un thread
+# già visto, quindi un video senza novità costa una pagina. Le righe valide diventano una
+# nuova parte in coda al dataset 'processed'.
+
+def _stored_newest(file_prefix):
+    """publishedAt più recente fra i commenti salvati (per i checkpoint senza watermark)."""
+    times = storage.read('processed', columns=['time'], key=file_prefix)
+    if times.empty or times['time'].isna().all():
+        return None
+    return times['time'].max().strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+def _adopt_legacy(video_id, file_prefix, season):
+    """Vecchio CSV processato senza checkpoint: diventa la parte 0 con un checkpoint completato."""
+    if not storage.exists('processed', file_prefix):
+        return None
+    df = storage.read('processed', key=file_prefix)
+    if storage.count_parts('processed', file_prefix) == 0:
+        # Con una parte presente il vecchio CSV viene ignorato dalla lettura (resta su disco)
+        storage.write_part('processed', file_prefix, season, df, index=0)
+    return {'video_id': video_id, 'replies': False, 'fetch': FETCH_MODE, 'next_page_token': None,
+            'pages': 0, 'commenti_totali_letti': len(df), 'risposte_lette': 0, 'commenti_validi': len(df),
+            'parts': storage.count_parts('processed', file_prefix), 'completed': True}
+
+
+def poll_new_comments(video_id, file_prefix, release_date_str, season=None):
+    """Scarica e filtra solo i commenti successivi all'ultimo visto e li aggiunge in coda.
+
+    Restituisce le righe valide aggiunte (DataFrame con OUTPUT_COLUMNS, vuoto se nessuna).
+    Richiede che l'acquisizione iniziale del video sia completata.
+    """
+    season = season or file_prefix.split('_')[0]
+    empty = pd.DataFrame(columns=OUTPUT_COLUMNS)
+    state = load_checkpoint(file_prefix) or _adopt_legacy(video_id, file_prefix, season)
+    if state is None or not state.get('completed') or state.get('video_id') != video_id:
+        print(f"[WATCH] {file_prefix}: acquisizione iniziale non completata, salto.")
+        return empty
+    if 'newest_published_at' not in state:
+        state['newest_published_at'], state['newest_ids'] = _stored_newest(file_prefix), []
+
+    replies = state.get('replies', False)
+    watermark, seen_ids = state['newest_published_at'], set(state['newest_ids'])
+    threads, page_token = [], None
+    while True:
+        with timer('watch.pagine_api') as t:
+            response = _list_page(
+                'commentThreads',
+                live=True,
+                part="snippet,replies" if replies else "snippet",
                 videoId=video_id,
                 maxResults=100,
-                pageToken=next_page_token,
-                order="time" 
+                pageToken=page_token,
+                order="time",
             )
-            response = request.execute()
-
-            for item in response['items']:
-                commenti_totali_letti += 1
-                comment_snippet = item['snippet']['topLevelComment']['snippet']
-                text = comment_snippet.get('textDisplay', '')
-                time_str = comment_snippet.get('publishedAt', '')
-
-                # 1. Filtro Linguistico (Inglese)
-                if not detect_language(text):
-                    continue
-                
-                # 2. Filtro Temporale (Pre-uscita Rigoroso)
-                if not is_comment_pre_release(time_str, release_date_str):
-                    continue 
-
-                # Se passa entrambi, aggiungiamo
-                commenti_validi.append({
-                    'text': text,
-                    'time': time_str,
-                    'season': file_prefix.split('_')[0]
-                })
-
-            next_page_token = response.get('nextPageToken')
-            
-            if not next_page_token:
+            t.items += len(response['items'])
+        instrumentation.count('pagine_api')
+        fresh = []
+        for item in response['items']:
+            if _is_seen(item, watermark, seen_ids):
                 break
-            
-            time.sleep(0.5) 
+            fresh.append(item)
+        threads.extend(fresh)
+        page_token = response.get('nextPageToken')
+        if len(fresh) < len(response['items']) or not page_token:
+            break
+
+    commenti = _thread_rows(threads, get_reply_pool() if replies else None)
+    with timer('watch.normalizzazione', items=len(commenti)):
+        _normalize_rows(commenti)
+    with timer('watch.filtri', items=len(commenti)):
+        validi = build_filter_pipeline(release_date_str).filter_page(commenti)
+    df = pd.DataFrame([{**c, 'season': season} for c in validi], columns=OUTPUT_COLUMNS)
+    if not df.empty:
+        with timer('watch.scrittura', items=len(df)):
+            storage.write_part('processed', file_prefix, season, df)
+
+    state['parts'] = storage.count_parts('processed', file_prefix)
+    state['commenti_totali_letti'] += len(commenti)
+    state['commenti_validi'] += len(df)
+    _advance_watermark(state, threads)
+    save_checkpoint(file_prefix, state)
+    instrumentation.count('commenti_letti', len(commenti))
+    # Stessi tipi dei dati riletti da storage (time come timestamp UTC)
+    df['time'] = pd.to_datetime(df['time'], utc=True, errors='coerce')
+    return df
 
+
+def _acquisition_completed(key):
+    """Stato del video dopo la raccolta: (completata?, commenti validi salvati)."""
+    state = load_checkpoint(key)
+    if state is None:
+        # Vecchio CSV processato senza checkpoint: già completo
+        return True, None
+    return bool(state.get('completed')), state.get('commenti_validi')
+
+
+def _acquisition_worker(queue, by_key, attempted, replies, restart=()):
+    """Prende dalla coda un video 'pending' alla volta finché ce ne sono.
+
+    attempted (condiviso dai worker): video già tentati in questo run; un video interrotto
+    torna 'pending' ma viene ripreso solo dal run successivo.
+    """
+    total = 0
+    while True:
+        jobs = queue.claim('pending', 'fetching', keys=set(by_key) - attempted)
+        if not jobs:
+            return total
+        attempted.add(jobs[0]['key'])
+        video = by_key[jobs[0]['key']]
+        try:
+            total += raccogli_e_filtra_dati(
+                video_id=video['id'],
+                file_prefix=video['key'],
+                release_date_str=video['release_date'],
+                season=video['group'],
+                heartbeat=lambda: queue.heartbeat(video['key']),
+                replies=replies,
+                restart=video['key'] in restart,
+            )
         except Exception as e:
-            print(f"[ERRORE API] Errore durante la richiesta: {e}")
-            break
-            
-    
-    # 3. Salvataggio finale solo dei dati validi
-    df_validi = pd.DataFrame(commenti_validi)
-    df_validi.to_csv(output_path_processed, index=False, encoding='utf-8')
-    
-    print(f"[SUCCESSO] Raccolta e Filtro completati per {file_prefix}.")
-    print(f"   Commenti totali letti: {commenti_totali_letti}")
-    print(f"   Commenti validi/filtrati (Inglese, Pre-uscita): {len(df_validi)}")
-    print(f"   Dati salvati in: {output_path_processed}")
-    
-    return len(df_validi)
+            queue.release(video['key'], e)
+            raise
+        completed, rows = _acquisition_completed(video['key'])
+        if completed:
+            queue.finish(video['key'], 'fetched', rows=rows)
+        else:
+            queue.release(video['key'], "raccolta interrotta (riprende dal checkpoint)")
 
 
-if __name__ == "__main__":
+def acquire_all(workers=ACQUISITION_WORKERS, groups=None, tags=None, replies=None, refetch=False):
+    """Acquisizione e filtro dei video del manifest ancora da scaricare, più video in parallelo.
+
+    groups / tags limitano i video elaborati (vedi videos.select); replies: anche le risposte;
+    refetch: riacquisisce da capo anche i video già scaricati (con RECORDER in 'replay' rifà
+    solo i filtri sulle pagine registrate).
+    """
     print("--- ESECUZIONE FASE EXTRACT & TRANSFORM: ACQUISIZIONE E FILTRO DIRETTO (API) ---")
-    
-    # Esegue il processo per S1, S2, S3, S4, S5
-    commenti_totali_filtrati = 0
-    for stagione, data in VIDEO_MAP_HYPE.items():
-        
-        count = raccogli_e_filtra_dati(
-            video_id=data['ID'],
-            file_prefix=data['FILE_PREFIX'],
-            release_date_str=data['RELEASE_DATE']
-        )
-        commenti_totali_filtrati += count
+    start = time.perf_counter()
+    manifest = videos.load()
+    by_key = {v['key']: v for v in videos.select(manifest, groups, tags)}
+    queue = job_queue.open_queue(manifest)
+    if refetch:
+        for state in ('fetched', 'scored'):
+            queue.reset(state, 'pending', keys=by_key)
+    print(f"   Modalità: {FETCH_MODE} | Pagine API: {RECORDER.mode}")
+    print(f"   Video selezionati: {len(by_key)} | Da scaricare: "
+          f"{sum(1 for j in queue.jobs() if j['key'] in by_key and j['state'] == 'pending')}")
+
+    # Ogni worker svuota la coda (il rate limiter è condiviso tra i thread)
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        attempted = set()
+        restart = set(by_key) if refetch else set()
+        futures = [pool.submit(_acquisition_worker, queue, by_key, attempted, replies, restart)
+                   for _ in range(max(1, workers))]
+        try:
+            commenti_totali_filtrati = sum(f.result() for f in futures)
+        finally:
+            get_language_identifier().close()
+            close_reply_pool()
 
     print(f"\n[RISULTATO FINALE] TOTALE Commenti Pre-uscita & Inglese raccolti: {commenti_totali_filtrati}")
-    print("\n--- data_acquisitiond.py COMPLETATO ---")
\ No newline at end of file
+    RATE_LIMITER.report()
+    RECORDER.report()
+    get_language_identifier().report()
+    queue.report()
+    queue.close()
+    instrumentation.record('api', {'requests': RATE_LIMITER.requests, 'quota_units': RATE_LIMITER.units_used,
+                                   'daily_quota': RATE_LIMITER.daily_quota, 'fetch_mode': FETCH_MODE,
+                                   'pages_mode': RECORDER.mode, **{f"pages_{k}": v for k, v in RECORDER.stats.items()}})
+    instrumentation.record('language_id', dict(get_language_identifier().stats))
+    print(f"   Tempo totale: {time.perf_counter() - start:.1f}s")
+    print("\n--- data_acquisitiond.py COMPLETATO ---")
+    return commenti_totali_filtrati
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Acquisizione e filtro dei commenti dei trailer.")
+    parser.add_argument('--workers', type=int, default=ACQUISITION_WORKERS, help="Video scaricati in contemporanea")
+    parser.add_argument('--lang-workers', type=int, default=LANGUAGE_WORKERS, help="Processi per il rilevamento lingua")
+    parser.add_argument('--profile', help="Stadio da registrare con cProfile (es. acquisizione.filtri)")
+    parser.add_argument('--groups', nargs='+', help="Solo i video di questi gruppi del manifest (es. S1 S2)")
+    parser.add_argument('--tags', nargs='+', help="Solo i video con almeno uno di questi tag")
+    parser.add_argument('--replies', action='store_true', help="Scarica anche le risposte ai commenti")
+    parser.add_argument('--fetch-mode', choices=FETCH_MODES, default=FETCH_MODE,
+                        help="minimal: solo i campi usati, una sessione HTTP gzip; full: snippet completo")
+    parser.add_argument('--api-pages', choices=MODES, default=RECORDER.mode,
+                        help="Registra le pagine dell'API su disco (record) o riproducile senza rete (replay)")
+    parser.add_argument('--refetch', action='store_true', help="Riacquisisce da capo anche i video già scaricati")
+    args = parser.parse_args()
+    LANGUAGE_WORKERS = args.lang_workers
+    FETCH_MODE = args.fetch_mode
+    RECORDER = PageRecorder(args.api_pages)
+    instrumentation.start_run('data_acquisition', profile_stage=args.profile)
+    try:
+        acquire_all(workers=args.workers, groups=args.groups, tags=args.tags, replies=args.replies or None,
+                    refetch=args.refetch)
+    finally:
+        instrumentation.finish_run()
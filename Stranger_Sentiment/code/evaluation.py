@@ -0,0 +1,130 @@
+import warnings
+
+import numpy as np
+import pandas as pd
+
+# --- VALUTAZIONE SU SOGLIE E BACKEND DAGLI SCORE SALVATI ---
+# Le previsioni di validazione vengono salvate con Sentiment_Score (probabilità dell'etichetta
+# prevista): soglie di astensione e backend diversi si valutano senza rieseguire il modello.
+#
+# Sotto la soglia il commento è NEUTRAL (astensione). Per ogni modello le matrici di confusione
+# (etichetta reale x etichetta prevista + astensione) di tutte le soglie e di tutti i campioni
+# bootstrap si ottengono con una moltiplicazione di matrici: pesi bootstrap (campioni x righe)
+# per indicatori di cella (righe x soglie). Gli stessi campioni bootstrap sono usati per tutti
+# i modelli, così gli intervalli sono confrontabili (bootstrap appaiato).
+#
+#   coverage  : quota di commenti non astenuti
+#   accuracy  : accuratezza sui commenti non astenuti
+#   precision : corretti / previsti con l'etichetta
+#   recall    : corretti / reali con l'etichetta (le astensioni contano come errori)
+
+LABELS = ('POSITIVE', 'NEGATIVE')
+ABSTAIN = 'NEUTRAL'
+THRESHOLDS = tuple(round(t, 2) for t in np.arange(0.5, 1.0, 0.05))
+BOOTSTRAP_SAMPLES = 1000
+CONFIDENCE = 0.95
+SEED = 0
+METRICS = ('coverage', 'accuracy', 'macro_f1')
+LABEL_METRICS = ('precision', 'recall', 'f1')
+
+
+def confusion_matrices(y_true, y_pred, scores, thresholds, weights):
+    """Matrici di confusione pesate, forma (len(weights), len(thresholds), L, L + 1).
+
+    weights: matrice (campioni x righe) di quante volte ogni riga entra nel campione;
+    l'ultima colonna delle matrici conta le astensioni.
+    """
+    n_labels = len(LABELS)
+    index = {label: i for i, label in enumerate(LABELS)}
+    true_idx = np.array([index[t] for t in y_true], dtype=np.int64)
+    pred_idx = np.array([index.get(p, n_labels) for p in y_pred], dtype=np.int64)
+    scores = np.nan_to_num(np.asarray(scores, dtype=float), nan=-np.inf)
+
+    predicted = np.where(scores[None, :] >= np.asarray(thresholds)[:, None], pred_idx, n_labels)
+    cells = true_idx * (n_labels + 1) + predicted  # (soglie, righe)
+
+    out = np.empty((len(weights), len(thresholds), n_labels * (n_labels + 1)))
+    for cell in range(out.shape[-1]):
+        out[:, :, cell] = weights @ (cells == cell).T
+    return out.reshape(len(weights), len(thresholds), n_labels, n_labels + 1)
+
+
+def _metrics(cm):
+    """Metriche per ogni campione e soglia dalle matrici di confusione."""
+    n_labels = len(LABELS)
+    tp = np.diagonal(cm[..., :n_labels], axis1=-2, axis2=-1)
+    support = cm.sum(axis=-1)
+    predicted = cm[..., :n_labels].sum(axis=-2)
+    covered = predicted.sum(axis=-1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        precision = np.where(predicted > 0, tp / predicted, 0.0)
+        recall = np.where(support > 0, tp / support, 0.0)
+        f1 = np.where(precision + recall > 0, 2 * precision * recall / (precision + recall), 0.0)
+        accuracy = np.where(covered > 0, tp.sum(axis=-1) / covered, np.nan)
+    return {
+        'coverage': covered / support.sum(axis=-1),
+        'accuracy': accuracy,
+        'macro_f1': f1.mean(axis=-1),
+        'precision': precision,
+        'recall': recall,
+        'f1': f1,
+    }
+
+
+def _interval(values, confidence):
+    """Valore sul campione originale (riga 0) e intervallo percentile sui campioni bootstrap."""
+    alpha = (1 - confidence) / 2 * 100
+    if len(values) > 1:
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', RuntimeWarning)  # Soglie senza commenti coperti: NaN
+            low, high = np.nanpercentile(values[1:], [alpha, 100 - alpha], axis=0)
+    else:
+        low = high = np.full(values.shape[1:], np.nan)
+
+    def as_list(a):
+        return [None if np.isnan(v) else float(v) for v in a]
+    return {'value': as_list(values[0]), 'low': as_list(low), 'high': as_list(high)}
+
+
+def evaluate(y_true, predictions, thresholds=THRESHOLDS, n_boot=BOOTSTRAP_SAMPLES, confidence=CONFIDENCE, seed=SEED):
+    """Metriche con intervalli bootstrap per ogni modello e soglia.
+
+    predictions: {nome: (etichette, score)} sulle stesse righe di y_true.
+    """
+    y_true = np.asarray(y_true, dtype=str)
+    n = len(y_true)
+    rng = np.random.default_rng(seed)
+    # Riga 0: il campione originale (peso 1 a ogni riga), poi i campioni bootstrap
+    weights = np.vstack([np.ones((1, n)), rng.multinomial(n, np.full(n, 1 / n), size=n_boot)]) if n else np.ones((1, 0))
+
+    result = {
+        'n': int(n), 'labels': list(LABELS), 'abstain_label': ABSTAIN, 'thresholds': [float(t) for t in thresholds],
+        'bootstrap_samples': int(n_boot), 'confidence': confidence, 'models': {},
+    }
+    for name, (labels, scores) in predictions.items():
+        cm = confusion_matrices(y_true, np.asarray(labels, dtype=object), scores, thresholds, weights)
+        metrics = _metrics(cm)
+        result['models'][name] = {
+            'confusion_matrices': np.rint(cm[0]).astype(int).tolist(),
+            **{metric: _interval(metrics[metric], confidence) for metric in METRICS},
+            'per_label': {
+                label: {metric: _interval(metrics[metric][..., i], confidence) for metric in LABEL_METRICS}
+                for i, label in enumerate(LABELS)
+            },
+        }
+    return result
+
+
+def evaluation_frame(evaluation):
+    """Tabella lunga model / threshold / metric / value / low / high per grafici e CSV."""
+    rows = []
+    for name, model in (evaluation or {}).get('models', {}).items():
+        series = {metric: model[metric] for metric in METRICS}
+        for label, per_label in model['per_label'].items():
+            series.update({f"{metric}_{label}": per_label[metric] for metric in LABEL_METRICS})
+        for metric, ci in series.items():
+            for i, threshold in enumerate(evaluation['thresholds']):
+                rows.append({'model': name, 'threshold': threshold, 'metric': metric,
+                             'value': ci['value'][i], 'low': ci['low'][i], 'high': ci['high'][i]})
+    df = pd.DataFrame(rows, columns=['model', 'threshold', 'metric', 'value', 'low', 'high'])
+    return df.astype({'value': float, 'low': float, 'high': float})
@@ -0,0 +1,96 @@
+import os
+import re
+
+# --- BACKEND DI INFERENZA ---
+# Tutti i backend restituiscono un oggetto con la stessa interfaccia di transformers.pipeline:
+#   pipe(testi, truncation=True, max_length=512, batch_size=N) -> [{'label': ..., 'score': ...}, ...]
+#   pipe.tokenizer
+# così sentiment_processor può usarli in modo intercambiabile.
+#
+#   pytorch   : pipeline transformers originale (precisione piena, GPU se disponibile)
+#   quantized : stesso modello con i layer Linear quantizzati dinamicamente in int8 (solo CPU)
+#   onnx      : modello esportato in ONNX ed eseguito con ONNX Runtime (solo CPU)
+BACKENDS = ('pytorch', 'quantized', 'onnx')
+DEFAULT_BACKEND = 'pytorch'
+
+
+def _softmax(logits):
+    import numpy as np
+    shifted = logits - logits.max(axis=1, keepdims=True)
+    exp = np.exp(shifted)
+    return exp / exp.sum(axis=1, keepdims=True)
+
+
+class OnnxSentimentPipeline:
+    """Classificatore ONNX Runtime con la stessa interfaccia della pipeline transformers."""
+
+    def __init__(self, onnx_path, tokenizer, id2label):
+        import onnxruntime as ort
+        self.session = ort.InferenceSession(onnx_path, providers=['CPUExecutionProvider'])
+        self.input_names = {i.name for i in self.session.get_inputs()}
+        self.tokenizer = tokenizer
+        self.id2label = {int(k): v for k, v in id2label.items()}
+
+    def __call__(self, texts, truncation=True, max_length=512, batch_size=None, **kwargs):
+        batch = [texts] if isinstance(texts, str) else list(texts)
+        step = batch_size or len(batch) or 1
+        results = []
+        for start in range(0, len(batch), step):
+            encoded = self.tokenizer(batch[start:start + step], truncation=truncation, max_length=max_length,
+                                     padding=True, return_tensors='np')
+            feeds = {name: values.astype('int64') for name, values in encoded.items() if name in self.input_names}
+            probs = _softmax(self.session.run(['logits'], feeds)[0])
+            for row in probs:
+                best = int(row.argmax())
+                results.append({'label': self.id2label[best], 'score': float(row[best])})
+        return results
+
+
+def _onnx_path(model_name, onnx_dir):
+    safe_name = re.sub(r'[^A-Za-z0-9_.-]+', '_', model_name)
+    return os.path.join(onnx_dir, f"{safe_name}.onnx")
+
+
+def _export_onnx(model, tokenizer, onnx_path):
+    """Esporta il modello in ONNX (una sola volta: il file viene riutilizzato ai run successivi)."""
+    import torch
+    os.makedirs(os.path.dirname(onnx_path), exist_ok=True)
+    sample = tokenizer(["export sample"], return_tensors='pt')
+    dynamic = {0: 'batch', 1: 'sequence'}
+    torch.onnx.export(
+        model,
+        (sample['input_ids'], sample['attention_mask']),
+        onnx_path,
+        input_names=['input_ids', 'attention_mask'],
+        output_names=['logits'],
+        dynamic_axes={'input_ids': dynamic, 'attention_mask': dynamic, 'logits': {0: 'batch'}},
+        opset_version=17,
+        dynamo=False,
+    )
+
+
+def build_pipeline(backend, model_name, device=-1, onnx_dir=None):
+    """Costruisce il classificatore per il backend richiesto."""
+    if backend not in BACKENDS:
+        raise ValueError(f"Backend sconosciuto '{backend}'. Disponibili: {', '.join(BACKENDS)}")
+
+    from transformers import pipeline, AutoTokenizer, AutoModelForSequenceClassification
+
+    if backend == 'pytorch':
+        return pipeline("sentiment-analysis", model=model_name, device=device)
+
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    model = AutoModelForSequenceClassification.from_pretrained(model_name).eval()
+
+    if backend == 'quantized':
+        import torch
+        from torch.ao.quantization import quantize_dynamic
+        quantized = quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        return pipeline("sentiment-analysis", model=quantized, tokenizer=tokenizer, device=-1)
+
+    # backend == 'onnx'
+    onnx_path = _onnx_path(model_name, onnx_dir or '.')
+    if not os.path.exists(onnx_path):
+        print(f"[MODELLO] Esportazione ONNX di {model_name} in {onnx_path}...")
+        _export_onnx(model, tokenizer, onnx_path)
+    return OnnxSentimentPipeline(onnx_path, tokenizer, model.config.id2label)
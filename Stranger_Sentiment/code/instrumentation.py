@@ -0,0 +1,250 @@
+import os
+import sys
+import json
+import time
+import pstats
+import cProfile
+import threading
+import functools
+from datetime import datetime
+
+# --- STRUMENTAZIONE DEI RUN ---
+# Strato leggero comune a acquisizione, analisi e campionamento:
+#   - timer(stage): context manager o decoratore che somma tempi, chiamate e item per stadio
+#   - count(nome, n): contatori liberi (pagine API, righe scartate, ...)
+#   - record(sezione, dati, key): dati strutturati da allegare al manifest (es. statistiche dei filtri)
+#   - un thread campiona l'RSS e tiene il picco del run e di ogni stadio attivo
+#   - STRANGER_PROFILE=<stadio> (o cli.py --profile) registra con cProfile quello stadio
+# A fine run il manifest JSON va in data/results/runs/ (letto dal tab "Operazioni" dell'app).
+#
+# I thread di acquisizione sommano i propri tempi nello stesso stadio: con più video in
+# parallelo i secondi di uno stadio possono superare la durata del run.
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RUNS_DIR = os.path.join(BASE_DIR, 'data', 'results', 'runs')
+RUNS_KEEP = 50             # Manifest conservati (i più vecchi vengono eliminati)
+MEMORY_SAMPLE_SECONDS = 0.05
+
+
+def _rss_bytes():
+    """RSS attuale del processo (Linux: /proc; altrove il picco di getrusage)."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == 'darwin' else peak * 1024
+
+
+class PeakRSS:
+    """Campiona l'RSS in un thread durante il blocco with e ne tiene il massimo."""
+
+    def __init__(self, interval=0.01, on_sample=None):
+        self.interval = interval
+        self.on_sample = on_sample
+        self.peak = 0
+        self._stop = threading.Event()
+
+    def _sample(self):
+        while not self._stop.is_set():
+            rss = _rss_bytes()
+            self.peak = max(self.peak, rss)
+            if self.on_sample:
+                self.on_sample(rss)
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self.peak = _rss_bytes()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, _rss_bytes())
+
+
+class Run:
+    """Metriche di un'esecuzione (un comando della pipeline)."""
+
+    def __init__(self, command, profile_stage=None):
+        self.command = command
+        self.started_at = datetime.now()
+        self.stages = {}
+        self.counters = {}
+        self.sections = {}
+        self.profile_stage = profile_stage
+        self.profile_path = None
+        self._profilers = {}  # thread -> [cProfile.Profile, profondità] (cProfile è per thread)
+        self._active = {}  # stadio -> numero di timer aperti (anche da thread diversi)
+        self._lock = threading.Lock()
+        self._start = time.perf_counter()
+        self._memory = PeakRSS(MEMORY_SAMPLE_SECONDS, on_sample=self._on_memory_sample)
+
+    def _stage(self, name):
+        return self.stages.setdefault(name, {'seconds': 0.0, 'calls': 0, 'items': 0, 'peak_rss_mb': 0.0})
+
+    def _on_memory_sample(self, rss):
+        with self._lock:
+            for name in self._active:
+                stage = self._stage(name)
+                stage['peak_rss_mb'] = max(stage['peak_rss_mb'], rss / 2 ** 20)
+
+    def _enter(self, name):
+        with self._lock:
+            self._active[name] = self._active.get(name, 0) + 1
+            stage = self._stage(name)
+            stage['peak_rss_mb'] = max(stage['peak_rss_mb'], _rss_bytes() / 2 ** 20)
+        if name == self.profile_stage:
+            entry = self._profilers.setdefault(threading.get_ident(), [cProfile.Profile(), 0])
+            entry[1] += 1
+            if entry[1] == 1:
+                try:
+                    entry[0].enable()
+                except ValueError:  # Un altro profiler è già attivo in questo processo
+                    pass
+
+    def _exit(self, name, seconds, items):
+        if name == self.profile_stage:
+            entry = self._profilers[threading.get_ident()]
+            entry[1] -= 1
+            if entry[1] == 0:
+                entry[0].disable()
+        with self._lock:
+            stage = self._stage(name)
+            stage['seconds'] += seconds
+            stage['calls'] += 1
+            stage['items'] += items
+            self._active[name] -= 1
+            if not self._active[name]:
+                del self._active[name]
+
+    def count(self, name, n=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def record(self, section, data, key=None):
+        with self._lock:
+            if key is None:
+                self.sections[section] = data
+            else:
+                self.sections.setdefault(section, {})[key] = data
+
+    def manifest(self):
+        seconds = time.perf_counter() - self._start
+        stages = {}
+        for name, s in sorted(self.stages.items()):
+            stages[name] = {**s, 'items_per_sec': s['items'] / s['seconds'] if s['items'] and s['seconds'] else None}
+        return {
+            'command': self.command,
+            'argv': sys.argv[1:],
+            'started_at': self.started_at.isoformat(timespec='seconds'),
+            'finished_at': datetime.now().isoformat(timespec='seconds'),
+            'seconds': seconds,
+            'peak_rss_mb': self._memory.peak / 2 ** 20,
+            'stages': stages,
+            'counters': dict(sorted(self.counters.items())),
+            'profile': {'stage': self.profile_stage, 'path': self.profile_path} if self.profile_stage else None,
+            **self.sections,
+        }
+
+
+class timer:
+    """Misura uno stadio: `with timer('inferenza') as t: ...; t.items += n` oppure `@timer('stadio')`."""
+
+    def __init__(self, stage, items=0):
+        self.stage = stage
+        self.items = items
+
+    def __enter__(self):
+        self._run = current_run()
+        self._run._enter(self.stage)
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self._run._exit(self.stage, time.perf_counter() - self._start, self.items)
+
+    def __call__(self, func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with timer(self.stage):
+                return func(*args, **kwargs)
+        return wrapper
+
+
+_run = None
+
+
+def current_run():
+    """Run attivo (senza start_run le metriche si raccolgono comunque, ma non vengono salvate)."""
+    global _run
+    if _run is None:
+        _run = Run('interactive')
+    return _run
+
+
+def count(name, n=1):
+    current_run().count(name, n)
+
+
+def record(section, data, key=None):
+    """Allega dati al manifest (con key: una voce della sezione, es. i filtri di un video)."""
+    current_run().record(section, data, key)
+
+
+def start_run(command, profile_stage=None):
+    global _run
+    _run = Run(command, profile_stage or os.environ.get('STRANGER_PROFILE') or None)
+    _run._memory.__enter__()
+    return _run
+
+
+def _prune_runs():
+    manifests = sorted(f for f in os.listdir(RUNS_DIR) if f.endswith('.json'))
+    for name in manifests[:-RUNS_KEEP]:
+        os.remove(os.path.join(RUNS_DIR, name))
+        profile = os.path.join(RUNS_DIR, name[:-len('.json')] + '.prof')
+        if os.path.exists(profile):
+            os.remove(profile)
+
+
+def finish_run():
+    """Chiude il run attivo e ne scrive il manifest; restituisce il percorso del file."""
+    global _run
+    run, _run = _run, None
+    if run is None:
+        return None
+    run._memory.__exit__(None, None, None)
+
+    os.makedirs(RUNS_DIR, exist_ok=True)
+    run_id = f"{run.started_at.strftime('%Y%m%d-%H%M%S')}-{run.command}"
+    profiles = [profiler for profiler, _ in run._profilers.values() if profiler.getstats()]
+    if profiles:
+        # I profili dei singoli thread vengono uniti in un unico file
+        run.profile_path = os.path.join(RUNS_DIR, f"{run_id}.prof")
+        pstats.Stats(*profiles).dump_stats(run.profile_path)
+
+    path = os.path.join(RUNS_DIR, f"{run_id}.json")
+    with open(path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump({'run_id': run_id, **run.manifest()}, f, indent=2)
+    os.replace(path + '.tmp', path)
+    _prune_runs()
+    print(f"[RUN] Manifest salvato in: {path}")
+    if run.profile_path:
+        print(f"[RUN] Profilo di '{run.profile_stage}': {run.profile_path} (python -m pstats)")
+    return path
+
+
+def list_runs():
+    """Manifest salvati, dal più recente."""
+    if not os.path.isdir(RUNS_DIR):
+        return []
+    return sorted((os.path.join(RUNS_DIR, f) for f in os.listdir(RUNS_DIR) if f.endswith('.json')), reverse=True)
+
+
+def load_manifest(path):
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
@@ -0,0 +1,211 @@
+import os
+import json
+import time
+import socket
+import sqlite3
+import threading
+import contextlib
+
+import storage
+
+# --- CODA PERSISTENTE DEI JOB PER VIDEO ---
+# Ogni video del manifest (videos.py) ha un job con uno stato:
+#
+#   pending -> fetching -> fetched -> scoring -> scored
+#
+# Acquisizione e analisi prendono i job con claim(), che passa atomicamente lo stato da
+# quello di partenza a quello "in corso" (BEGIN IMMEDIATE): più thread e più processi
+# (es. 'acquire' e 'analyze' lanciati insieme) possono svuotare la coda senza prendere
+# due volte lo stesso video. Un job interrotto torna allo stato precedente con l'errore;
+# uno rimasto "in corso" senza aggiornamenti per STALE_AFTER_SECONDS (processo terminato)
+# viene rimesso in coda da reset_stale().
+#
+# sync() allinea la coda al manifest: i video nuovi entrano come pending (o fetched se i
+# loro dati erano già stati scaricati prima della coda), quelli con un id cambiato
+# ripartono da pending, quelli tolti dal manifest escono dalla coda (i dati restano su disco).
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+QUEUE_FILE = os.path.join(BASE_DIR, 'data', 'jobs.sqlite')  # Con path=None, letto a ogni chiamata
+STATES = ('pending', 'fetching', 'fetched', 'scoring', 'scored')
+IN_PROGRESS = {'fetching': 'pending', 'scoring': 'fetched'}  # Stato "in corso" -> stato da cui riprendere
+STALE_AFTER_SECONDS = 30 * 60
+
+_COLUMNS = ('key', 'video_id', 'grp', 'state', 'attempts', 'worker', 'error', 'rows', 'updated_at')
+
+
+def worker_name():
+    """Identificativo del worker corrente (host, processo e thread)."""
+    return f"{socket.gethostname()}:{os.getpid()}:{threading.current_thread().name}"
+
+
+def _already_acquired(key):
+    """Dati scaricati prima della coda: checkpoint completato o vecchio CSV processato."""
+    checkpoint = os.path.join(storage.DATASETS['processed'], f"{key}_checkpoint.json")
+    if os.path.exists(checkpoint):
+        try:
+            with open(checkpoint, encoding='utf-8') as f:
+                return bool(json.load(f).get('completed'))
+        except (OSError, ValueError):
+            return False
+    return storage.exists('processed', key)
+
+
+class JobQueue:
+    """Coda SQLite condivisa da thread e processi (una connessione per oggetto, protetta da lock)."""
+
+    def __init__(self, path=None):
+        path = path or QUEUE_FILE
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        # isolation_level=None: le transazioni sono aperte esplicitamente (BEGIN IMMEDIATE)
+        self.conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " key TEXT PRIMARY KEY, video_id TEXT NOT NULL, grp TEXT NOT NULL, state TEXT NOT NULL,"
+            " attempts INTEGER NOT NULL DEFAULT 0, worker TEXT, error TEXT, rows INTEGER,"
+            " updated_at REAL NOT NULL)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_state ON jobs(state)")
+
+    @contextlib.contextmanager
+    def _immediate(self):
+        """Transazione che blocca subito gli altri scrittori (thread e processi)."""
+        with self._lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield self.conn
+                self.conn.execute("COMMIT")
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+
+    def _transaction(self, statements):
+        """Esegue [(sql, parametri), ...] in un'unica transazione."""
+        with self._immediate() as conn:
+            return [conn.execute(sql, params).fetchall() for sql, params in statements]
+
+    def sync(self, videos):
+        """Allinea la coda al manifest; restituisce quanti job sono stati aggiunti, riavviati e rimossi."""
+        now = time.time()
+        with self._immediate() as conn:
+            current = dict(conn.execute("SELECT key, video_id FROM jobs").fetchall())
+            added = restarted = 0
+            for video in videos:
+                key = video['key']
+                if key not in current:
+                    state = 'fetched' if _already_acquired(key) else 'pending'
+                    conn.execute("INSERT INTO jobs (key, video_id, grp, state, updated_at) VALUES (?, ?, ?, ?, ?)",
+                                 (key, video['id'], video['group'], state, now))
+                    added += 1
+                elif current[key] != video['id']:
+                    conn.execute("UPDATE jobs SET video_id = ?, grp = ?, state = 'pending', attempts = 0, worker = NULL,"
+                                 " error = NULL, rows = NULL, updated_at = ? WHERE key = ?",
+                                 (video['id'], video['group'], now, key))
+                    restarted += 1
+                else:
+                    conn.execute("UPDATE jobs SET grp = ? WHERE key = ?", (video['group'], key))
+            removed = set(current) - {v['key'] for v in videos}
+            conn.executemany("DELETE FROM jobs WHERE key = ?", [(k,) for k in removed])
+        return {'added': added, 'restarted': restarted, 'removed': len(removed)}
+
+    def claim(self, from_state, to_state, limit=1, keys=None, worker=None):
+        """Prende fino a limit job in from_state (nell'ordine di inserimento) passandoli a to_state."""
+        worker = worker or worker_name()
+        with self._immediate() as conn:
+            rows = conn.execute(f"SELECT {', '.join(_COLUMNS)} FROM jobs WHERE state = ? ORDER BY rowid",
+                                (from_state,)).fetchall()
+            jobs = [dict(zip(_COLUMNS, r)) for r in rows if keys is None or r[0] in keys][:limit]
+            now = time.time()
+            conn.executemany("UPDATE jobs SET state = ?, worker = ?, updated_at = ? WHERE key = ?",
+                             [(to_state, worker, now, job['key']) for job in jobs])
+        for job in jobs:
+            job.update(state=to_state, worker=worker)
+        return jobs
+
+    def finish(self, key, state, rows=None):
+        """Job completato: nuovo stato, righe prodotte, errore azzerato."""
+        self._transaction([(
+            "UPDATE jobs SET state = ?, rows = COALESCE(?, rows), error = NULL, worker = NULL, updated_at = ?"
+            " WHERE key = ?", (state, rows, time.time(), key))])
+
+    def release(self, key, error):
+        """Job interrotto: torna allo stato da cui riprendere, con l'errore e un tentativo in più."""
+        self._transaction([(
+            "UPDATE jobs SET state = CASE state WHEN 'fetching' THEN 'pending' WHEN 'scoring' THEN 'fetched'"
+            " ELSE state END, attempts = attempts + 1, error = ?, worker = NULL, updated_at = ? WHERE key = ?",
+            (str(error)[:500], time.time(), key))])
+
+    def heartbeat(self, key):
+        """Segnala che il job è ancora in lavorazione (evita che reset_stale lo rimetta in coda)."""
+        self._transaction([("UPDATE jobs SET updated_at = ? WHERE key = ?", (time.time(), key))])
+
+    def reset_stale(self, max_age=STALE_AFTER_SECONDS):
+        """Rimette in coda i job "in corso" senza aggiornamenti da max_age secondi."""
+        now = time.time()
+        results = self._transaction(
+            [("SELECT COUNT(*) FROM jobs WHERE state IN (?, ?) AND updated_at < ?", (*IN_PROGRESS, now - max_age))]
+            + [("UPDATE jobs SET state = ?, worker = NULL, error = 'worker interrotto', updated_at = ?"
+                " WHERE state = ? AND updated_at < ?", (back, now, busy, now - max_age))
+               for busy, back in IN_PROGRESS.items()])
+        return results[0][0][0]
+
+    def reset(self, from_state, to_state, keys=None):
+        """Sposta i job da from_state a to_state (es. scored -> fetched per rianalizzare)."""
+        now = time.time()
+        if keys is None:
+            self._transaction([("UPDATE jobs SET state = ?, updated_at = ? WHERE state = ?", (to_state, now, from_state))])
+        else:
+            self._transaction([("UPDATE jobs SET state = ?, updated_at = ? WHERE state = ? AND key = ?",
+                                (to_state, now, from_state, key)) for key in keys])
+
+    def counts(self):
+        """Numero di job per stato (tutti gli stati, anche a zero)."""
+        with self._lock:
+            found = dict(self.conn.execute("SELECT state, COUNT(*) FROM jobs GROUP BY state").fetchall())
+        return {state: found.get(state, 0) for state in STATES}
+
+    def jobs(self):
+        """Tutti i job (dizionari), nell'ordine di inserimento."""
+        with self._lock:
+            rows = self.conn.execute(f"SELECT {', '.join(_COLUMNS)} FROM jobs ORDER BY rowid").fetchall()
+        return [dict(zip(_COLUMNS, r)) for r in rows]
+
+    def report(self):
+        counts = self.counts()
+        print("[CODA] " + " | ".join(f"{state}: {n}" for state, n in counts.items()))
+
+    def close(self):
+        self.conn.close()
+
+
+def read_jobs(path=None):
+    """Job e conteggi per stato in sola lettura (es. dashboard), senza creare la coda né prendere lock di scrittura.
+
+    Restituisce (job, conteggi), oppure None se la coda non esiste ancora.
+    """
+    path = path or QUEUE_FILE
+    if not os.path.exists(path):
+        return None
+    try:
+        conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True, timeout=30)
+        try:
+            rows = conn.execute(f"SELECT {', '.join(_COLUMNS)} FROM jobs ORDER BY rowid").fetchall()
+        finally:
+            conn.close()
+    except sqlite3.OperationalError:
+        return None  # File appena creato da un worker, tabella non ancora presente
+    jobs = [dict(zip(_COLUMNS, r)) for r in rows]
+    return jobs, {state: sum(job['state'] == state for job in jobs) for state in STATES}
+
+
+def open_queue(videos, path=None):
+    """Coda allineata al manifest, con i job orfani (worker terminati) rimessi in coda."""
+    queue = JobQueue(path)
+    changes = queue.sync(videos)
+    stale = queue.reset_stale()
+    if any(changes.values()) or stale:
+        print(f"[CODA] Nuovi: {changes['added']} | Riavviati: {changes['restarted']} | "
+              f"Rimossi: {changes['removed']} | Rimessi in coda: {stale}")
+    return queue
@@ -0,0 +1,179 @@
+import os
+import abc
+import time
+import threading
+import multiprocessing
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+# --- IDENTIFICAZIONE DELLA LINGUA A BATCH ---
+# Stadio separato dal ciclo di download:
+# - detector intercambiabile (default: langdetect con DetectorFactory.seed = 0)
+# - memo per testo normalizzato: spam e commenti brevi ripetuti vengono analizzati una volta
+# - pool di processi per i batch (langdetect è Python puro e occupa un core per commento)
+# - scorciatoia invariata: meno di 3 parole -> non inglese, senza chiamare il detector
+
+
+class LanguageDetector(abc.ABC):
+    """Interfaccia dei detector: detect(testo) -> codice lingua ('en', 'it', ...) o None."""
+    name = 'base'
+
+    @abc.abstractmethod
+    def detect(self, text):
+        """Codice della lingua del testo, o None se non si riesce a rilevarla."""
+
+
+# Il caricamento pigro dei profili di langdetect non è thread-safe: un thread può vedere la
+# factory globale prima che i profili siano caricati (errore -> testo scartato come non inglese)
+_langdetect_lock = threading.Lock()
+
+
+class LangdetectDetector(LanguageDetector):
+    name = 'langdetect'
+
+    def __init__(self):
+        from langdetect import DetectorFactory
+        from langdetect.detector_factory import init_factory
+        # Imposta la seed per la riproducibilità di langdetect
+        DetectorFactory.seed = 0
+        with _langdetect_lock:
+            init_factory()
+
+    def detect(self, text):
+        from langdetect import detect
+        try:
+            return detect(text)
+        except Exception:
+            return None
+
+
+DETECTORS = {
+    'langdetect': LangdetectDetector,
+}
+DEFAULT_DETECTOR = 'langdetect'
+
+
+def normalize_text(text):
+    """Chiave del memo: gli spazi ripetuti non cambiano la lingua rilevata."""
+    return ' '.join(text.split())
+
+
+def is_too_short(text):
+    return not text or len(text.split()) < 3
+
+
+# Detector del processo worker (creato una volta per processo)
+_worker_detector = None
+
+
+def _init_worker(detector_name):
+    global _worker_detector
+    _worker_detector = DETECTORS[detector_name]()
+
+
+def _detect_chunk(texts):
+    return [_worker_detector.detect(t) for t in texts]
+
+
+class LanguageIdentifier:
+    """Decide a batch se i commenti sono nella lingua obiettivo (thread-safe)."""
+
+    def __init__(self, detector=DEFAULT_DETECTOR, target='en', workers=1, chunk_size=25, memo_size=200_000):
+        if detector not in DETECTORS:
+            raise ValueError(f"Detector sconosciuto '{detector}'. Disponibili: {', '.join(DETECTORS)}")
+        self.detector_name = detector
+        self.target = target
+        self.workers = max(1, workers)
+        self.chunk_size = chunk_size
+        self.memo_size = memo_size
+        self._memo = OrderedDict()
+        self._lock = threading.Lock()
+        self._detector = None
+        self._pool = None
+        self.stats = {'texts': 0, 'short': 0, 'memo_hits': 0, 'detected': 0, 'seconds': 0.0}
+
+    def _get_pool(self):
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context('spawn'),
+                    initializer=_init_worker,
+                    initargs=(self.detector_name,)
+                )
+            return self._pool
+
+    def _detect_many(self, texts):
+        if self.workers > 1 and len(texts) > self.chunk_size:
+            chunks = [texts[i:i + self.chunk_size] for i in range(0, len(texts), self.chunk_size)]
+            return [lang for chunk in self._get_pool().map(_detect_chunk, chunks) for lang in chunk]
+        if self._detector is None:
+            self._detector = DETECTORS[self.detector_name]()
+        return [self._detector.detect(t) for t in texts]
+
+    def is_target_batch(self, texts):
+        """Lista di bool (stesso ordine di texts): True se il testo è nella lingua obiettivo."""
+        texts = list(texts)
+        decisions = [False] * len(texts)
+        pending = OrderedDict()  # testo normalizzato -> posizioni
+        short = memo_hits = 0
+
+        with self._lock:
+            for i, text in enumerate(texts):
+                if is_too_short(text):
+                    short += 1
+                    continue
+                key = normalize_text(text)
+                if key in self._memo:
+                    self._memo.move_to_end(key)
+                    decisions[i] = self._memo[key]
+                    memo_hits += 1
+                else:
+                    pending.setdefault(key, []).append(i)
+
+        start = time.perf_counter()
+        # Si analizza il testo originale della prima occorrenza: stesse decisioni di prima
+        langs = self._detect_many([texts[idx[0]] for idx in pending.values()]) if pending else []
+        elapsed = time.perf_counter() - start
+
+        with self._lock:
+            for (key, idx), lang in zip(pending.items(), langs):
+                ok = lang == self.target
+                for i in idx:
+                    decisions[i] = ok
+                self._memo[key] = ok
+                if len(self._memo) > self.memo_size:
+                    self._memo.popitem(last=False)
+            self.stats['texts'] += len(texts)
+            self.stats['short'] += short
+            self.stats['memo_hits'] += memo_hits + sum(len(idx) - 1 for idx in pending.values())
+            self.stats['detected'] += len(pending)
+            self.stats['seconds'] += elapsed
+        return decisions
+
+    def is_target(self, text):
+        return self.is_target_batch([text])[0]
+
+    def throughput(self):
+        """Testi analizzati dal detector al secondo (esclusi memo e scorciatoie)."""
+        return self.stats['detected'] / self.stats['seconds'] if self.stats['seconds'] else 0.0
+
+    def report(self):
+        s = self.stats
+        print(f"   Rilevamento lingua ({self.detector_name}, {self.workers} processi): {s['texts']} testi, "
+              f"{s['short']} troppo brevi, {s['memo_hits']} dal memo, {s['detected']} analizzati "
+              f"in {s['seconds']:.1f}s ({self.throughput():.0f} testi/s)")
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+
+def default_workers():
+    """Un core resta al thread di download/scrittura."""
+    try:
+        cores = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cores = os.cpu_count() or 1
+    return max(1, cores - 1)
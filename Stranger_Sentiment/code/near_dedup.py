@@ -0,0 +1,193 @@
+import re
+import html
+
+import numpy as np
+import pandas as pd
+
+# --- RILEVAMENTO DEI QUASI-DUPLICATI (MinHash + LSH) ---
+# Spam copiato, varianti di "who's here after the trailer dropped" e flood di bot vengono
+# raggruppati in cluster: si classifica un solo rappresentante per cluster e l'etichetta
+# viene riportata su tutte le righe (colonna cluster_id).
+#
+#   1. normalizzazione: minuscole, entità HTML e tag rimossi, solo lettere/cifre, spazi compattati
+#   2. shingle: n-grammi di SHINGLE_BYTES byte del testo normalizzato (vettorizzati con NumPy)
+#   3. MinHash con NUM_PERM funzioni multiply-shift, calcolato a blocchi di circa CHUNK_GRAMS shingle
+#   4. LSH: BANDS bande da ROWS_PER_BAND valori; i testi con una banda uguale sono candidati
+#   5. ogni candidato viene confermato solo se la somiglianza stimata (quota di valori MinHash
+#      uguali) è >= THRESHOLD e le lunghezze sono compatibili, poi le componenti connesse
+#      diventano i cluster
+#
+# Memoria: NUM_PERM * 4 byte per commento più la matrice degli hash di un blocco,
+# NUM_PERM * CHUNK_GRAMS * 8 byte (~50 MB): i blocchi si tagliano sul numero di shingle, non
+# di testi, così il picco non cresce con la lunghezza dei commenti (fino a MAX_CHARS di
+# text_normalization). Il raggruppamento si fa per video, quindi il resto dipende dal video
+# più grande e non dall'intero corpus.
+
+SHINGLE_BYTES = 5
+NUM_PERM = 64
+BANDS = 8
+ROWS_PER_BAND = NUM_PERM // BANDS
+THRESHOLD = 0.8
+CHUNK_GRAMS = 100_000  # Shingle per blocco nel calcolo delle firme (un testo più lungo forma un blocco da solo)
+CONFIRM_PAIRS = 20_000  # Coppie candidate confrontate per volta
+SEED = 1
+
+_rng = np.random.default_rng(SEED)
+_HASH_A = _rng.integers(1, 2 ** 63, NUM_PERM, dtype=np.uint64) | np.uint64(1)  # moltiplicatori dispari
+_HASH_B = _rng.integers(0, 2 ** 63, NUM_PERM, dtype=np.uint64)
+_BAND_MIX = _rng.integers(1, 2 ** 63, ROWS_PER_BAND, dtype=np.uint64) | np.uint64(1)
+
+_TAG_RE = re.compile(r'<[^>]+>')
+_NON_WORD_RE = re.compile(r'[\W_]+')
+
+
+def normalize(text):
+    """Testo ridotto all'essenziale per il confronto (non modifica il testo salvato)."""
+    text = _TAG_RE.sub(' ', html.unescape(text or '')).lower()
+    return _NON_WORD_RE.sub(' ', text).strip()
+
+
+def _shingles(texts):
+    """n-grammi di byte di tutti i testi del blocco e indice del primo n-gramma di ogni testo."""
+    k = SHINGLE_BYTES
+    # Ogni testo occupa almeno k byte (padding) così ha sempre almeno uno shingle
+    encoded = [t.encode('utf-8').ljust(k, b'\0') for t in texts]
+    lengths = np.fromiter((len(e) for e in encoded), dtype=np.int64, count=len(encoded))
+    data = np.frombuffer(b''.join(encoded), dtype=np.uint8).astype(np.uint64)
+
+    n_grams = len(data) - k + 1
+    grams = np.zeros(n_grams, dtype=np.uint64)
+    for j in range(k):
+        grams = grams * np.uint64(257) + data[j:j + n_grams]
+
+    # Si tengono solo gli n-grammi interamente dentro un testo
+    starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    valid = np.ones(n_grams, dtype=bool)
+    for j in range(1, k):
+        boundary = starts[1:] - j
+        valid[boundary[boundary >= 0]] = False
+    kept = np.flatnonzero(valid)
+    counts = lengths - k + 1
+    offsets = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    return grams[kept], offsets
+
+
+def _chunk_bounds(texts):
+    """Confini dei blocchi di testi con al più circa CHUNK_GRAMS shingle ciascuno."""
+    n_grams = np.fromiter((max(len(t.encode('utf-8')), SHINGLE_BYTES) - SHINGLE_BYTES + 1 for t in texts),
+                          dtype=np.int64, count=len(texts))
+    ends = np.cumsum(n_grams)
+    bounds = [0]
+    while bounds[-1] < len(texts):
+        start = bounds[-1]
+        stop = int(np.searchsorted(ends, ends[start] - n_grams[start] + CHUNK_GRAMS, side='right'))
+        bounds.append(max(stop, start + 1))
+    return bounds
+
+
+def signatures(texts):
+    """Matrice MinHash (len(texts) x NUM_PERM, uint32) dei testi già normalizzati."""
+    out = np.empty((len(texts), NUM_PERM), dtype=np.uint32)
+    bounds = _chunk_bounds(texts)
+    for start, stop in zip(bounds[:-1], bounds[1:]):
+        grams, offsets = _shingles(texts[start:stop])
+        with np.errstate(over='ignore'):
+            # multiply-shift: (a * x + b) mod 2^64, bit alti (in place: una sola matrice per blocco)
+            hashed = np.multiply(_HASH_A[:, None], grams[None, :])
+            hashed += _HASH_B[:, None]
+            hashed >>= np.uint64(32)
+        out[start:stop] = np.minimum.reduceat(hashed, offsets, axis=1).T.astype(np.uint32)
+    return out
+
+
+def _band_keys(sig, band):
+    block = sig[:, band * ROWS_PER_BAND:(band + 1) * ROWS_PER_BAND].astype(np.uint64)
+    with np.errstate(over='ignore'):
+        return (block * _BAND_MIX).sum(axis=1, dtype=np.uint64)
+
+
+def _find(parent, nodes):
+    """Radici dei nodi nella foresta union-find (vettorizzato)."""
+    roots = parent[nodes]
+    while True:
+        up = parent[roots]
+        if np.array_equal(up, roots):
+            return roots
+        roots = up
+
+
+def cluster(texts):
+    """Id di cluster per ogni testo: la posizione del rappresentante (il primo del cluster)."""
+    texts = [normalize(t) if isinstance(t, str) else '' for t in texts]
+    n = len(texts)
+    if n == 0:
+        return np.empty(0, dtype=np.int64)
+    sig = signatures(texts)
+    # Testi quasi vuoti dopo la normalizzazione (es. solo emoji) restano da soli
+    sizes_bytes = np.fromiter((len(t.encode('utf-8')) for t in texts), dtype=np.int64, count=n)
+    too_short = sizes_bytes < SHINGLE_BYTES
+    # Numero di shingle: se la Jaccard è >= THRESHOLD anche il rapporto fra i due numeri lo è
+    n_shingles = np.maximum(sizes_bytes - SHINGLE_BYTES + 1, 1)
+    parent = np.arange(n, dtype=np.int64)
+
+    for band in range(BANDS):
+        keys = _band_keys(sig, band)
+        order = np.argsort(keys, kind='stable')
+        sorted_keys = keys[order]
+        # Primo elemento del gruppo di ogni riga (stessa chiave di banda)
+        group_start = np.flatnonzero(np.r_[True, sorted_keys[1:] != sorted_keys[:-1]])
+        sizes = np.diff(np.r_[group_start, n])
+        first = np.repeat(order[group_start], sizes)
+        candidate = (order != first) & ~too_short[order] & ~too_short[first]
+        a, b = order[candidate], first[candidate]
+        if not len(a):
+            continue
+        # Conferma con la somiglianza stimata, a blocchi per limitare la memoria
+        confirmed = np.zeros(len(a), dtype=bool)
+        for s in range(0, len(a), CONFIRM_PAIRS):
+            sl = slice(s, s + CONFIRM_PAIRS)
+            confirmed[sl] = (sig[a[sl]] == sig[b[sl]]).mean(axis=1) >= THRESHOLD
+        ratio = np.minimum(n_shingles[a], n_shingles[b]) / np.maximum(n_shingles[a], n_shingles[b])
+        confirmed &= ratio >= THRESHOLD
+        a, b = a[confirmed], b[confirmed]
+
+        # Unione: la radice con indice minore diventa il rappresentante
+        while len(a):
+            ra, rb = _find(parent, a), _find(parent, b)
+            differ = ra != rb
+            if not differ.any():
+                break
+            lo, hi = np.minimum(ra, rb)[differ], np.maximum(ra, rb)[differ]
+            np.minimum.at(parent, hi, lo)
+            a, b = a[differ], b[differ]
+
+    return _find(parent, np.arange(n))
+
+
+def duplicate_stats(cluster_ids):
+    """Commenti, cluster, quota di duplicati e dimensione del cluster più grande."""
+    total = len(cluster_ids)
+    if not total:
+        return {'comments': 0, 'clusters': 0, 'duplicate_rate': 0.0, 'largest_cluster': 0}
+    sizes = np.bincount(pd.factorize(cluster_ids)[0])
+    return {
+        'comments': int(total),
+        'clusters': int(len(sizes)),
+        'duplicate_rate': float((total - len(sizes)) / total),
+        'largest_cluster': int(sizes.max()),
+    }
+
+
+def combine_stats(stats):
+    """Statistiche di più video insieme (i cluster non attraversano i video)."""
+    stats = [s for s in stats if s and s['comments']]
+    if not stats:
+        return duplicate_stats([])
+    comments = sum(s['comments'] for s in stats)
+    clusters = sum(s['clusters'] for s in stats)
+    return {
+        'comments': comments,
+        'clusters': clusters,
+        'duplicate_rate': (comments - clusters) / comments,
+        'largest_cluster': max(s['largest_cluster'] for s in stats),
+    }
@@ -0,0 +1,118 @@
+import os
+import time
+import sqlite3
+import hashlib
+
+# --- CACHE PERSISTENTE DELLE PREDIZIONI ---
+# Ogni predizione è indicizzata dall'hash di (testo normalizzato, modello, troncamento):
+# ai run successivi vengono inviati al modello solo i commenti mai visti.
+# Per ogni chiave si salvano etichetta e score (probabilità dell'etichetta prevista); le voci
+# scritte prima che lo score venisse salvato valgono come assenti e vengono ricalcolate una volta.
+
+DEFAULT_MAX_ENTRIES = 2_000_000
+_SQL_CHUNK = 500  # Limite prudente di parametri per query SQLite
+
+
+def normalize_text(text):
+    """Normalizzazione usata SOLO per la chiave: spazi multipli e a capo non cambiano i token."""
+    return ' '.join(text.split())
+
+
+def make_key(text, model_name, max_length):
+    """Chiave content-addressed di una predizione."""
+    payload = '\x1f'.join([normalize_text(text), model_name, f"truncation=True;max_length={max_length}"])
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class PredictionCache:
+    """Cache su disco (SQLite) di etichette e score predetti, con eviction LRU a dimensione fissa."""
+
+    def __init__(self, path, max_entries=DEFAULT_MAX_ENTRIES):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self.max_entries = max_entries
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS predictions ("
+            " key TEXT PRIMARY KEY, label TEXT NOT NULL, last_used REAL NOT NULL, score REAL)"
+        )
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(predictions)")}
+        if 'score' not in columns:
+            self.conn.execute("ALTER TABLE predictions ADD COLUMN score REAL")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_last_used ON predictions(last_used)")
+        self.conn.commit()
+
+        # Statistiche del run corrente
+        self.hits = 0
+        self.misses = 0
+        self.inferred = 0
+        self.inference_seconds = 0.0
+
+    def get_many(self, keys):
+        """Restituisce {chiave: (etichetta, score)} per le chiavi presenti in cache."""
+        keys = list(keys)
+        found = {}
+        for start in range(0, len(keys), _SQL_CHUNK):
+            chunk = keys[start:start + _SQL_CHUNK]
+            placeholders = ','.join('?' * len(chunk))
+            rows = self.conn.execute(
+                f"SELECT key, label, score FROM predictions WHERE key IN ({placeholders}) AND score IS NOT NULL", chunk
+            ).fetchall()
+            found.update((key, (label, score)) for key, label, score in rows)
+
+        if found:
+            now = time.time()
+            self.conn.executemany("UPDATE predictions SET last_used = ? WHERE key = ?", [(now, k) for k in found])
+            self.conn.commit()
+
+        self.hits += len(found)
+        self.misses += len(keys) - len(found)
+        return found
+
+    def put_many(self, items, inference_seconds=0.0):
+        """Salva {chiave: (etichetta, score)}; inference_seconds è il tempo speso per calcolarle."""
+        now = time.time()
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO predictions (key, label, last_used, score) VALUES (?, ?, ?, ?)",
+            [(k, label, now, score) for k, (label, score) in items.items()]
+        )
+        self.conn.commit()
+        self.inferred += len(items)
+        self.inference_seconds += inference_seconds
+
+    def evict(self):
+        """Elimina le voci usate meno di recente oltre max_entries. Restituisce quante ne ha rimosse."""
+        total = self.conn.execute("SELECT COUNT(*) FROM predictions").fetchone()[0]
+        excess = total - self.max_entries
+        if excess <= 0:
+            return 0
+        self.conn.execute(
+            "DELETE FROM predictions WHERE key IN "
+            "(SELECT key FROM predictions ORDER BY last_used ASC LIMIT ?)", (excess,)
+        )
+        self.conn.commit()
+        return excess
+
+    def stats(self):
+        """Statistiche del run: hit, miss e tempo di inferenza risparmiato (stimato)."""
+        lookups = self.hits + self.misses
+        seconds_per_item = self.inference_seconds / self.inferred if self.inferred else 0.0
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'entries': self.conn.execute("SELECT COUNT(*) FROM predictions").fetchone()[0],
+            'inference_seconds': self.inference_seconds,
+            'estimated_seconds_saved': self.hits * seconds_per_item,
+        }
+
+    def report(self):
+        s = self.stats()
+        print("\n[CACHE] Statistiche cache predizioni:")
+        print(f"   Hit: {s['hits']} | Miss: {s['misses']} | Hit rate: {s['hit_rate'] * 100:.1f}%")
+        print(f"   Voci in cache: {s['entries']} (max {self.max_entries})")
+        print(f"   Tempo di inferenza: {s['inference_seconds']:.1f}s | Tempo risparmiato (stima): {s['estimated_seconds_saved']:.1f}s")
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,180 @@
+import os
+import json
+
+import numpy as np
+import pandas as pd
+
+import storage
+
+# --- CURVE DI HYPE: ROLLUP GIORNALIERI E ORARI ---
+# Per ogni stagione si contano i commenti POSITIVE/NEGATIVE per ora e per giorno, con il
+# rapporto di positivi su finestre mobili e la distanza dall'uscita (days_before_release).
+# La data di uscita è quella di ogni video (release_dates: chiave -> data): se i video di
+# una stagione hanno date diverse, days_before_release è la media pesata sui commenti.
+#
+# Il calcolo è incrementale: 'counts' conserva i conteggi orari per chiave (video) e lo
+# stato ricorda quante righe di ogni chiave sono già state sommate, con un'impronta
+# (hash di time + etichetta) di quelle righe. A ogni aggiornamento si sommano solo le
+# righe nuove; se l'impronta non torna (dati riacquisiti o rietichettati) si ricostruisce
+# solo quella chiave. Le tabelle 'daily' e 'hourly' si derivano poi dai conteggi orari,
+# che sono piccoli rispetto al corpus. L'impronta è una somma (modulo 2^64) degli hash delle
+# righe: append() (modalità watch e analisi) la aggiorna con le sole righe aggiunte, senza
+# rileggere le altre; update() confronta l'impronta di tutte le righe (analisi con --rescore).
+
+LABELS = ['POSITIVE', 'NEGATIVE']
+STATE_FILE = os.path.join(storage.DATASETS['rollups'], 'state.json')
+ROLLING_DAYS = 7    # Finestra mobile della curva giornaliera
+ROLLING_HOURS = 24  # Finestra mobile della curva oraria
+
+
+def load_state():
+    try:
+        with open(STATE_FILE, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {'version': 0, 'keys': {}}
+
+
+def _save_state(state):
+    os.makedirs(os.path.dirname(STATE_FILE), exist_ok=True)
+    tmp_path = STATE_FILE + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp_path, STATE_FILE)
+
+
+def _fingerprint(df):
+    """Impronta (indipendente dall'ordine) delle coppie time/etichetta delle righe."""
+    if df.empty:
+        return '0'
+    hashes = pd.util.hash_pandas_object(df[['time', 'Predicted_Sentiment']].astype(str), index=False)
+    return str(int(hashes.to_numpy().sum(dtype=np.uint64)))
+
+
+def _add_fingerprints(a, b):
+    """Impronta dell'unione di due insiemi di righe (la somma degli hash è modulo 2^64)."""
+    return str((int(a) + int(b)) % 2 ** 64)
+
+
+def _hourly_counts(df):
+    """Conteggi per ora e per etichetta (colonne hour, POSITIVE, NEGATIVE)."""
+    times = pd.to_datetime(df['time'], utc=True, errors='coerce')
+    frame = pd.DataFrame({'hour': times.dt.floor('h'), 'label': df['Predicted_Sentiment'].astype(str)})
+    counts = frame.dropna(subset=['hour']).value_counts().unstack(fill_value=0)
+    return counts.reindex(columns=LABELS, fill_value=0).rename_axis(columns=None).reset_index()
+
+
+def read_counts():
+    counts = storage.read('rollups', key='counts')
+    if counts.empty:
+        # Colonne tipizzate: con colonne object la concat renderebbe object anche i conteggi
+        # e un'ora con soli NEUTRAL (totale 0) solleverebbe ZeroDivisionError nei rapporti
+        empty = pd.DataFrame(columns=['key', 'season', 'hour'] + LABELS)
+        return empty.astype({'hour': 'datetime64[ns, UTC]', **{label: 'int64' for label in LABELS}})
+    counts['hour'] = pd.to_datetime(counts['hour'], utc=True)
+    counts['season'] = counts['season'].astype(str)
+    return counts
+
+
+def _with_ratios(counts, time_col, window):
+    """Totale, rapporto di positivi (puntuale e su finestra mobile) e giorni all'uscita per stagione."""
+    # Giorni all'uscita di ogni chiave, pesati sui suoi commenti e poi divisi per il totale
+    weighted = counts['total'] * ((counts['release'] - counts[time_col]) / pd.Timedelta(days=1))
+    df = (counts.assign(days_weighted=weighted)
+          .groupby(['season', time_col], as_index=False)[LABELS + ['total', 'days_weighted']].sum(min_count=1))
+    df = df.sort_values(['season', time_col]).reset_index(drop=True)
+    df['positive_ratio'] = df['POSITIVE'] / df['total']
+
+    rolled = df.set_index(time_col).groupby('season')[['POSITIVE', 'total']].rolling(window).sum()
+    df['rolling_positive_ratio'] = (rolled['POSITIVE'] / rolled['total']).to_numpy()
+
+    df['days_before_release'] = df.pop('days_weighted') / df['total']
+    return df
+
+
+def derive(counts, release_dates):
+    """Tabelle per stagione (daily, hourly) dai conteggi orari per chiave."""
+    counts = counts.assign(total=counts[LABELS].sum(axis=1), date=counts['hour'].dt.floor('D'),
+                           release=pd.to_datetime(counts['key'].map(release_dates), utc=True))
+    return (_with_ratios(counts, 'date', f'{ROLLING_DAYS}D'),
+            _with_ratios(counts, 'hour', f'{ROLLING_HOURS}h'))
+
+
+def update(frames, release_dates):
+    """Somma ai rollup le righe nuove di ogni chiave.
+
+    frames: sequenza di (chiave, stagione, DataFrame con time e Predicted_Sentiment), con le
+    righe nell'ordine in cui sono salvate (l'acquisizione aggiunge solo in coda).
+    """
+    state = load_state()
+    counts = read_counts()
+    new_counts, changed = [], False
+
+    for key, season, df in frames:
+        done = state['keys'].get(key, {'rows': 0, 'fingerprint': '0'})
+        start = done['rows']
+        if len(df) < start or _fingerprint(df.iloc[:start]) != done['fingerprint']:
+            # Righe già sommate cambiate: si ricostruisce solo questa chiave
+            counts = counts[counts['key'] != key]
+            start = 0
+            changed = True
+
+        delta = df.iloc[start:]
+        if not delta.empty:
+            new_counts.append(_hourly_counts(delta).assign(key=key, season=season))
+            changed = True
+        state['keys'][key] = {'rows': len(df), 'fingerprint': _fingerprint(df)}
+
+    if not changed:
+        return state
+    return _save(counts, new_counts, state, release_dates)
+
+
+def append(frames, release_dates, reset=()):
+    """Somma ai rollup righe aggiunte in coda alle chiavi (modalità watch e analisi senza --rescore).
+
+    frames: sequenza (anche un generatore, letto una volta) di (chiave, stagione, DataFrame delle
+    sole righe nuove); le righe già sommate non vengono rilette e lo stato resta coerente con
+    update(). reset: chiavi i cui conteggi vengono azzerati prima di sommare i frames.
+    """
+    state = load_state()
+    counts = read_counts()
+    if reset:
+        counts = counts[~counts['key'].isin(set(reset))]
+        for key in reset:
+            state['keys'].pop(key, None)
+    new_counts = []
+    for key, season, delta in frames:
+        if delta.empty:
+            continue
+        done = state['keys'].get(key, {'rows': 0, 'fingerprint': '0'})
+        new_counts.append(_hourly_counts(delta).assign(key=key, season=season))
+        state['keys'][key] = {'rows': done['rows'] + len(delta),
+                              'fingerprint': _add_fingerprints(done['fingerprint'], _fingerprint(delta))}
+    if not new_counts and not reset:
+        return state
+    return _save(counts, new_counts, state, release_dates)
+
+
+def _save(counts, new_counts, state, release_dates):
+    """Somma i nuovi conteggi orari, ricalcola daily/hourly e salva tutto con una nuova versione."""
+    counts = pd.concat([counts] + new_counts, ignore_index=True)
+    counts = counts.groupby(['key', 'season', 'hour'], as_index=False)[LABELS].sum()
+    daily, hourly = derive(counts, release_dates)
+
+    storage.replace('rollups', 'counts', None, counts)
+    storage.replace('rollups', 'daily', None, daily)
+    storage.replace('rollups', 'hourly', None, hourly)
+    state['version'] += 1
+    _save_state(state)
+    return state
+
+
+def read(granularity):
+    """Tabella 'daily' o 'hourly' pronta per i grafici."""
+    df = storage.read('rollups', key=granularity)
+    if not df.empty:
+        time_col = 'date' if granularity == 'daily' else 'hour'
+        df[time_col] = pd.to_datetime(df[time_col], utc=True)
+        df['season'] = df['season'].astype(str)
+    return df
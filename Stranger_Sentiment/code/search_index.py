@@ -0,0 +1,267 @@
+import os
+import time
+import sqlite3
+import contextlib
+
+import numpy as np
+import pandas as pd
+
+import storage
+
+# --- INDICE FULL-TEXT DEI COMMENTI ANALIZZATI (SQLite FTS5) ---
+# Accanto ai risultati, un database SQLite con una riga per commento (video, stagione,
+# time, etichetta, score, testo) e un indice FTS5 sul testo:
+#
+#   comments      : righe dei risultati, con indici su time e (season, label, time) per filtri e ordine
+#   comments_fts  : indice full-text "external content" (il testo è salvato una sola volta)
+#   indexed       : per ogni chiave (video) righe già indicizzate e impronta di time/etichetta/score
+#
+# Come per i rollup, a ogni aggiornamento si aggiungono solo le righe nuove di ogni chiave;
+# se l'impronta delle righe già indicizzate non torna (video riacquisito o rianalizzato) si
+# reindicizza solo quella chiave. La dashboard interroga l'indice con filtri e paginazione
+# (LIMIT/OFFSET) senza caricare il corpus in memoria.
+
+INDEX_FILE = os.path.join(storage.DATA_DIR, 'results', 'search.sqlite')  # Con path=None, letto a ogni chiamata
+INDEX_COLUMNS = ['text', 'time', 'Predicted_Sentiment', 'Sentiment_Score']
+INSERT_BATCH = 50_000   # Righe per executemany (limita la memoria dei blocchi convertiti)
+PAGE_SIZE = 25          # Risultati per pagina nella dashboard
+COUNT_LIMIT = 10_000    # Oltre questo numero di risultati il totale non viene contato (ricerche troppo generiche)
+SORT_ORDERS = {
+    'relevance': 'bm25(comments_fts)',
+    'newest': 'c.time DESC',
+    'oldest': 'c.time ASC',
+    'score': 'c.score DESC',
+}
+
+_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS comments ("
+    " id INTEGER PRIMARY KEY, key TEXT NOT NULL, season TEXT NOT NULL, time TEXT, label TEXT, score REAL,"
+    " text TEXT NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS idx_comments_time ON comments(time)",
+    "CREATE INDEX IF NOT EXISTS idx_comments_season_label_time ON comments(season, label, time)",
+    "CREATE INDEX IF NOT EXISTS idx_comments_key ON comments(key)",
+    "CREATE VIRTUAL TABLE IF NOT EXISTS comments_fts USING fts5("
+    " text, content='comments', content_rowid='id', tokenize='unicode61 remove_diacritics 2')",
+    "CREATE TABLE IF NOT EXISTS indexed ("
+    " key TEXT PRIMARY KEY, season TEXT NOT NULL, rows INTEGER NOT NULL, fingerprint TEXT NOT NULL)",
+)
+
+
+class SearchQueryError(ValueError):
+    """Ricerca non valida (sintassi FTS5 o ordinamento sconosciuto)."""
+
+
+def connect(path=None):
+    """Connessione in scrittura (crea il database e lo schema se mancano)."""
+    path = path or INDEX_FILE
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    conn = sqlite3.connect(path, timeout=30)
+    # WAL: la dashboard può leggere mentre l'analisi o la modalità watch scrivono
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    for statement in _SCHEMA:
+        conn.execute(statement)
+    return conn
+
+
+def exists(path=None):
+    return os.path.exists(path or INDEX_FILE)
+
+
+@contextlib.contextmanager
+def _reader(path=None):
+    conn = sqlite3.connect(f"file:{path or INDEX_FILE}?mode=ro", uri=True, timeout=30)
+    try:
+        yield conn
+    finally:
+        conn.close()
+
+
+def _utc_seconds(times):
+    """Istanti come datetime64[s] UTC (NaT dove mancano), qualunque sia la risoluzione di partenza."""
+    return pd.to_datetime(times, utc=True, errors='coerce').dt.tz_localize(None).to_numpy().astype('datetime64[s]')
+
+
+def _fingerprint(df):
+    """Impronta (somma modulo 2^64 degli hash) di time, etichetta e score delle righe."""
+    if df.empty:
+        return '0'
+    # Hash sui valori numerici: convertire i timestamp in testo costerebbe più dell'indicizzazione
+    columns = {'time': _utc_seconds(df['time']).astype('int64'),
+               'label': df['Predicted_Sentiment'].astype(str).to_numpy()}
+    if 'Sentiment_Score' in df.columns:
+        columns['score'] = df['Sentiment_Score'].astype('float64').to_numpy()
+    hashes = pd.util.hash_pandas_object(pd.DataFrame(columns), index=False)
+    return str(int(hashes.to_numpy().sum(dtype=np.uint64)))
+
+
+def _add_fingerprints(a, b):
+    return str((int(a) + int(b)) % 2 ** 64)
+
+
+def _format_times(times):
+    """Timestamp come testo ISO UTC (ordinabile e confrontabile come stringa), None se mancanti."""
+    seconds = _utc_seconds(times)
+    text = np.char.add(np.datetime_as_string(seconds, unit='s'), 'Z').astype(object)
+    text[np.isnat(seconds)] = None
+    return text
+
+
+def _insert(conn, key, season, df):
+    """Aggiunge le righe di una chiave a comments e all'indice full-text."""
+    if df.empty:
+        return
+    first_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM comments").fetchone()[0] + 1
+    for start in range(0, len(df), INSERT_BATCH):
+        block = df.iloc[start:start + INSERT_BATCH]
+        scores = block['Sentiment_Score'] if 'Sentiment_Score' in block.columns else pd.Series(np.nan, index=block.index)
+        rows = zip(_format_times(block['time']), block['Predicted_Sentiment'].astype(str),
+                   scores.astype(float).where(scores.notna(), None), block['text'].astype(str))
+        conn.executemany("INSERT INTO comments (key, season, time, label, score, text) VALUES (?, ?, ?, ?, ?, ?)",
+                         ((key, season, t, label, score, text) for t, label, score, text in rows))
+    conn.execute("INSERT INTO comments_fts (rowid, text) SELECT id, text FROM comments WHERE id >= ?", (first_id,))
+
+
+def _delete_key(conn, key):
+    # Con un indice "external content" le righe vanno tolte dall'indice prima che dalla tabella
+    conn.execute("INSERT INTO comments_fts (comments_fts, rowid, text) SELECT 'delete', id, text FROM comments"
+                 " WHERE key = ?", (key,))
+    conn.execute("DELETE FROM comments WHERE key = ?", (key,))
+
+
+def update(frames, path=None):
+    """Indicizza le righe nuove di ogni chiave; restituisce le righe aggiunte.
+
+    frames: sequenza di (chiave, stagione, DataFrame con time, Predicted_Sentiment e
+    Sentiment_Score) nell'ordine in cui le righe sono salvate. Il testo viene letto dai
+    risultati solo per le chiavi con righe da indicizzare.
+    """
+    conn = connect(path)
+    added = 0
+    try:
+        indexed = {k: (rows, fp) for k, rows, fp in conn.execute("SELECT key, rows, fingerprint FROM indexed")}
+        for key, season, df in frames:
+            rows, fingerprint = indexed.get(key, (0, '0'))
+            start, changed = rows, False
+            with conn:
+                if len(df) < rows or _fingerprint(df.iloc[:rows]) != fingerprint:
+                    # Righe già indicizzate cambiate: si reindicizza solo questa chiave
+                    _delete_key(conn, key)
+                    start, changed = 0, True
+                if start < len(df):
+                    delta = storage.read('results', columns=INDEX_COLUMNS, key=key).iloc[start:len(df)]
+                    _insert(conn, key, season, delta)
+                    added += len(delta)
+                    changed = True
+                if not changed:
+                    continue
+                conn.execute("INSERT OR REPLACE INTO indexed (key, season, rows, fingerprint) VALUES (?, ?, ?, ?)",
+                             (key, season, len(df), _fingerprint(df)))
+    finally:
+        conn.close()
+    return added
+
+
+def append(frames, path=None, reset=()):
+    """Indicizza righe aggiunte in coda alle chiavi (modalità watch e analisi senza --rescore).
+
+    frames: sequenza (anche un generatore) di (chiave, stagione, DataFrame delle sole righe nuove
+    con INDEX_COLUMNS); reset: chiavi tolte dall'indice prima di aggiungere i frames.
+    """
+    conn = connect(path)
+    try:
+        with conn:
+            for key in reset:
+                _delete_key(conn, key)
+                conn.execute("DELETE FROM indexed WHERE key = ?", (key,))
+        for key, season, delta in frames:
+            if delta.empty:
+                continue
+            with conn:
+                row = conn.execute("SELECT rows, fingerprint FROM indexed WHERE key = ?", (key,)).fetchone()
+                rows, fingerprint = row or (0, '0')
+                _insert(conn, key, season, delta)
+                conn.execute("INSERT OR REPLACE INTO indexed (key, season, rows, fingerprint) VALUES (?, ?, ?, ?)",
+                             (key, season, rows + len(delta), _add_fingerprints(fingerprint, _fingerprint(delta))))
+    finally:
+        conn.close()
+
+
+def indexed_rows(path=None):
+    """Righe indicizzate per chiave ({} se l'indice non esiste ancora)."""
+    if not exists(path):
+        return {}
+    with _reader(path) as conn:
+        return dict(conn.execute("SELECT key, rows FROM indexed").fetchall())
+
+
+def match_expression(query):
+    """Parole cercate -> espressione FTS5: ogni parola tra virgolette (AND implicito), '*' finale = prefisso."""
+    terms = []
+    for word in query.split():
+        prefix = word.endswith('*')
+        word = word.rstrip('*').replace('"', '""')
+        if word:
+            terms.append(f'"{word}"' + ('*' if prefix else ''))
+    return ' '.join(terms)
+
+
+def search(query='', seasons=None, labels=None, start=None, end=None, sort='relevance',
+           limit=PAGE_SIZE, offset=0, path=None):
+    """Commenti che contengono tutte le parole di query, filtrati e paginati.
+
+    start / end: date (o timestamp) incluse; sort: una di SORT_ORDERS ('relevance' vale solo
+    con una query). Restituisce (DataFrame di una pagina, totale dei risultati fino a
+    COUNT_LIMIT + 1, millisecondi): contare tutte le righe di una parola molto comune
+    costerebbe più della pagina stessa.
+    """
+    if sort not in SORT_ORDERS:
+        raise SearchQueryError(f"Ordinamento '{sort}' non valido (usa: {', '.join(SORT_ORDERS)})")
+    expression = match_expression(query or '')
+    where, params = [], []
+    if expression:
+        where.append("comments_fts MATCH ?")
+        params.append(expression)
+    if seasons:
+        where.append(f"c.season IN ({', '.join('?' * len(seasons))})")
+        params.extend(seasons)
+    if labels:
+        where.append(f"c.label IN ({', '.join('?' * len(labels))})")
+        params.extend(labels)
+    if start is not None:
+        where.append("c.time >= ?")
+        params.append(pd.Timestamp(start).strftime('%Y-%m-%dT00:00:00Z'))
+    if end is not None:
+        where.append("c.time <= ?")
+        params.append(pd.Timestamp(end).strftime('%Y-%m-%dT23:59:59Z'))
+
+    source = "comments_fts JOIN comments c ON c.id = comments_fts.rowid" if expression else "comments c"
+    condition = f" WHERE {' AND '.join(where)}" if where else ''
+    order = SORT_ORDERS['newest' if sort == 'relevance' and not expression else sort]
+
+    started = time.perf_counter()
+    with _reader(path) as conn:
+        try:
+            total = conn.execute(f"SELECT COUNT(*) FROM (SELECT 1 FROM {source}{condition} LIMIT ?)",
+                                 params + [COUNT_LIMIT + 1]).fetchone()[0]
+            page = pd.read_sql_query(
+                f"SELECT c.season, c.time, c.label, c.score, c.text, c.key FROM {source}{condition}"
+                f" ORDER BY {order} LIMIT ? OFFSET ?", conn, params=params + [int(limit), int(offset)])
+        except (sqlite3.OperationalError, pd.errors.DatabaseError) as e:
+            raise SearchQueryError(f"Ricerca non valida: {e}") from e
+    return page, total, (time.perf_counter() - started) * 1000
+
+
+def time_range(path=None):
+    """Primo e ultimo istante indicizzati (Timestamp UTC), o (None, None) se l'indice è vuoto."""
+    with _reader(path) as conn:
+        first, last = conn.execute("SELECT MIN(time), MAX(time) FROM comments").fetchone()
+    if first is None:
+        return None, None
+    return pd.Timestamp(first), pd.Timestamp(last)
+
+
+def stats(path=None):
+    """Commenti indicizzati per stagione."""
+    with _reader(path) as conn:
+        return dict(conn.execute("SELECT season, SUM(rows) FROM indexed GROUP BY season ORDER BY season").fetchall())
@@ -1,142 +1,958 @@
+import numpy as np
 import pandas as pd
 import os
 import sys
-from sklearn.metrics import accuracy_score, classification_report
-import torch
-from transformers import pipeline
+import time
+import argparse
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from prediction_cache import PredictionCache, make_key
+from inference_backends import BACKENDS, DEFAULT_BACKEND, build_pipeline
+import storage
+import videos
+import job_queue
+import aggregates
+import evaluation
+import near_dedup
+import rollups
+import search_index
+import text_normalization
+import instrumentation
+from instrumentation import timer
+
+# NOTA: torch e transformers vengono importati solo quando servono
+# (caricamento modello): importare questo modulo resta immediato.
 
 # --- CONFIGURAZIONE GLOBALE ---
-VIDEO_MAP_HYPE = {
-    'S1': {'FILE_PREFIX': 'S1_Hype'},
-    'S2': {'FILE_PREFIX': 'S2_Hype'},
-    'S3': {'FILE_PREFIX': 'S3_Hype'},
-    'S4': {'FILE_PREFIX': 'S4_Hype'},
-    'S5': {'FILE_PREFIX': 'S5_Hype'},
-}
+# I video analizzati (chiave, stagione/gruppo, data di uscita) vengono dal manifest
+# videos.json; quali restano da analizzare lo dice la coda dei job (job_queue.py).
 
 # Definisce i percorsi
 BASE_DIR = os.path.dirname(os.path.dirname(__file__))
 DATA_PROCESSED_DIR = os.path.join(BASE_DIR, 'data', 'processed')
 VALIDATION_DIR = os.path.join(BASE_DIR, 'validation')
 DATA_RESULTS_DIR = os.path.join(BASE_DIR, 'data', 'results')
+DATA_CACHE_DIR = os.path.join(BASE_DIR, 'data', 'cache')
 os.makedirs(DATA_RESULTS_DIR, exist_ok=True)
 
 # Nomi dei file
 VALIDATION_SET_LABELED_FILE = os.path.join(VALIDATION_DIR, 'validation_set_labeled.csv')
 ANALYSIS_RESULTS_FILE = os.path.join(DATA_RESULTS_DIR, 'sentiment_analysis_results.csv')
-# NUOVO FILE: Qui salviamo le previsioni per l'app
+# Risultati completi e previsioni di validazione sono salvati tramite storage.py
+# (Parquet partizionato per stagione); questi CSV vengono scritti solo con --export-csv.
+FULL_RESULTS_CSV_FILE = os.path.join(DATA_RESULTS_DIR, 'sentiment_analysis_results_full.csv')
 VALIDATION_PREDICTIONS_FILE = os.path.join(DATA_RESULTS_DIR, 'validation_predictions.csv')
+BACKEND_COMPARISON_FILE = os.path.join(DATA_RESULTS_DIR, 'backend_comparison.csv')
+EVALUATION_FILE = os.path.join(DATA_RESULTS_DIR, 'evaluation.csv')  # Metriche per soglia e backend (evaluation.py)
+
+# Cache persistente delle predizioni (i re-run analizzano solo i commenti nuovi)
+PREDICTION_CACHE_FILE = os.path.join(DATA_CACHE_DIR, 'predictions.sqlite')
+PREDICTION_CACHE_MAX_ENTRIES = 2_000_000
+
+# Parametri di inferenza
+MODEL_NAME = "distilbert-base-uncased-finetuned-sst-2-english"
+# Backend: 'pytorch' (default), 'quantized' (int8 dinamico) o 'onnx' (ONNX Runtime). Vedi inference_backends.py
+INFERENCE_BACKEND = os.environ.get('STRANGER_BACKEND', DEFAULT_BACKEND)
+ONNX_EXPORT_DIR = os.path.join(DATA_CACHE_DIR, 'onnx')
+MAX_LENGTH = 512
+BATCH_SIZE = 32  # Commenti per forward pass (i batch sono formati per lunghezza simile)
+WORKERS = 1  # Processi di inferenza su CPU (1 = esecuzione seriale nel processo principale)
+DEDUP = True  # Classifica un solo rappresentante per cluster di quasi-duplicati (near_dedup)
+SCORING_JOBS_PER_CLAIM = 8  # Video presi dalla coda per ogni chiamata al modello
+ACQUISITION_POLL_SECONDS = 5  # Attesa fra due controlli della coda durante l'acquisizione
+HEARTBEAT_SECONDS = 60  # Intervallo minimo fra due heartbeat dei job in analisi (vedi job_queue.reset_stale)
+# Modalità streaming: righe per blocco (None = ogni video letto per intero). Con un valore
+# la memoria di picco dipende dal blocco, non dal numero di commenti del video o del corpus.
+CHUNK_ROWS = None
 
 
 # --- INIZIALIZZAZIONE MODELLO ---
-def initialize_pipeline():
-    """Carica il modello DistilBERT su GPU o CPU."""
-    if torch.backends.mps.is_available():
+def initialize_pipeline(device=None):
+    """Carica il modello DistilBERT su GPU o CPU (device=-1 forza la CPU) con il backend configurato."""
+    import torch
+
+    if device is not None:
+        device_id = device
+    elif torch.backends.mps.is_available():
         device_id = "mps"
     elif torch.cuda.is_available():
         device_id = 0
     else:
         device_id = -1
+
+    if INFERENCE_BACKEND != 'pytorch':
+        # I backend quantized e onnx girano solo su CPU
+        device_id = -1
         
     try:
-        pipe = pipeline(
-            "sentiment-analysis",
-            model="distilbert-base-uncased-finetuned-sst-2-english",
-            device=device_id
-        )
-        print(f"\n[MODELLO] Pipeline caricata su: {device_id}")
+        pipe = build_pipeline(INFERENCE_BACKEND, MODEL_NAME, device=device_id, onnx_dir=ONNX_EXPORT_DIR)
+        print(f"\n[MODELLO] Pipeline '{INFERENCE_BACKEND}' caricata su: {device_id}")
         return pipe
     except Exception as e:
         print(f"[ERRORE CRITICO] Caricamento modello fallito: {e}")
         sys.exit(1)
 
-sentiment_pipeline = initialize_pipeline()
+# Modello e cache vengono creati al primo utilizzo (nei worker il modello lo carica _init_worker)
+sentiment_pipeline = None
+prediction_cache = None
+_tokenizer = None
+_worker_pool = None
+_cores_warned = False  # Avviso "più worker che core" già stampato in questo run
+
+
+def set_backend(backend):
+    """Seleziona il backend di inferenza (il modello verrà ricaricato al prossimo utilizzo)."""
+    global INFERENCE_BACKEND, sentiment_pipeline
+    if backend not in BACKENDS:
+        raise ValueError(f"Backend sconosciuto '{backend}'. Disponibili: {', '.join(BACKENDS)}")
+    if backend != INFERENCE_BACKEND:
+        INFERENCE_BACKEND = backend
+        sentiment_pipeline = None
+
+
+def get_pipeline():
+    global sentiment_pipeline
+    if sentiment_pipeline is None:
+        with timer('modello.caricamento'):
+            sentiment_pipeline = initialize_pipeline()
+    return sentiment_pipeline
+
+
+def get_tokenizer():
+    """Tokenizer del modello; in modalità multi-processo evita di caricare il modello nel processo principale."""
+    global _tokenizer
+    if sentiment_pipeline is not None:
+        return sentiment_pipeline.tokenizer
+    if _tokenizer is None:
+        from transformers import AutoTokenizer
+        _tokenizer = AutoTokenizer.from_pretrained(MODEL_NAME)
+    return _tokenizer
+
+
+def get_prediction_cache():
+    global prediction_cache
+    if prediction_cache is None:
+        prediction_cache = PredictionCache(PREDICTION_CACHE_FILE, max_entries=PREDICTION_CACHE_MAX_ENTRIES)
+    return prediction_cache
 
 
 # --- FUNZIONI DI PREDIZIONE ---
+def _cache_key(text):
+    # Backend diversi possono dare etichette diverse: non condividono le voci di cache
+    model_id = MODEL_NAME if INFERENCE_BACKEND == 'pytorch' else f"{MODEL_NAME}@{INFERENCE_BACKEND}"
+    return make_key(text, model_id, MAX_LENGTH)
+
+
+def _infer_one(text):
+    """(etichetta, score) di un singolo testo; None se l'inferenza fallisce."""
+    try:
+        result = get_pipeline()(text, truncation=True, max_length=MAX_LENGTH)[0]
+        return result['label'], float(result['score'])
+    except Exception:
+        return None
+
+
 def predict_sentiment(text):
     if not isinstance(text, str) or not text.strip():
         return None
+
+    cache = get_prediction_cache()
+    key = _cache_key(text)
+    cached = cache.get_many([key])
+    if key in cached:
+        return cached[key][0]
+
+    start = time.perf_counter()
+    prediction = _infer_one(text)
+    if prediction is None:
+        return None
+    cache.put_many({key: prediction}, time.perf_counter() - start)
+    return prediction[0]
+
+
+def _token_lengths(texts):
+    """Lunghezza in token (già troncata) di ogni testo, usata per ordinare i batch."""
     try:
-        result = sentiment_pipeline(text, truncation=True, max_length=512)[0]
-        return result['label']
+        encoded = get_tokenizer()(list(texts), truncation=True, max_length=MAX_LENGTH)
+        return [len(ids) for ids in encoded['input_ids']]
     except Exception:
-        return None
+        # Ripiego: la lunghezza in caratteri è una buona approssimazione per l'ordinamento
+        return [len(t) for t in texts]
+
+
+def _infer_batch(batch):
+    """Un singolo forward pass su un batch di testi (eseguito nel processo principale o in un worker)."""
+    try:
+        pipe = get_pipeline()
+        with timer('inferenza.forward', items=len(batch)):
+            results = pipe(batch, truncation=True, max_length=MAX_LENGTH, batch_size=len(batch))
+        return [(r['label'], float(r['score'])) for r in results]
+    except Exception:
+        # Un testo problematico non deve far perdere l'intero batch
+        return [_infer_one(t) for t in batch]
+
+
+# --- INFERENZA MULTI-PROCESSO (CPU) ---
+def _available_cores():
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def _init_worker(num_threads, backend, model_name):
+    """Ogni worker fissa i propri thread intra-op e carica il modello una sola volta."""
+    global sentiment_pipeline, MODEL_NAME
+    import torch
+    torch.set_num_threads(num_threads)
+    # I worker (spawn) reimportano il modulo: modello e backend sono quelli del processo principale
+    MODEL_NAME = model_name
+    set_backend(backend)
+    sentiment_pipeline = initialize_pipeline(device=-1)
+
+
+def get_worker_pool(workers):
+    """Pool di processi riutilizzato per tutto il run (il modello non viene ricaricato a ogni stagione)."""
+    global _worker_pool
+    if _worker_pool is None:
+        threads_per_worker = max(1, _available_cores() // workers)
+        print(f"[MODELLO] Avvio {workers} worker CPU ({threads_per_worker} thread ciascuno)")
+        _worker_pool = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=_init_worker,
+            initargs=(threads_per_worker, INFERENCE_BACKEND, MODEL_NAME)
+        )
+    return _worker_pool
+
+
+def shutdown_worker_pool():
+    global _worker_pool, _cores_warned
+    if _worker_pool is not None:
+        _worker_pool.shutdown()
+        _worker_pool = None
+    _cores_warned = False
+
+
+def _usable_workers(workers):
+    """Worker limitati ai core disponibili (l'avviso viene stampato una volta per run)."""
+    global _cores_warned
+    cores = _available_cores()
+    if workers <= cores:
+        return workers
+    if not _cores_warned:
+        print(f"[AVVISO] {workers} worker richiesti ma solo {cores} core disponibili: ridotti.")
+        _cores_warned = True
+    return cores
+
+
+def _infer_batched(texts, batch_size, workers=1, on_batch=None):
+    """Inferenza a batch su testi già validi; restituisce (etichetta, score) nello stesso ordine.
+
+    I batch vengono formati qui, una volta sola: con workers > 1 vengono solo distribuiti
+    ai processi, quindi la loro composizione (e il risultato) è identica al percorso seriale.
+    on_batch: chiamata dopo ogni batch completato (es. heartbeat dei job in coda).
+    """
+    predictions = [None] * len(texts)
+
+    # Ordinando per lunghezza ogni batch contiene testi simili: meno padding per forward pass
+    with timer('inferenza.tokenizzazione', items=len(texts)):
+        lengths = _token_lengths(texts) if texts else []
+    order = sorted(range(len(texts)), key=lengths.__getitem__)
+    buckets = [order[start:start + batch_size] for start in range(0, len(order), batch_size)]
+    batches = [[texts[k] for k in bucket] for bucket in buckets]
+
+    if workers > 1 and len(batches) > 1:
+        # Più batch per task riducono l'overhead di IPC, restando abbastanza piccoli da bilanciare il carico
+        chunksize = max(1, len(batches) // (workers * 8))
+        results = get_worker_pool(workers).map(_infer_batch, batches, chunksize=chunksize)
+    else:
+        results = map(_infer_batch, batches)
+
+    for bucket, batch_predictions in zip(buckets, results):
+        for k, prediction in zip(bucket, batch_predictions):
+            predictions[k] = prediction
+        if on_batch is not None:
+            on_batch()
+    return predictions
+
+
+def predict_sentiment_scores(texts, batch_size=BATCH_SIZE, workers=1, on_batch=None):
+    """Classifica molti commenti insieme, a batch di lunghezza simile.
+
+    Accetta una Series o un qualsiasi iterabile di testi e restituisce un DataFrame (stesso
+    ordine e indice dell'input) con Predicted_Sentiment e Sentiment_Score, la probabilità
+    dell'etichetta prevista (None/NaN per testi vuoti o non validi, come predict_sentiment).
+    I testi già presenti nella cache (o ripetuti nell'input) non vengono ricalcolati.
+    Con workers > 1 i batch da calcolare vengono distribuiti su un pool di processi CPU;
+    on_batch viene chiamata dopo ogni batch calcolato.
+    """
+    index = texts.index if isinstance(texts, pd.Series) else None
+    texts = list(texts)
+    labels = [None] * len(texts)
+    scores = np.full(len(texts), np.nan)
+
+    # Chiave -> posizioni nell'input (i commenti spam identici vengono calcolati una volta sola)
+    positions = {}
+    for i, t in enumerate(texts):
+        if isinstance(t, str) and t.strip():
+            positions.setdefault(_cache_key(t), []).append(i)
+
+    cache = get_prediction_cache()
+    with timer('inferenza.cache', items=len(positions)):
+        resolved = cache.get_many(positions)
+    pending = [k for k in positions if k not in resolved]
+
+    if pending:
+        workers = _usable_workers(workers)
+        if workers <= 1:
+            get_pipeline()  # Il caricamento del modello non va contato come tempo di inferenza
+        start = time.perf_counter()
+        with timer('inferenza.modello', items=len(pending)):
+            new_predictions = _infer_batched([texts[positions[k][0]] for k in pending], batch_size, workers,
+                                             on_batch=on_batch)
+        fresh = {k: prediction for k, prediction in zip(pending, new_predictions) if prediction is not None}
+        with timer('inferenza.cache'):
+            cache.put_many(fresh, time.perf_counter() - start)
+        resolved.update(fresh)
+
+    for key, idx in positions.items():
+        if key in resolved:
+            label, score = resolved[key]
+            for i in idx:
+                labels[i] = label
+                scores[i] = score
+
+    return pd.DataFrame({'Predicted_Sentiment': pd.Series(labels, dtype=object), 'Sentiment_Score': scores}
+                        ).set_axis(index if index is not None else pd.RangeIndex(len(texts)))
+
+
+def predict_sentiment_batch(texts, batch_size=BATCH_SIZE, workers=1):
+    """Come predict_sentiment_scores, ma solo le etichette (Series se l'input è una Series, altrimenti lista)."""
+    labels = predict_sentiment_scores(texts, batch_size, workers)['Predicted_Sentiment']
+    return labels if isinstance(texts, pd.Series) else labels.tolist()
+
+
+def report_cache():
+    """Applica l'eviction e stampa le statistiche della cache (se è stata usata in questo run)."""
+    if prediction_cache is not None:
+        prediction_cache.evict()
+        prediction_cache.report()
+        instrumentation.record('cache', prediction_cache.stats())
 
 
 # --- FASE 3A: ANALISI COMPLETA ---
-def run_full_analysis():
-    print("\n--- FASE 3A: ANALISI SENTIMENT COMPLETA ---")
-    
-    full_results_path = ANALYSIS_RESULTS_FILE.replace('.csv', '_full.csv')
-    all_data = []
+def _normalize(df, stage='analisi.normalizzazione'):
+    """Normalizza il testo (da text_raw) e conta i token prima/dopo su un campione di righe."""
+    with timer(stage, items=len(df)):
+        text_normalization.normalize_frame(df)
+        return text_normalization.token_counts(df, _token_lengths)
+
+
+def _report_normalization(key, counts):
+    stats = text_normalization.describe(counts)
+    instrumentation.record('normalization', stats, key=key)
+    print(f"  Normalizzazione: {stats['changed_rate']:.1%} dei testi modificati, token medi per commento "
+          f"{stats['avg_tokens_before']:.1f} -> {stats['avg_tokens_after']:.1f} (-{stats['token_reduction']:.1%})")
+
+
+def _cluster_ids(df):
+    """Cluster di quasi-duplicati di un video (posizione del rappresentante di ogni riga)."""
+    with timer('analisi.dedup', items=len(df)):
+        return near_dedup.cluster(df['text'].tolist())
 
-    for stagione, data in VIDEO_MAP_HYPE.items():
-        processed_file = os.path.join(DATA_PROCESSED_DIR, f"{data['FILE_PREFIX']}_processed.csv")
 
-        if not os.path.exists(processed_file):
+def _add_clusters(video, df, dedup, offset=0):
+    """Colonna cluster_id: posizione (nel video, da offset) del commento rappresentante del cluster."""
+    df['cluster_id'] = (_cluster_ids(df) if dedup else np.arange(len(df))) + offset
+    stats = near_dedup.duplicate_stats(df['cluster_id'].to_numpy())
+    instrumentation.record('duplicates', stats, key=video['key'])
+    if dedup:
+        print(f"  Quasi-duplicati: {stats['duplicate_rate']:.1%} "
+              f"({stats['clusters']} testi distinti da classificare)")
+    return df
+
+
+def _score_frames(video_frames, batch_size, workers, heartbeat=None):
+    """Etichetta e score di ogni riga dei (video, DataFrame con cluster_id); righe senza etichetta scartate."""
+    # Un'unica chiamata su tutti i rappresentanti: i batch (non i video) vengono
+    # distribuiti sui worker, così un video enorme non lascia core inattivi.
+    representatives = [df['cluster_id'].to_numpy() == np.arange(len(df)) + df['cluster_id'].min()
+                       for _, df in video_frames]
+    all_texts = pd.concat([df['text'][rep] for (_, df), rep in zip(video_frames, representatives)],
+                          ignore_index=True)
+    print(f"Analisi di {len(all_texts)} commenti (worker: {workers})...")
+    predictions = predict_sentiment_scores(all_texts, batch_size=batch_size, workers=workers, on_batch=heartbeat)
+    all_labels = predictions['Predicted_Sentiment'].to_numpy()
+    all_scores = predictions['Sentiment_Score'].to_numpy()
+
+    results = []
+    offset = 0
+    for (video, df), rep in zip(video_frames, representatives):
+        # Etichetta e score del rappresentante vengono riportati su tutto il cluster
+        positions = df['cluster_id'].to_numpy() - df['cluster_id'].min()
+        labels = np.full(len(df), None, dtype=object)
+        scores = np.full(len(df), np.nan)
+        labels[rep] = all_labels[offset:offset + rep.sum()]
+        scores[rep] = all_scores[offset:offset + rep.sum()]
+        df['Predicted_Sentiment'] = labels[positions]
+        df['Sentiment_Score'] = scores[positions]
+        offset += rep.sum()
+        df_clean = df.dropna(subset=['Predicted_Sentiment']).copy()
+        df_clean['season'] = video['group']
+        results.append((video, df_clean))
+    return results
+
+
+def _job_heartbeat(queue, keys):
+    """Heartbeat dei job in analisi, al più uno ogni HEARTBEAT_SECONDS (un video lungo non viene ripreso da reset_stale)."""
+    last = time.monotonic()
+
+    def heartbeat():
+        nonlocal last
+        if time.monotonic() - last >= HEARTBEAT_SECONDS:
+            for key in keys:
+                queue.heartbeat(key)
+            last = time.monotonic()
+    return heartbeat
+
+
+def _score_jobs(jobs, by_key, batch_size, workers, dedup, heartbeat=None):
+    """Analizza i video presi dalla coda e ne salva i risultati; restituisce {chiave: righe}.
+
+    heartbeat: chiamata dopo ogni video letto e ogni batch, segnala alla coda che i job sono vivi.
+    """
+    video_frames = []
+    rows = {}
+    for job in jobs:
+        video = by_key[job['key']]
+        with timer('analisi.lettura') as t:
+            df = storage.read('processed', key=video['key'])
+            t.items += len(df)
+
+        if df.empty or 'text' not in df.columns:
+            rows[video['key']] = 0
             continue
-        
-        try:
-            df = pd.read_csv(processed_file)
-            if 'text' not in df.columns: df = pd.read_csv(processed_file, sep=';')
-        except:
+
+        print(f"Caricato {video['key']} ({video['group']}): {len(df)} commenti")
+        _report_normalization(video['key'], _normalize(df))
+        video_frames.append((video, _add_clusters(video, df, dedup)))
+        if heartbeat is not None:
+            heartbeat()
+
+    if not video_frames:
+        return rows
+
+    for video, df_clean in _score_frames(video_frames, batch_size, workers, heartbeat):
+        with timer('analisi.scrittura', items=len(df_clean)):
+            storage.replace('results', video['key'], video['group'], df_clean)
+        rows[video['key']] = len(df_clean)
+    return rows
+
+
+# --- MODALITÀ STREAMING: ANALISI A BLOCCHI ---
+# Ogni video viene letto, classificato e scritto un blocco alla volta (una parte dei risultati
+# per blocco); i quasi-duplicati si cercano dentro il blocco. Gli aggregati (anche dopo
+# l'analisi per intero) si aggiornano con _merge_aggregates: le percentuali escono da contatori
+# per stagione letti una parte alla volta, rollup e indice di ricerca ricevono solo le righe
+# nuove (video rianalizzati, o righe oltre quelle già sommate secondo il loro stato).
+
+def _read_blocks(key, chunk_rows):
+    """Blocchi dei dati processati di un video, misurando il tempo di lettura."""
+    batches = storage.iter_batches('processed', batch_size=chunk_rows, key=key)
+    while True:
+        with timer('analisi.lettura') as t:
+            chunk = next(batches, None)
+            t.items += len(chunk) if chunk is not None else 0
+        if chunk is None:
+            return
+        yield chunk
+
+
+def _stream_video(video, batch_size, workers, dedup, chunk_rows, heartbeat=None):
+    """Analizza un video a blocchi di chunk_rows righe; restituisce le righe scritte nei risultati.
+
+    heartbeat: chiamata dopo ogni batch e ogni blocco scritto, segnala alla coda che il job è vivo.
+    """
+    storage.remove_parts('results', video['key'])
+    read = written = blocks = 0
+    stats, token_counts = [], []
+    for chunk in _read_blocks(video['key'], chunk_rows):
+        if chunk.empty or 'text' not in chunk.columns:
             continue
-        
-        if df.empty or 'text' not in df.columns: continue
-            
-        print(f"Analisi {stagione}...")
-        df['Predicted_Sentiment'] = df['text'].apply(predict_sentiment)
-        df_clean = df.dropna(subset=['Predicted_Sentiment']).copy()
-        df_clean['season'] = stagione
-        all_data.append(df_clean)
-
-    if all_data:
-        df_results = pd.concat(all_data)
-        sentiment_counts = df_results.groupby('season')['Predicted_Sentiment'].value_counts(normalize=True).mul(100).rename('Percentage').reset_index()
-        df_results.to_csv(full_results_path, index=False)
-        sentiment_counts.to_csv(ANALYSIS_RESULTS_FILE, index=False)
-        print(f"[OK] Risultati analisi salvati.")
+        chunk = chunk.reset_index(drop=True)
+        token_counts.append(_normalize(chunk))
+        # cluster_id = posizione (nel video) del rappresentante, come nell'analisi per intero
+        chunk['cluster_id'] = (_cluster_ids(chunk) if dedup else np.arange(len(chunk))) + read
+        stats.append(near_dedup.duplicate_stats(chunk['cluster_id'].to_numpy()))
+        read += len(chunk)
+        blocks += 1
+        [(_, df_clean)] = _score_frames([(video, chunk)], batch_size, workers, heartbeat)
+        with timer('analisi.scrittura', items=len(df_clean)):
+            storage.write_part('results', video['key'], video['group'], df_clean)
+        written += len(df_clean)
+        if heartbeat is not None:
+            heartbeat()
+
+    duplicates = near_dedup.combine_stats(stats)
+    instrumentation.record('duplicates', duplicates, key=video['key'])
+    print(f"Analizzato {video['key']} ({video['group']}): {read} commenti in {blocks} blocchi"
+          + (f", quasi-duplicati {duplicates['duplicate_rate']:.1%}" if dedup else ''))
+    if token_counts:
+        _report_normalization(video['key'], text_normalization.combine_counts(token_counts))
+    return written
+
+
+def _new_rows(manifest, rows, done, scored_keys, columns):
+    """Righe da sommare a rollup o indice: (chiavi da ricostruire, generatore di (chiave, stagione, righe)).
+
+    done: righe già sommate per chiave (dallo stato); i video appena analizzati, o con meno
+    righe di quelle sommate, si ricostruiscono, gli altri ricevono solo le righe oltre done.
+    """
+    reset = {k for k, n in rows.items() if k in scored_keys or done.get(k, 0) > n}
+
+    def frames():
+        for video in manifest:
+            key = video['key']
+            skip = 0 if key in reset else done.get(key, 0)
+            if skip < rows[key]:
+                for part in storage.iter_parts('results', columns=columns, key=key, skip_rows=skip):
+                    yield key, video['group'], part
+    return reset, frames()
+
+
+def _merge_aggregates(manifest, scored_keys):
+    """Percentuali e quasi-duplicati leggendo i risultati una parte alla volta; rollup e indice solo con le righe nuove."""
+    counts, duplicates = {}, {}
+    with timer('analisi.aggregati'):
+        for video in manifest:
+            for part in storage.iter_parts('results', columns=['Predicted_Sentiment', 'cluster_id'], key=video['key']):
+                aggregates.add_counts(counts, video['group'], part['Predicted_Sentiment'].astype(str).value_counts())
+                if 'cluster_id' in part.columns:
+                    # I cluster non attraversano le parti (blocchi o righe aggiunte dalla modalità watch)
+                    duplicates.setdefault(video['group'], []).append(
+                        near_dedup.duplicate_stats(part['cluster_id'].to_numpy()))
+        if not counts:
+            return False
+        _write_summary(aggregates.summary_from_counts(counts),
+                       {g: near_dedup.combine_stats(s) for g, s in duplicates.items()})
+
+    # Righe già sommate secondo lo stato di rollup e indice: la storia non viene riletta
+    rows = {video['key']: storage.count_rows('results', video['key']) for video in manifest}
+    rollup_rows = {key: done['rows'] for key, done in rollups.load_state()['keys'].items()}
+    index_rows = search_index.indexed_rows()
+
+    with timer('analisi.rollup'):
+        previous = rollups.load_state()['version']
+        reset, frames = _new_rows(manifest, rows, rollup_rows, scored_keys, ['time', 'Predicted_Sentiment'])
+        state = rollups.append(frames, videos.release_dates(), reset=reset)
+        if state['version'] != previous:
+            print(f"[OK] Rollup giornalieri/orari aggiornati (versione {state['version']})")
+    with timer('analisi.indice_ricerca'):
+        reset, frames = _new_rows(manifest, rows, index_rows, scored_keys, search_index.INDEX_COLUMNS)
+        search_index.append(frames, reset=reset)
+    return True
+
+
+# --- MODALITÀ WATCH: ANALISI INCREMENTALE ---
+
+def analyze_new_rows(new_rows, batch_size=BATCH_SIZE, workers=WORKERS, dedup=DEDUP):
+    """Classifica solo le righe nuove di ogni video e le aggiunge in coda ai risultati.
+
+    new_rows: [(video, DataFrame delle righe aggiunte a 'processed')]; i quasi-duplicati si
+    cercano dentro le righe nuove. Restituisce [(video, righe aggiunte ai risultati)].
+    """
+    video_frames = []
+    for video, df in new_rows:
+        if df.empty:
+            continue
+        print(f"Nuovi commenti {video['key']} ({video['group']}): {len(df)}")
+        # cluster_id prosegue la numerazione delle righe già nei risultati del video
+        offset = storage.count_rows('results', video['key'])
+        video_frames.append((video, _add_clusters(video, df.reset_index(drop=True), dedup, offset=offset)))
+    if not video_frames:
+        return []
+
+    results = _score_frames(video_frames, batch_size, workers)
+    for video, df_clean in results:
+        with timer('watch.scrittura_risultati', items=len(df_clean)):
+            storage.write_part('results', video['key'], video['group'], df_clean)
+    instrumentation.count('commenti_analizzati', sum(len(df) for _, df in results))
+    return results
+
+
+def update_aggregates_incremental(results):
+    """Somma le righe nuove a conteggi per stagione, quasi-duplicati, rollup e indice di ricerca, senza rileggere i risultati."""
+    results = [(video, df) for video, df in results if not df.empty]
+    if not results:
+        return
+    with timer('watch.aggregati'):
+        artifact = aggregates.load() or {}
+        df_new = pd.concat([pd.DataFrame({'season': video['group'], 'Predicted_Sentiment': df['Predicted_Sentiment']})
+                            for video, df in results], ignore_index=True)
+        seasons = aggregates.merge_season_summary(artifact.get('seasons'), df_new)
+        duplicates = dict(artifact.get('duplicates') or {})
+        for video, df in results:
+            duplicates[video['group']] = near_dedup.combine_stats(
+                [duplicates.get(video['group']), near_dedup.duplicate_stats(df['cluster_id'].to_numpy())])
+        _write_summary(seasons, duplicates)
+    with timer('watch.rollup'):
+        previous = rollups.load_state()['version']
+        state = rollups.append([(video['key'], video['group'], df[['time', 'Predicted_Sentiment']])
+                                for video, df in results], videos.release_dates())
+        if state['version'] != previous:
+            print(f"[OK] Rollup giornalieri/orari aggiornati (versione {state['version']})")
+    with timer('watch.indice_ricerca'):
+        search_index.append([(video['key'], video['group'], df[search_index.INDEX_COLUMNS]) for video, df in results])
+
+
+def run_full_analysis(batch_size=BATCH_SIZE, workers=WORKERS, export_csv=False, dedup=DEDUP, rescore=False,
+                      groups=None, tags=None, acquisition_running=None, chunk_rows=CHUNK_ROWS):
+    """Analizza i video acquisiti e non ancora analizzati (coda dei job), poi aggiorna gli aggregati.
+
+    rescore: rianalizza anche i video già analizzati; groups / tags: filtro sul manifest;
+    acquisition_running: funzione che indica se un'acquisizione (in un altro thread) è ancora
+    in corso: finché lo è, i video vengono analizzati man mano che arrivano;
+    chunk_rows: modalità streaming, un video alla volta a blocchi di chunk_rows righe.
+    """
+    print("\n--- FASE 3A: ANALISI SENTIMENT COMPLETA ---")
+    manifest = videos.load()
+    by_key = {v['key']: v for v in videos.select(manifest, groups, tags)}
+    queue = job_queue.open_queue(manifest)
+    if rescore:
+        queue.reset('scored', 'fetched', keys=by_key)
+
+    if chunk_rows:
+        print(f"   Modalità streaming: blocchi di {chunk_rows} righe")
+    analyzed = 0
+    scored_keys = set()
+    try:
+        while True:
+            # Stato dell'acquisizione letto PRIMA del claim: se era già finita, il claim vede tutto
+            running = acquisition_running is not None and acquisition_running()
+            jobs = queue.claim('fetched', 'scoring', limit=1 if chunk_rows else SCORING_JOBS_PER_CLAIM, keys=by_key)
+            if not jobs:
+                if not running:
+                    break
+                time.sleep(ACQUISITION_POLL_SECONDS)
+                continue
+            heartbeat = _job_heartbeat(queue, [job['key'] for job in jobs])
+            try:
+                if chunk_rows:
+                    rows = {job['key']: _stream_video(by_key[job['key']], batch_size, workers, dedup, chunk_rows,
+                                                      heartbeat)
+                            for job in jobs}
+                else:
+                    rows = _score_jobs(jobs, by_key, batch_size, workers, dedup, heartbeat)
+            except BaseException as e:
+                for job in jobs:
+                    queue.release(job['key'], e)
+                raise
+            for key, n in rows.items():
+                queue.finish(key, 'scored', rows=n)
+            analyzed += sum(rows.values())
+            scored_keys.update(rows)
+    finally:
+        queue.report()
+        queue.close()
+
+    if analyzed:
+        instrumentation.count('commenti_analizzati', analyzed)
+        print(f"[OK] Analizzati {analyzed} commenti.")
     else:
+        print("[OK] Nessun video nuovo da analizzare (usa --rescore per rianalizzare).")
+
+    # Con --rescore (analisi per intero) update() confronta le impronte di tutte le righe e
+    # ricostruisce solo i video con risultati cambiati; altrimenti si sommano solo le righe nuove
+    if rescore and not chunk_rows:
+        refreshed = _refresh_aggregates(manifest)
+    else:
+        refreshed = _merge_aggregates(manifest, scored_keys)
+    if not refreshed:
         print("[ERRORE] Nessun dato analizzato.")
+        return
+    if export_csv:
+        with timer('analisi.esportazione_csv'):
+            storage.export_csv('results', FULL_RESULTS_CSV_FILE)
+        print(f"[OK] Esportazione CSV: {FULL_RESULTS_CSV_FILE}")
+    print(f"[OK] Risultati analisi salvati.")
 
 
-# --- FASE 3B: VALIDAZIONE E SALVATAGGIO ---
-def validate_and_save():
-    """Convalida il modello e SALVA i risultati per l'App."""
-    print("\n--- FASE 3B: VALIDAZIONE E SALVATAGGIO ---")
-    
-    if not os.path.exists(VALIDATION_SET_LABELED_FILE):
-        print(f"[ERRORE] File validazione non trovato.")
+def _refresh_aggregates(manifest):
+    """Percentuali, quasi-duplicati, rollup e indice di ricerca dai risultati salvati dei video del manifest."""
+    all_data, rollup_frames, index_frames, duplicates = [], [], [], {}
+    with timer('analisi.aggregati'):
+        for video in manifest:
+            df = storage.read('results', columns=['time', 'Predicted_Sentiment', 'Sentiment_Score', 'cluster_id'],
+                              key=video['key'])
+            if df.empty:
+                continue
+            all_data.append(pd.DataFrame({'season': video['group'], 'Predicted_Sentiment': df['Predicted_Sentiment']}))
+            if 'cluster_id' in df.columns:
+                duplicates.setdefault(video['group'], []).append(
+                    near_dedup.duplicate_stats(df['cluster_id'].to_numpy()))
+            if 'time' in df.columns:
+                rollup_frames.append((video['key'], video['group'], df[['time', 'Predicted_Sentiment']]))
+                index_frames.append((video['key'], video['group'], df.drop(columns='cluster_id', errors='ignore')))
+        if not all_data:
+            return False
+        _save_percentages(pd.concat(all_data, ignore_index=True),
+                          duplicates={g: near_dedup.combine_stats(s) for g, s in duplicates.items()})
+    with timer('analisi.rollup'):
+        _update_rollups(rollup_frames)
+    with timer('analisi.indice_ricerca'):
+        _update_search_index(index_frames)
+    return True
+
+
+def _save_percentages(df_results, duplicates=None):
+    _write_summary(aggregates.season_summary(df_results), duplicates)
+
+
+def _write_summary(seasons, duplicates=None):
+    """Percentuali per stagione (CSV) e artefatto per la dashboard da un riepilogo per stagione."""
+    sentiment_counts = aggregates.seasons_frame({'seasons': seasons})
+    sentiment_counts = sentiment_counts[sentiment_counts['Conteggio'] > 0].rename(columns={'Percentuale': 'Percentage'})
+    sentiment_counts[['season', 'Predicted_Sentiment', 'Percentage']].to_csv(ANALYSIS_RESULTS_FILE, index=False)
+    # Artefatto per la dashboard (totali, conteggi e percentuali per stagione)
+    sections = {'duplicates': duplicates} if duplicates is not None else {}
+    artifact = aggregates.update(seasons=seasons, meta={'model': MODEL_NAME, 'backend': INFERENCE_BACKEND}, **sections)
+    print(f"[OK] Aggregati salvati in: {aggregates.AGGREGATES_FILE} (versione {artifact['version']})")
+
+
+def _update_rollups(frames):
+    """Somma ai rollup giornalieri/orari solo le righe nuove di ogni video."""
+    if not frames:
+        return
+    previous = rollups.load_state()['version']
+    state = rollups.update(frames, videos.release_dates())
+    if state['version'] == previous:
+        print("[OK] Rollup giornalieri/orari già aggiornati (nessuna riga nuova)")
+    else:
+        print(f"[OK] Rollup giornalieri/orari aggiornati (versione {state['version']})")
+
+
+def _update_search_index(frames):
+    """Aggiunge all'indice full-text (search_index) solo le righe nuove di ogni video."""
+    if not frames:
+        return
+    added = search_index.update(frames)
+    if added:
+        print(f"[OK] Indice di ricerca aggiornato: {added} commenti aggiunti ({search_index.INDEX_FILE})")
+    else:
+        print("[OK] Indice di ricerca già aggiornato (nessuna riga nuova)")
+
+
+@timer('aggregazione')
+def aggregate_results():
+    """Ricalcola percentuali, quasi-duplicati e rollup dai risultati già salvati (senza inferenza)."""
+    print("\n--- AGGREGAZIONE RISULTATI ---")
+    if not _refresh_aggregates(videos.load()):
+        print("[ERRORE] Risultati completi non trovati. Esegui prima l'analisi.")
         return
+    print(f"[OK] Percentuali salvate in: {ANALYSIS_RESULTS_FILE}")
+
+    df_val = storage.read('validation_predictions', columns=['Ground_Truth_Label', 'Predicted_Sentiment'],
+                          key='validation')
+    if not df_val.empty:
+        _save_validation_metrics(df_val)
+        run_evaluation()
+
+
+def _save_validation_metrics(df_val):
+    """Metriche di validazione (accuratezza, matrice di confusione, ...) nell'artefatto della dashboard."""
+    metrics = aggregates.validation_summary(df_val['Ground_Truth_Label'], df_val['Predicted_Sentiment'])
+    aggregates.update(validation=metrics)
+    return metrics
 
+
+# --- FASE 3B: VALIDAZIONE E SALVATAGGIO ---
+def _load_validation_set():
+    """Legge e pulisce il set etichettato a mano (None se non disponibile).
+
+    Il testo viene normalizzato come quello del corpus (originale in text_raw), così
+    validazione e confronto dei backend misurano l'input che vede l'analisi.
+    """
     try:
         df_val = pd.read_csv(VALIDATION_SET_LABELED_FILE)
     except:
-        return
+        return None
 
     # Pulizia base
     df_val.columns = [c.strip() for c in df_val.columns]
     df_val.dropna(subset=['Ground_Truth_Label', 'text'], inplace=True)
     df_val['Ground_Truth_Label'] = df_val['Ground_Truth_Label'].astype(str).str.upper().str.strip()
     df_val = df_val[df_val['Ground_Truth_Label'].isin(['POSITIVE', 'NEGATIVE'])].copy()
+    _report_normalization('validation', _normalize(df_val, 'validazione.normalizzazione'))
+    return df_val[df_val['text'] != '']
+
+
+@timer('validazione')
+def validate_and_save(batch_size=BATCH_SIZE, export_csv=False):
+    """Convalida il modello e SALVA i risultati per l'App."""
+    print("\n--- FASE 3B: VALIDAZIONE E SALVATAGGIO ---")
+    
+    if not os.path.exists(VALIDATION_SET_LABELED_FILE):
+        print(f"[ERRORE] File validazione non trovato.")
+        return
+
+    df_val = _load_validation_set()
+    if df_val is None:
+        return
 
     print(f"Validazione su {len(df_val)} commenti...")
     
-    # Eseguiamo le predizioni ORA (così l'app non deve farlo)
-    df_val['Predicted_Sentiment'] = df_val['text'].apply(predict_sentiment)
+    # Eseguiamo le predizioni ORA (così l'app non deve farlo); dalla cache se già calcolate
+    predictions = predict_sentiment_scores(df_val['text'], batch_size=batch_size)
+    df_val[['Predicted_Sentiment', 'Sentiment_Score']] = predictions
+    df_val['backend'] = INFERENCE_BACKEND
     df_val = df_val.dropna(subset=['Predicted_Sentiment'])
 
     # Salviamo questo file prezioso per Streamlit!
-    df_val.to_csv(VALIDATION_PREDICTIONS_FILE, index=False)
-    print(f"[OK] Previsioni validazione salvate in: {VALIDATION_PREDICTIONS_FILE}")
+    saved_path = storage.replace('validation_predictions', 'validation', None, df_val)
+    print(f"[OK] Previsioni validazione salvate in: {saved_path}")
+    if export_csv:
+        df_val.to_csv(VALIDATION_PREDICTIONS_FILE, index=False)
+        print(f"[OK] Esportazione CSV: {VALIDATION_PREDICTIONS_FILE}")
+
+    # Metriche per la dashboard + report rapido
+    metrics = _save_validation_metrics(df_val)
+    print(f"Accuratezza calcolata: {metrics['accuracy']*100:.2f}%")
+    run_evaluation()
+
 
-    # Stampiamo report rapido
-    acc = accuracy_score(df_val['Ground_Truth_Label'], df_val['Predicted_Sentiment'])
-    print(f"Accuratezza calcolata: {acc*100:.2f}%")
+# --- VALUTAZIONE PER SOGLIA E BACKEND (SENZA INFERENZA) ---
+def _stored_validation_predictions():
+    """{backend: DataFrame text/Ground_Truth_Label/Predicted_Sentiment/Sentiment_Score} dalle previsioni salvate.
+
+    La chiave 'validation' (backend corrente) viene prima dei risultati di compare_backends.
+    """
+    frames = {}
+    keys = storage.list_keys('validation_predictions')
+    for key in sorted(keys, key=lambda k: k != 'validation'):
+        df = storage.read('validation_predictions', key=key)
+        if df.empty or 'Sentiment_Score' not in df.columns:
+            continue  # Previsioni salvate prima degli score: serve una nuova validazione
+        backend = str(df['backend'].iloc[0]) if 'backend' in df.columns else key
+        # Previsioni salvate prima della normalizzazione: stesso testo dei run più recenti
+        text_normalization.normalize_frame(df)
+        frames.setdefault(backend, df[['text', 'Ground_Truth_Label', 'Predicted_Sentiment', 'Sentiment_Score']])
+    return frames
+
+
+@timer('valutazione')
+def run_evaluation(thresholds=evaluation.THRESHOLDS, n_boot=evaluation.BOOTSTRAP_SAMPLES):
+    """Matrici di confusione, precision/recall e intervalli bootstrap per ogni soglia e backend."""
+    frames = _stored_validation_predictions()
+    if not frames:
+        print("[AVVISO] Nessuna previsione di validazione con score: esegui prima la validazione.")
+        return None
+
+    # Stessi commenti per tutti i backend (confronto appaiato)
+    merged = None
+    for backend, df in frames.items():
+        df = df.drop_duplicates('text').rename(columns={'Predicted_Sentiment': f'label:{backend}',
+                                                        'Sentiment_Score': f'score:{backend}'})
+        merged = df if merged is None else merged.merge(df.drop(columns='Ground_Truth_Label'), on='text')
+    predictions = {b: (merged[f'label:{b}'].astype(object).to_numpy(), merged[f'score:{b}'].to_numpy()) for b in frames}
+    result = evaluation.evaluate(merged['Ground_Truth_Label'].astype(str), predictions, thresholds, n_boot)
+
+    aggregates.update(evaluation=result)
+    df_eval = evaluation.evaluation_frame(result)
+    df_eval.to_csv(EVALUATION_FILE, index=False)
+
+    print(f"Valutazione su {result['n']} commenti, {len(thresholds)} soglie, backend: {', '.join(frames)}")
+    summary = df_eval[df_eval['metric'].isin(['coverage', 'accuracy'])].pivot_table(
+        index=['model', 'threshold'], columns='metric', values='value')
+    print(summary.to_string(float_format=lambda v: f"{v:.3f}"))
+    print(f"[OK] Valutazione salvata in: {EVALUATION_FILE}")
+    return result
+
+
+# --- CONFRONTO BACKEND ---
+def compare_backends(backends=BACKENDS, batch_size=BATCH_SIZE):
+    """Esegue ogni backend sul set etichettato: accuratezza, accordo con PyTorch e velocità.
+
+    La cache delle predizioni non viene usata, così i tempi misurano l'inferenza reale.
+    """
+    print("\n--- CONFRONTO BACKEND DI INFERENZA ---")
+
+    if not os.path.exists(VALIDATION_SET_LABELED_FILE):
+        print(f"[ERRORE] File validazione non trovato.")
+        return None
+    df_val = _load_validation_set()
+    if df_val is None or df_val.empty:
+        print("[ERRORE] Nessun commento etichettato valido.")
+        return None
+
+    texts = df_val['text'].tolist()
+    truth = df_val['Ground_Truth_Label'].to_numpy()
+    original_backend = INFERENCE_BACKEND
+
+    predictions, rows = {}, []
+    try:
+        for backend in backends:
+            set_backend(backend)
+            get_pipeline()  # Il caricamento del modello non rientra nel tempo misurato
+            start = time.perf_counter()
+            results = _infer_batched(texts, batch_size)
+            elapsed = time.perf_counter() - start
+            predictions[backend] = pd.Series([r[0] if r else None for r in results], dtype=object).to_numpy()
+            # Previsioni con score salvate per la valutazione per soglia (run_evaluation)
+            storage.replace('validation_predictions', f"backend_{backend}", None, df_val.assign(
+                Predicted_Sentiment=predictions[backend], Sentiment_Score=[r[1] if r else np.nan for r in results],
+                backend=backend)[['text', 'text_raw', 'Ground_Truth_Label', 'Predicted_Sentiment', 'Sentiment_Score',
+                                  'backend']])
+            rows.append({
+                'backend': backend,
+                'accuracy': float((predictions[backend] == truth).mean()),
+                'comments_per_sec': len(texts) / elapsed if elapsed else float('nan'),
+                'seconds': elapsed,
+            })
+    finally:
+        set_backend(original_backend)
+
+    df_cmp = pd.DataFrame(rows)
+    reference = 'pytorch' if 'pytorch' in predictions else df_cmp['backend'].iloc[0]
+    ref_speed = df_cmp.loc[df_cmp['backend'] == reference, 'comments_per_sec'].iloc[0]
+    df_cmp['agreement_with_' + reference] = [float((predictions[b] == predictions[reference]).mean()) for b in df_cmp['backend']]
+    df_cmp['speedup'] = df_cmp['comments_per_sec'] / ref_speed
+
+    df_cmp.to_csv(BACKEND_COMPARISON_FILE, index=False)
+    print(f"Confronto su {len(texts)} commenti etichettati:")
+    print(df_cmp.to_string(index=False, float_format=lambda v: f"{v:.3f}"))
+    print(f"[OK] Confronto salvato in: {BACKEND_COMPARISON_FILE}")
+    run_evaluation()
+    return df_cmp
 
 
 if __name__ == "__main__":
-    run_full_analysis()
-    validate_and_save()
+    parser = argparse.ArgumentParser(description="Analisi sentiment e validazione dei commenti processati.")
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help="Commenti per forward pass")
+    parser.add_argument('--workers', type=int, default=WORKERS,
+                        help=f"Processi di inferenza su CPU (core disponibili: {_available_cores()})")
+    parser.add_argument('--backend', choices=BACKENDS, default=INFERENCE_BACKEND, help="Backend di inferenza")
+    parser.add_argument('--export-csv', action='store_true', help="Esporta anche i risultati nei vecchi file CSV")
+    parser.add_argument('--no-dedup', action='store_true', help="Classifica tutti i commenti, anche i quasi-duplicati")
+    parser.add_argument('--rescore', action='store_true', help="Rianalizza anche i video già analizzati")
+    parser.add_argument('--groups', nargs='+', help="Solo i video di questi gruppi del manifest (es. S1 S2)")
+    parser.add_argument('--tags', nargs='+', help="Solo i video con almeno uno di questi tag")
+    parser.add_argument('--chunk-rows', type=int, default=CHUNK_ROWS,
+                        help="Modalità streaming: righe per blocco (memoria costante al crescere del corpus)")
+    parser.add_argument('--profile', help="Stadio da registrare con cProfile (es. inferenza.modello)")
+    args = parser.parse_args()
+    set_backend(args.backend)
+
+    instrumentation.start_run('sentiment_processor', profile_stage=args.profile)
+    try:
+        try:
+            run_full_analysis(batch_size=args.batch_size, workers=args.workers, export_csv=args.export_csv,
+                              dedup=not args.no_dedup, rescore=args.rescore, groups=args.groups, tags=args.tags,
+                              chunk_rows=args.chunk_rows)
+        finally:
+            shutdown_worker_pool()
+        validate_and_save(batch_size=args.batch_size, export_csv=args.export_csv)
+        report_cache()
+    finally:
+        instrumentation.finish_run()
     print("\n--- ELABORAZIONE COMPLETATA ---")
@@ -0,0 +1,259 @@
+import os
+import re
+import glob
+import importlib.util
+import pandas as pd
+
+# --- LIVELLO DI STORAGE DEI DATASET ---
+# I dataset sono salvati a "parti" partizionate per stagione:
+#
+#   data/processed/season=S1/S1_Hype-00000.parquet
+#   data/results/full/season=S1/S1_Hype-00000.parquet
+#
+# Ogni chiave (es. il prefisso di un video) ha una o più parti numerate: l'acquisizione
+# aggiunge una parte a ogni blocco scritto, l'analisi sostituisce le parti della chiave.
+# Formato: Parquet (colonne categoriche per season/Predicted_Sentiment, timestamp tipizzati)
+# se pyarrow è installato, altrimenti CSV. STRANGER_STORAGE=csv forza il CSV.
+# I lettori leggono entrambi i formati e, per 'processed', anche i vecchi *_processed.csv.
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_DIR = os.path.join(BASE_DIR, 'data')
+
+DATASETS = {
+    'processed': os.path.join(DATA_DIR, 'processed'),
+    'results': os.path.join(DATA_DIR, 'results', 'full'),
+    'validation_predictions': os.path.join(DATA_DIR, 'results', 'validation'),
+    'rollups': os.path.join(DATA_DIR, 'results', 'rollups'),
+}
+
+CATEGORICAL_COLUMNS = ('season', 'Predicted_Sentiment')
+TIMESTAMP_COLUMNS = ('time',)
+_PART_RE = re.compile(r'^(?P<key>.+)-(?P<index>\d{5})\.(?P<ext>parquet|csv)$')
+
+
+def storage_format():
+    fmt = os.environ.get('STRANGER_STORAGE', '').lower()
+    if fmt in ('parquet', 'csv'):
+        return fmt
+    return 'parquet' if importlib.util.find_spec('pyarrow') is not None else 'csv'
+
+
+def _partition_dir(dataset, season):
+    base = DATASETS[dataset]
+    return os.path.join(base, f"season={season}") if season else base
+
+
+def _legacy_csv(dataset, key):
+    """Vecchio formato (un CSV per video), ancora letto per compatibilità."""
+    if dataset == 'processed':
+        return os.path.join(DATASETS['processed'], f"{key}_processed.csv")
+    return None
+
+
+def _prepare(df, copy=True):
+    """Tipi di colonna comuni: categorie per le etichette, timestamp UTC per 'time'."""
+    if copy:
+        df = df.copy()
+    for col in TIMESTAMP_COLUMNS:
+        if col in df.columns and not pd.api.types.is_datetime64_any_dtype(df[col]):
+            df[col] = pd.to_datetime(df[col], utc=True, errors='coerce')
+    for col in CATEGORICAL_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].astype('category')
+    return df
+
+
+# --- PARTI ---
+
+def part_paths(dataset, key=None, seasons=None):
+    """Parti del dataset (ordinate per chiave e indice), filtrate per chiave/stagioni."""
+    base = DATASETS[dataset]
+    if seasons is None:
+        dirs = [base] + sorted(glob.glob(os.path.join(base, 'season=*')))
+    else:
+        dirs = [_partition_dir(dataset, s) for s in seasons]
+
+    parts = []
+    for d in dirs:
+        if not os.path.isdir(d):
+            continue
+        for name in os.listdir(d):
+            m = _PART_RE.match(name)
+            if m and (key is None or m.group('key') == key):
+                parts.append((m.group('key'), int(m.group('index')), os.path.join(d, name)))
+    return [path for _, _, path in sorted(parts)]
+
+
+def count_parts(dataset, key):
+    return len(part_paths(dataset, key))
+
+
+def write_part(dataset, key, season, df, index=None):
+    """Scrive una nuova parte della chiave e ne restituisce il percorso."""
+    if index is None:
+        index = count_parts(dataset, key)
+    directory = _partition_dir(dataset, season)
+    os.makedirs(directory, exist_ok=True)
+
+    fmt = storage_format()
+    path = os.path.join(directory, f"{key}-{index:05d}.{fmt}")
+    if fmt == 'parquet':
+        _prepare(df).to_parquet(path, index=False)
+    else:
+        df.to_csv(path, index=False, encoding='utf-8')
+    return path
+
+
+def remove_parts(dataset, key, keep=0):
+    """Elimina le parti della chiave con indice >= keep (keep=0 elimina anche il vecchio CSV)."""
+    for path in part_paths(dataset, key):
+        if int(_PART_RE.match(os.path.basename(path)).group('index')) >= keep:
+            os.remove(path)
+    legacy = _legacy_csv(dataset, key)
+    if keep == 0 and legacy and os.path.exists(legacy):
+        os.remove(legacy)
+
+
+def replace(dataset, key, season, df):
+    """Sostituisce tutti i dati della chiave con df."""
+    remove_parts(dataset, key)
+    return write_part(dataset, key, season, df, index=0)
+
+
+# --- LETTURA ---
+
+def _read_file(path, columns=None):
+    if path.endswith('.parquet'):
+        if columns is not None:
+            import pyarrow.parquet as pq
+            available = set(pq.read_schema(path).names)
+            columns = [c for c in columns if c in available]
+        return pd.read_parquet(path, columns=columns)
+
+    try:
+        return pd.read_csv(path, sep=_csv_separator(path), usecols=_usecols(columns))
+    except pd.errors.EmptyDataError:
+        return pd.DataFrame(columns=columns or [])
+
+
+def _csv_separator(path):
+    """Alcuni vecchi CSV sono stati salvati con ';' come separatore."""
+    with open(path, encoding='utf-8') as f:
+        header = f.readline()
+    return ';' if ';' in header and ',' not in header else ','
+
+
+def _usecols(columns):
+    return (lambda c: c in columns) if columns is not None else None
+
+
+def _sources(dataset, key=None, seasons=None, keys=None):
+    """File da leggere: le parti e, per le chiavi senza parti, il vecchio CSV."""
+    paths = part_paths(dataset, key, seasons)
+    if dataset == 'processed':
+        with_parts = {_key_of(p) for p in part_paths(dataset, key)}
+        pattern = _legacy_csv(dataset, key) if key else _legacy_csv(dataset, '*')
+        for legacy in sorted(glob.glob(pattern)):
+            legacy_key = _key_of(legacy)
+            # I vecchi prefissi iniziano con la stagione (es. 'S1_Hype')
+            if legacy_key not in with_parts and (seasons is None or legacy_key.split('_')[0] in seasons):
+                paths.append(legacy)
+    if keys is not None:
+        keys = set(keys)
+        paths = [p for p in paths if _key_of(p) in keys]
+    return paths
+
+
+def _key_of(path):
+    name = os.path.basename(path)
+    m = _PART_RE.match(name)
+    return m.group('key') if m else name[:-len('_processed.csv')]
+
+
+def list_keys(dataset):
+    return sorted({_key_of(p) for p in _sources(dataset)})
+
+
+def exists(dataset, key=None):
+    return bool(_sources(dataset, key))
+
+
+def count_rows(dataset, key=None):
+    """Righe salvate senza leggerne i dati (metadati Parquet; i CSV vengono contati)."""
+    return sum(_count_file_rows(path) for path in _sources(dataset, key))
+
+
+def _count_file_rows(path):
+    if path.endswith('.parquet'):
+        import pyarrow.parquet as pq
+        return pq.ParquetFile(path).metadata.num_rows
+    return _count_csv_rows(path)
+
+
+def _count_csv_rows(path):
+    # Solo la prima colonna: con usecols vuoto pandas restituisce zero righe
+    try:
+        return len(pd.read_csv(path, sep=_csv_separator(path), usecols=[0]))
+    except pd.errors.EmptyDataError:
+        return 0
+
+
+def read(dataset, columns=None, key=None, seasons=None, keys=None):
+    """Legge il dataset (solo le colonne richieste) in un unico DataFrame."""
+    frames = []
+    for path in _sources(dataset, key, seasons, keys):
+        try:
+            frames.append(_read_file(path, columns))
+        except Exception as e:
+            print(f"⚠️ Errore lettura {os.path.basename(path)}: {e}")
+    frames = [f for f in frames if not f.empty]
+    if not frames:
+        return pd.DataFrame(columns=columns or [])
+    return _prepare(pd.concat(frames, ignore_index=True), copy=False)
+
+
+def iter_batches(dataset, columns=None, batch_size=50_000, key=None, seasons=None, keys=None):
+    """Legge il dataset a blocchi di al più batch_size righe (memoria costante)."""
+    for path in _sources(dataset, key, seasons, keys):
+        if path.endswith('.parquet'):
+            import pyarrow.parquet as pq
+            parquet_file = pq.ParquetFile(path)
+            cols = [c for c in columns if c in parquet_file.schema_arrow.names] if columns is not None else None
+            for batch in parquet_file.iter_batches(batch_size=batch_size, columns=cols):
+                yield _prepare(batch.to_pandas(), copy=False)
+        else:
+            try:
+                for chunk in pd.read_csv(path, sep=_csv_separator(path), usecols=_usecols(columns), chunksize=batch_size):
+                    yield _prepare(chunk, copy=False)
+            except pd.errors.EmptyDataError:
+                continue
+
+
+def iter_parts(dataset, columns=None, key=None, seasons=None, keys=None, skip_rows=0):
+    """Legge il dataset una parte (file) alla volta.
+
+    skip_rows: righe iniziali da saltare; le parti che cadono per intero prima vengono
+    saltate contando le righe (metadati Parquet) senza leggerne i dati.
+    """
+    for path in _sources(dataset, key, seasons, keys):
+        if skip_rows:
+            n = _count_file_rows(path)
+            if skip_rows >= n:
+                skip_rows -= n
+                continue
+        df = _read_file(path, columns)
+        if skip_rows:
+            df, skip_rows = df.iloc[skip_rows:].reset_index(drop=True), 0
+        if not df.empty:
+            yield _prepare(df, copy=False)
+
+
+def export_csv(dataset, path, columns=None):
+    """Esporta l'intero dataset in un unico CSV (formato compatibile con le versioni precedenti)."""
+    header = True
+    if os.path.exists(path):
+        os.remove(path)
+    for chunk in iter_batches(dataset, columns):
+        chunk.to_csv(path, mode='a', header=header, index=False)
+        header = False
+    return path
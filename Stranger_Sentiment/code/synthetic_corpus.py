@@ -0,0 +1,88 @@
+import numpy as np
+import pandas as pd
+
+# --- CORPUS SINTETICO DI COMMENTI YOUTUBE ---
+# Generatore deterministico (stessa seed -> stesso corpus) per benchmark e prove offline.
+# Le righe hanno le stesse colonne dei dati processati (text, time, season) e imitano i
+# commenti reali: lunghezze con coda lunga, entità HTML e tag lasciati dall'API,
+# emoji, commenti non inglesi, spam ripetuto e una densità che cresce verso l'uscita.
+
+ENGLISH_WORDS = (
+    "i love this show so much can't wait for the new season stranger things is the best "
+    "series ever eleven hopper dustin steve will mike lucas max hawkins upside down "
+    "trailer looks amazing awesome incredible boring bad worst disappointed hype finally "
+    "netflix please release it already who else is here after watching again chills "
+    "episode music soundtrack kate bush running up that hill vecna demogorgon mind flayer "
+    "this gave me goosebumps not sure about it looks great honestly cried so good year"
+).split()
+
+FOREIGN_WORDS = {
+    'es': "me encanta esta serie no puedo esperar la nueva temporada es increíble que ganas".split(),
+    'it': "non vedo l'ora della nuova stagione questa serie è bellissima che emozione trailer".split(),
+    'pt': "eu amo essa série não aguento esperar a nova temporada que incrível muito bom".split(),
+    'de': "ich liebe diese serie kann die neue staffel kaum erwarten einfach großartig".split(),
+}
+
+EMOJI = ['😍', '🔥', '😭', '😱', '❤️', '👀', '🙌', '💀', '😂', '🤯']
+HTML_FRAGMENTS = ['&amp;', '&#39;', '&quot;', '<br>', '<b>wow</b>', '&lt;3',
+                  '<a href="https://www.youtube.com/watch?v=b9EkMc79ZSU&amp;t=90">1:30</a>']
+SPAM = ['First!', 'Who is here in 2024?', 'Like if you are watching this again 🔥', 'SUBSCRIBE TO MY CHANNEL']
+
+DEFAULT_RELEASE_DATES = {
+    'S1': '2016-07-15', 'S2': '2017-10-27', 'S3': '2019-07-04', 'S4': '2022-05-27', 'S5': '2025-11-26',
+}
+
+
+def _words_per_comment(rng, n):
+    """Lunghezze log-normali (mediana ~9 parole) con una coda di commenti lunghi, max 400 parole."""
+    return np.clip(rng.lognormal(mean=2.2, sigma=0.9, size=n).astype(int), 1, 400)
+
+
+def generate(n_rows, seed=0, release_dates=None, foreign_ratio=0.15, emoji_ratio=0.25,
+             html_ratio=0.1, spam_ratio=0.03, days_before=60):
+    """DataFrame di n_rows commenti (text, time, season, lang) riproducibile con la seed."""
+    release_dates = release_dates or DEFAULT_RELEASE_DATES
+    rng = np.random.default_rng(seed)
+    seasons = np.array(sorted(release_dates))
+
+    season = seasons[rng.integers(0, len(seasons), n_rows)]
+    lengths = _words_per_comment(rng, n_rows)
+    kind = rng.random(n_rows)
+    foreign_langs = np.array(sorted(FOREIGN_WORDS))
+    lang = np.where(kind < foreign_ratio, foreign_langs[rng.integers(0, len(foreign_langs), n_rows)], 'en')
+    is_spam = (kind >= foreign_ratio) & (kind < foreign_ratio + spam_ratio)
+    add_emoji = rng.random(n_rows) < emoji_ratio
+    add_html = rng.random(n_rows) < html_ratio
+
+    # Indici delle parole estratti tutti insieme (il ciclo sotto fa solo i join)
+    vocabularies = {'en': ENGLISH_WORDS, **FOREIGN_WORDS}
+    vocab_size = pd.Series(lang).map({code: len(words) for code, words in vocabularies.items()}).to_numpy()
+    word_index = (rng.random(lengths.sum()) * np.repeat(vocab_size, lengths)).astype(np.int64).tolist()
+    ends = np.cumsum(lengths).tolist()
+    emoji = rng.integers(0, len(EMOJI), n_rows)
+    html = rng.integers(0, len(HTML_FRAGMENTS), n_rows)
+    spam = rng.integers(0, len(SPAM), n_rows)
+
+    texts = []
+    langs = lang.tolist()
+    for i in range(n_rows):
+        if is_spam[i]:
+            texts.append(SPAM[spam[i]])
+            continue
+        start = ends[i - 1] if i else 0
+        text = ' '.join(map(vocabularies[langs[i]].__getitem__, word_index[start:ends[i]]))
+        if add_html[i]:
+            text = f"{text} {HTML_FRAGMENTS[html[i]]}"
+        if add_emoji[i]:
+            text = f"{text} {EMOJI[emoji[i]] * int(1 + emoji[i] % 3)}"
+        texts.append(text)
+
+    # Più commenti a ridosso dell'uscita: distanza esponenziale (media ~12 giorni), max days_before
+    offsets = np.minimum(rng.exponential(12.0, n_rows), days_before)
+    release = pd.to_datetime(pd.Series(season).map(release_dates), utc=True) + pd.Timedelta(hours=23, minutes=59)
+    times = release - pd.to_timedelta(offsets, unit='D')
+    # Stesso formato di publishedAt (es. 2016-07-15T23:58:52Z)
+    time_str = np.datetime_as_string(times.dt.tz_localize(None).to_numpy().astype('datetime64[s]'), unit='s', timezone='UTC')
+
+    df = pd.DataFrame({'text': texts, 'time': time_str, 'season': season, 'lang': lang})
+    return df.sort_values(['season', 'time'], ascending=[True, False], ignore_index=True)
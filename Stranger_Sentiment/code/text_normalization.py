@@ -0,0 +1,104 @@
+import re
+import html
+
+import numpy as np
+import pandas as pd
+
+# --- NORMALIZZAZIONE DEL TESTO DEI COMMENTI ---
+# Stadio tra acquisizione e analisi: il testo che arriva dall'API (textDisplay in modalità
+# 'full' e nei vecchi CSV) contiene HTML (<br>, <a href=...>1:30</a>, <b>), entità (&amp;,
+# &#39;) e link che occupano token del modello e disturbano il rilevamento della lingua.
+# Sulla colonna intera, con operazioni di stringa di pandas e pattern precompilati:
+#
+#   1. <br> -> spazio, altri tag rimossi (il testo dei link resta)
+#   2. URL rimossi
+#   3. entità HTML convertite nel carattere corrispondente
+#   4. spazi compattati e testo tagliato a MAX_CHARS caratteri
+#
+# Le parole restano quelle scritte: ripetizioni come "soooo" o "!!!!" non vengono ridotte,
+# perché cambierebbero il testo (e l'etichetta) che il modello vede, non solo il markup.
+#
+# Il testo originale resta nella colonna text_raw: la normalizzazione riparte sempre da lì,
+# quindi si può rieseguire (o cambiare) senza riacquisire i dati.
+
+RAW_COLUMN = 'text_raw'
+MAX_CHARS = 2000    # Oltre ~512 token il modello tronca comunque: il resto è solo costo
+TOKEN_SAMPLE = 2000  # Testi per video su cui contare i token prima/dopo (per il report)
+
+_BR_RE = re.compile(r'<br\s*/?>', re.IGNORECASE)
+_TAG_RE = re.compile(r'</?[A-Za-z][^<>]{0,500}>')
+_URL_RE = re.compile(r'(?:https?://|www\.)\S+', re.IGNORECASE)
+_ENTITY_RE = re.compile(r'&(?:#\d{1,7}|#[xX][0-9A-Fa-f]{1,6}|[A-Za-z][A-Za-z0-9]{1,31});')
+_SPACE_RE = re.compile(r'\s+')
+
+
+def _unescape(match):
+    return html.unescape(match.group(0))
+
+
+def normalize_texts(texts):
+    """Serie di testi normalizzati (stesso indice; valori mancanti -> stringa vuota)."""
+    texts = pd.Series(texts, dtype=object).fillna('').astype(str)
+    texts = texts.str.replace(_BR_RE, ' ', regex=True)
+    texts = texts.str.replace(_TAG_RE, '', regex=True)
+    texts = texts.str.replace(_URL_RE, ' ', regex=True)
+    # Le entità solo dopo i tag: "&lt;3" deve restare "<3" e non sparire come un tag
+    # (callback Python: solo sulle righe che contengono '&')
+    has_entity = texts.str.contains('&', regex=False)
+    if has_entity.any():
+        texts[has_entity] = texts[has_entity].str.replace(_ENTITY_RE, _unescape, regex=True)
+    texts = texts.str.replace(_SPACE_RE, ' ', regex=True).str.strip()
+    return texts.str.slice(0, MAX_CHARS).str.rstrip()
+
+
+def normalize_frame(df):
+    """Aggiunge text_raw (se manca) e riscrive text come versione normalizzata di text_raw."""
+    if RAW_COLUMN not in df.columns:
+        df[RAW_COLUMN] = df['text']
+    else:
+        # Parti scritte prima della normalizzazione (text_raw vuoto): l'originale è in text
+        df[RAW_COLUMN] = df[RAW_COLUMN].where(df[RAW_COLUMN].notna(), df['text'])
+    df['text'] = normalize_texts(df[RAW_COLUMN]).to_numpy()
+    return df
+
+
+def token_counts(df, token_lengths, sample=TOKEN_SAMPLE, seed=0):
+    """Token (contati con token_lengths) prima e dopo la normalizzazione su un campione di righe.
+
+    Restituisce somme, così i conteggi di più blocchi o video si possono sommare
+    (combine_counts) prima di calcolare le medie (describe).
+    """
+    rows = df.sample(n=sample, random_state=seed) if len(df) > sample else df
+    changed = (rows['text'] != rows[RAW_COLUMN].fillna('').astype(str)).to_numpy()
+
+    def total(texts):
+        return int(np.sum(token_lengths(texts.astype(str).tolist()))) if len(texts) else 0
+
+    # I testi non modificati contano uguale prima e dopo: si tokenizzano una sola volta
+    unchanged = total(rows['text'][~changed])
+    return {
+        'rows': int(len(df)),
+        'changed': int((df['text'] != df[RAW_COLUMN].fillna('').astype(str)).sum()),
+        'sampled': int(len(rows)),
+        'tokens_before': unchanged + total(rows[RAW_COLUMN][changed]),
+        'tokens_after': unchanged + total(rows['text'][changed]),
+    }
+
+
+def combine_counts(counts):
+    """Somma i conteggi di più blocchi o video."""
+    keys = ('rows', 'changed', 'sampled', 'tokens_before', 'tokens_after')
+    return {k: sum(c[k] for c in counts) for k in keys}
+
+
+def describe(counts):
+    """Medie per commento e risparmio, per il report e il manifest del run."""
+    sampled = counts['sampled'] or 1
+    before, after = counts['tokens_before'] / sampled, counts['tokens_after'] / sampled
+    return {
+        **counts,
+        'changed_rate': counts['changed'] / counts['rows'] if counts['rows'] else 0.0,
+        'avg_tokens_before': before,
+        'avg_tokens_after': after,
+        'token_reduction': 1 - after / before if before else 0.0,
+    }
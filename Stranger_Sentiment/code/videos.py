@@ -0,0 +1,94 @@
+import os
+import json
+from datetime import datetime
+
+# --- MANIFEST DEI VIDEO ---
+# Un unico file (videos.json nella cartella del progetto) elenca i video analizzati ed è
+# letto da acquisizione, analisi e dashboard:
+#
+#   groups : gruppo (per ora la stagione, es. "S1") -> release_date e campi liberi (show, note)
+#   videos : id YouTube, group e tags; facoltativi key (chiave dei dati salvati, default
+#            "<group>_<id>") e release_date (default quella del gruppo)
+#
+# Il gruppo diventa la colonna/partizione 'season' dei dati. Per aggiungere trailer, teaser
+# o clip (anche di altre serie) basta aggiungere righe al manifest: la coda dei job
+# (job_queue.py) elabora solo i video nuovi.
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MANIFEST_FILE = os.path.join(BASE_DIR, 'videos.json')
+
+
+class ManifestError(ValueError):
+    """Manifest dei video mancante o non valido."""
+
+
+def _check_date(value, where):
+    try:
+        datetime.strptime(value, '%Y-%m-%d')
+    except (TypeError, ValueError):
+        raise ManifestError(f"{where}: release_date '{value}' non valida (formato AAAA-MM-GG)")
+
+
+def _read(path):
+    """Gruppi e voci dei video del manifest (gruppi già validati)."""
+    try:
+        with open(path, encoding='utf-8') as f:
+            manifest = json.load(f)
+    except OSError as e:
+        raise ManifestError(f"Manifest dei video non leggibile ({path}): {e}")
+    except ValueError as e:
+        raise ManifestError(f"Manifest dei video non valido ({path}): {e}")
+
+    groups = manifest.get('groups', {})
+    for name, group in groups.items():
+        _check_date(group.get('release_date'), f"gruppo {name}")
+    return groups, manifest.get('videos', [])
+
+
+def load(path=MANIFEST_FILE):
+    """Video del manifest, completati e validati: dizionari con id, key, group, release_date, tags."""
+    groups, entries = _read(path)
+    result, seen_ids, seen_keys = [], set(), set()
+    for i, entry in enumerate(entries):
+        where = f"video #{i + 1}"
+        if not entry.get('id'):
+            raise ManifestError(f"{where}: manca l'id del video")
+        if entry.get('group') not in groups:
+            raise ManifestError(f"{where} ({entry['id']}): gruppo '{entry.get('group')}' non definito in 'groups'")
+
+        video = {
+            'id': entry['id'],
+            'group': entry['group'],
+            'key': entry.get('key') or f"{entry['group']}_{entry['id']}",
+            'release_date': entry.get('release_date') or groups[entry['group']]['release_date'],
+            'tags': list(entry.get('tags', [])),
+            'show': entry.get('show') or groups[entry['group']].get('show'),
+        }
+        _check_date(video['release_date'], where)
+        if video['id'] in seen_ids:
+            raise ManifestError(f"{where}: video {video['id']} ripetuto")
+        if video['key'] in seen_keys:
+            raise ManifestError(f"{where}: chiave {video['key']} ripetuta")
+        seen_ids.add(video['id'])
+        seen_keys.add(video['key'])
+        result.append(video)
+    return result
+
+
+def select(videos, groups=None, tags=None):
+    """Video dei gruppi indicati e con almeno uno dei tag indicati (None = nessun filtro)."""
+    return [v for v in videos
+            if (not groups or v['group'] in groups) and (not tags or set(tags) & set(v['tags']))]
+
+
+def load_groups(path=MANIFEST_FILE):
+    """Gruppi del manifest: {gruppo: {'release_date': ..., ...}} nell'ordine del file."""
+    return _read(path)[0]
+
+
+def release_dates(path=MANIFEST_FILE):
+    """Data di uscita di ogni video per chiave (quella del video se indicata, altrimenti del gruppo).
+
+    Usata per i rollup e i giorni all'uscita: è la stessa data del filtro pre-uscita.
+    """
+    return {video['key']: video['release_date'] for video in load(path)}
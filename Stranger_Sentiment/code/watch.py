@@ -0,0 +1,117 @@
+import time
+import argparse
+from datetime import date
+
+import pandas as pd
+
+import storage
+import videos
+import job_queue
+import instrumentation
+import data_acquisition
+import sentiment_processor
+from instrumentation import timer
+
+# --- MODALITÀ WATCH: AGGIORNAMENTO CONTINUO DEI VIDEO NON ANCORA USCITI ---
+# A ogni ciclo, per ogni video già analizzato (stato 'scored' nella coda):
+#
+#   1. poll_new_comments: pagine order="time" solo fino al primo commento già visto
+#   2. analyze_new_rows: classifica solo le righe nuove e le aggiunge in coda ai risultati
+#   3. update_aggregates_incremental: somma le righe nuove ad aggregati e rollup
+#
+# Un ciclo senza commenti nuovi costa una pagina per video e nessuna inferenza; il costo
+# cresce con i commenti nuovi, non con quelli già raccolti. Contano solo i commenti
+# pubblicati prima dell'uscita della stagione, quindi di default si seguono solo i video
+# con release_date non ancora passata (--include-released per seguirli tutti).
+#
+# Limite: il watermark riguarda i thread, non le risposte. Con --replies le risposte dei
+# thread nuovi vengono raccolte, ma quelle aggiunte in seguito a thread già visti no: solo
+# una nuova acquisizione completa del video le recupera.
+
+WATCH_LIMITATION = ("Solo i thread nuovi: le risposte aggiunte dopo a thread già raccolti non vengono "
+                    "lette (serve una nuova acquisizione completa del video).")
+
+POLL_INTERVAL_SECONDS = 300
+
+
+def watched_videos(queue, groups=None, tags=None, include_released=False):
+    """Video del manifest da seguire: già analizzati e (di default) con uscita non ancora passata."""
+    scored = {job['key'] for job in queue.jobs() if job['state'] == 'scored'}
+    today = date.today().isoformat()
+    return [v for v in videos.select(videos.load(), groups, tags)
+            if v['key'] in scored and (include_released or v['release_date'] >= today)]
+
+
+def poll_once(queue, watched, batch_size=sentiment_processor.BATCH_SIZE, workers=sentiment_processor.WORKERS,
+              dedup=sentiment_processor.DEDUP):
+    """Un ciclo di aggiornamento; restituisce {chiave: righe nuove analizzate}."""
+    new_rows = []
+    for video in watched:
+        try:
+            df = data_acquisition.poll_new_comments(video['id'], video['key'], video['release_date'],
+                                                    season=video['group'])
+        except Exception as e:
+            # Un video con errori (quota, rete, commenti disattivati) non ferma gli altri
+            print(f"[WATCH] {video['key']}: errore durante il controllo ({e})")
+            continue
+        if not df.empty:
+            new_rows.append((video, df))
+
+    results = sentiment_processor.analyze_new_rows(new_rows, batch_size=batch_size, workers=workers, dedup=dedup)
+    sentiment_processor.update_aggregates_incremental(results)
+    for video, _ in results:
+        queue.finish(video['key'], 'scored', rows=storage.count_rows('results', video['key']))
+    return {video['key']: len(df) for video, df in results}
+
+
+def watch(interval=POLL_INTERVAL_SECONDS, cycles=None, groups=None, tags=None, include_released=False,
+          batch_size=sentiment_processor.BATCH_SIZE, workers=sentiment_processor.WORKERS,
+          dedup=sentiment_processor.DEDUP):
+    """Controlla i video ogni interval secondi (cycles=None: finché non si interrompe con Ctrl+C)."""
+    print("--- MODALITÀ WATCH: COMMENTI NUOVI OGNI "
+          f"{interval}s{'' if cycles is None else f' ({cycles} cicli)'} ---")
+    queue = job_queue.open_queue(videos.load())
+    cycle = 0
+    try:
+        while cycles is None or cycle < cycles:
+            cycle += 1
+            watched = watched_videos(queue, groups, tags, include_released)
+            if not watched:
+                print("[WATCH] Nessun video da seguire (analizzati e non ancora usciti).")
+                break
+            start = time.perf_counter()
+            requests_before = data_acquisition.RATE_LIMITER.requests
+            with timer('watch.ciclo', items=len(watched)):
+                added = poll_once(queue, watched, batch_size=batch_size, workers=workers, dedup=dedup)
+            print(f"[WATCH] {pd.Timestamp.now():%H:%M:%S} ciclo {cycle}: {len(watched)} video, "
+                  f"{data_acquisition.RATE_LIMITER.requests - requests_before} richieste API, "
+                  f"{sum(added.values())} commenti nuovi ({time.perf_counter() - start:.1f}s)")
+            if cycles is not None and cycle >= cycles:
+                break
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        print("\n[WATCH] Interrotto.")
+    finally:
+        data_acquisition.get_language_identifier().close()
+        data_acquisition.close_reply_pool()
+        sentiment_processor.shutdown_worker_pool()
+        data_acquisition.RATE_LIMITER.report()
+        queue.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Aggiorna di continuo i video non ancora usciti con i soli commenti nuovi.",
+                                     epilog=WATCH_LIMITATION)
+    parser.add_argument('--interval', type=int, default=POLL_INTERVAL_SECONDS, help="Secondi tra un ciclo e l'altro")
+    parser.add_argument('--cycles', type=int, help="Numero di cicli (default: finché non si interrompe)")
+    parser.add_argument('--groups', nargs='+', help="Solo i video di questi gruppi del manifest (es. S1 S2)")
+    parser.add_argument('--tags', nargs='+', help="Solo i video con almeno uno di questi tag")
+    parser.add_argument('--include-released', action='store_true', help="Segue anche i video già usciti")
+    parser.add_argument('--profile', help="Stadio da registrare con cProfile (es. watch.pagine_api)")
+    args = parser.parse_args()
+    instrumentation.start_run('watch', profile_stage=args.profile)
+    try:
+        watch(interval=args.interval, cycles=args.cycles, groups=args.groups, tags=args.tags,
+              include_released=args.include_released)
+    finally:
+        instrumentation.finish_run()
@@ -0,0 +1,182 @@
+import os
+import json
+import time
+import random
+import threading
+
+# --- ACCESSO CONDIVISO ALLA YOUTUBE DATA API ---
+# - QuotaRateLimiter: token bucket condiviso tra i thread, che conta anche le unità di quota
+#   consumate (commentThreads.list e comments.list costano 1 unità per pagina).
+# - execute_with_retry: esegue una richiesta con backoff esponenziale + jitter sugli errori
+#   transitori (403 di rate limit, 429, 5xx, errori di rete).
+# - build_client: crea un client googleapiclient; YOUTUBE_API_ENDPOINT permette di puntarlo
+#   a un server locale che simula l'API (es. http://localhost:8080) per provare la pipeline offline.
+# - SessionClient: client REST minimale con la stessa interfaccia (risorsa().list(...).execute())
+#   su un'unica requests.Session condivisa dai thread: connessioni riusate e risposte gzip.
+
+DEFAULT_DAILY_QUOTA = int(os.environ.get('YOUTUBE_DAILY_QUOTA', 10000))
+API_ENDPOINT = os.environ.get('YOUTUBE_API_ENDPOINT')
+API_BASE_URL = 'https://www.googleapis.com'
+HTTP_TIMEOUT = 30       # Secondi per richiesta (SessionClient)
+HTTP_POOL_SIZE = 16     # Connessioni tenute aperte (video e risposte scaricati in parallelo)
+
+RETRY_STATUSES = {403, 429, 500, 502, 503, 504}
+# Un 403 va ritentato solo se dovuto al rate limit (non per es. commentsDisabled)
+RETRYABLE_403_REASONS = {'rateLimitExceeded', 'userRateLimitExceeded'}
+
+
+class QuotaExceededError(Exception):
+    """La quota giornaliera (locale o dell'API) è esaurita: inutile ritentare oggi."""
+
+
+class QuotaRateLimiter:
+    """Token bucket thread-safe con conteggio delle unità di quota consumate."""
+
+    def __init__(self, requests_per_second=5.0, burst=5, daily_quota=DEFAULT_DAILY_QUOTA):
+        self.rate = requests_per_second
+        self.capacity = burst
+        self.daily_quota = daily_quota
+        self.tokens = float(burst)
+        self.units_used = 0
+        self.requests = 0
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, units=1):
+        """Attende un token libero e registra le unità di quota della richiesta."""
+        while True:
+            with self._lock:
+                if self.units_used + units > self.daily_quota:
+                    raise QuotaExceededError(
+                        f"Quota giornaliera esaurita ({self.units_used}/{self.daily_quota} unità)"
+                    )
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    self.units_used += units
+                    self.requests += 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+    def report(self):
+        print(f"   Richieste API: {self.requests} | Quota usata: {self.units_used}/{self.daily_quota} unità")
+
+
+def _http_status(exc):
+    """Codice HTTP di un errore (HttpError di googleapiclient o eccezioni con .status_code)."""
+    resp = getattr(exc, 'resp', None)
+    status = getattr(resp, 'status', None) or getattr(exc, 'status_code', None)
+    try:
+        return int(status) if status is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _error_reason(exc):
+    """Motivo dell'errore API (es. 'quotaExceeded'), se presente nel corpo della risposta."""
+    content = getattr(exc, 'content', None)
+    try:
+        if isinstance(content, bytes):
+            content = content.decode('utf-8')
+        errors = json.loads(content)['error']['errors']
+        return errors[0].get('reason')
+    except Exception:
+        return None
+
+
+def _is_retryable(exc):
+    status = _http_status(exc)
+    if status is None:
+        # Errori di rete (timeout, connessione chiusa, ...) sono transitori
+        return isinstance(exc, (OSError, TimeoutError, ConnectionError))
+    if status not in RETRY_STATUSES:
+        return False
+    if status == 403:
+        reason = _error_reason(exc)
+        if reason == 'quotaExceeded':
+            raise QuotaExceededError("Quota giornaliera dell'API YouTube esaurita") from exc
+        return reason is None or reason in RETRYABLE_403_REASONS
+    return True
+
+
+def execute_with_retry(make_request, limiter, units=1, max_retries=5, base_delay=1.0, max_delay=60.0):
+    """Esegue make_request().execute() rispettando il rate limit, con backoff e jitter sui transitori."""
+    for attempt in range(max_retries + 1):
+        limiter.acquire(units)
+        try:
+            return make_request().execute()
+        except Exception as e:
+            if attempt == max_retries or not _is_retryable(e):
+                raise
+            # Full jitter: attesa casuale in [0, base * 2^tentativo], con un tetto massimo
+            delay = random.uniform(0, min(max_delay, base_delay * 2 ** attempt))
+            print(f"[RETRY] Errore transitorio ({_http_status(e) or type(e).__name__}), "
+                  f"nuovo tentativo {attempt + 1}/{max_retries} tra {delay:.1f}s")
+            time.sleep(delay)
+
+
+def build_client(api_key):
+    """Nuovo client YouTube (httplib2 non è thread-safe: serve un client per thread)."""
+    from googleapiclient.discovery import build
+    client_options = {'api_endpoint': API_ENDPOINT} if API_ENDPOINT else None
+    return build('youtube', 'v3', developerKey=api_key, client_options=client_options, cache_discovery=False)
+
+
+class ApiHttpError(Exception):
+    """Risposta HTTP di errore del SessionClient (status_code e content come HttpError)."""
+
+    def __init__(self, status_code, content):
+        super().__init__(f"HTTP {status_code}: {content[:200]!r}")
+        self.status_code = status_code
+        self.content = content
+
+
+class _SessionRequest:
+    def __init__(self, session, url, params):
+        self.session = session
+        self.url = url
+        self.params = params
+
+    def execute(self):
+        response = self.session.get(self.url, params=self.params, timeout=HTTP_TIMEOUT)
+        if response.status_code >= 400:
+            raise ApiHttpError(response.status_code, response.content)
+        return response.json()
+
+
+class _SessionResource:
+    def __init__(self, client, name):
+        self.client = client
+        self.name = name
+
+    def list(self, **params):
+        params = {k: v for k, v in params.items() if v is not None}
+        params['key'] = self.client.api_key
+        return _SessionRequest(self.client.session, f"{self.client.base_url}/youtube/v3/{self.name}", params)
+
+
+class SessionClient:
+    """Client REST per commentThreads/comments su un'unica sessione HTTP (thread-safe per le GET)."""
+
+    def __init__(self, api_key, base_url=None):
+        import requests
+        self.api_key = api_key
+        self.base_url = (base_url or API_ENDPOINT or API_BASE_URL).rstrip('/')
+        self.session = requests.Session()
+        # L'API comprime le risposte solo se anche lo User-Agent contiene "gzip"
+        self.session.headers.update({'Accept-Encoding': 'gzip', 'User-Agent': 'stranger-sentiment (gzip)'})
+        adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=HTTP_POOL_SIZE)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def commentThreads(self):
+        return _SessionResource(self, 'commentThreads')
+
+    def comments(self):
+        return _SessionResource(self, 'comments')
+
+    def close(self):
+        self.session.close()
@@ -0,0 +1,88 @@
+import os
+import sys
+import functools
+
+import pytest
+
+# I moduli della pipeline sono script piatti in code/: li rendiamo importabili dai test
+CODE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'code')
+sys.path.insert(0, CODE_DIR)
+
+
+@pytest.fixture
+def work_dir(tmp_path, monkeypatch):
+    """Dataset e stato dei rollup dentro tmp_path (come benchmark._use_work_dir), ripristinati a fine test."""
+    import storage
+    import rollups
+
+    for dataset in list(storage.DATASETS):
+        monkeypatch.setitem(storage.DATASETS, dataset, str(tmp_path / 'data' / dataset))
+    monkeypatch.setattr(rollups, 'STATE_FILE', str(tmp_path / 'data' / 'rollups' / 'state.json'))
+    return tmp_path
+
+
+@pytest.fixture
+def acquisition(work_dir, monkeypatch):
+    """data_acquisition isolato: dati e coda in work_dir, rate limit e backoff senza attese.
+
+    Il client (es. fake_youtube.FakeYouTube) va assegnato a data_acquisition.YOUTUBE dal test.
+    """
+    import storage
+    import job_queue
+    import youtube_api
+    import data_acquisition
+    from api_recorder import PageRecorder
+
+    # Come all'import del modulo, la cartella dei checkpoint esiste già
+    os.makedirs(storage.DATASETS['processed'], exist_ok=True)
+    monkeypatch.setattr(data_acquisition, 'DATA_PROCESSED_DIR', storage.DATASETS['processed'])
+    monkeypatch.setattr(data_acquisition, 'RATE_LIMITER',
+                        youtube_api.QuotaRateLimiter(requests_per_second=1e6, burst=10_000))
+    monkeypatch.setattr(data_acquisition, 'execute_with_retry',
+                        functools.partial(youtube_api.execute_with_retry, base_delay=0.0))
+    monkeypatch.setattr(data_acquisition, 'RECORDER', PageRecorder('off'))
+    monkeypatch.setattr(data_acquisition, 'FETCH_MODE', 'minimal')
+    monkeypatch.setattr(data_acquisition, 'HARVEST_REPLIES', False)
+    monkeypatch.setattr(data_acquisition, 'LANGUAGE_WORKERS', 1)
+    monkeypatch.setattr(data_acquisition, '_language_identifier', None)
+    monkeypatch.setattr(job_queue, 'QUEUE_FILE', str(work_dir / 'data' / 'jobs.sqlite'))
+    yield data_acquisition
+    data_acquisition.get_language_identifier().close()
+    data_acquisition.close_reply_pool()
+
+
+@pytest.fixture(scope='session')
+def tiny_model(tmp_path_factory):
+    """DistilBERT minuscolo del benchmark (pesi casuali, nessun download)."""
+    pytest.importorskip('transformers')
+    import benchmark
+    return benchmark.build_tiny_model(str(tmp_path_factory.mktemp('model')))
+
+
+@pytest.fixture
+def processor(work_dir, tiny_model, monkeypatch):
+    """sentiment_processor con il modello minuscolo e tutte le uscite (cache, aggregati, indice) in work_dir.
+
+    I video del manifest vanno assegnati con monkeypatch a videos.load dal test.
+    """
+    import aggregates
+    import job_queue
+    import search_index
+    import sentiment_processor as sp
+
+    data = work_dir / 'data'
+    monkeypatch.setattr(sp, 'MODEL_NAME', tiny_model)
+    monkeypatch.setattr(sp, 'INFERENCE_BACKEND', 'pytorch')
+    monkeypatch.setattr(sp, 'PREDICTION_CACHE_FILE', str(data / 'cache' / 'predictions.sqlite'))
+    monkeypatch.setattr(sp, 'ANALYSIS_RESULTS_FILE', str(data / 'sentiment_analysis_results.csv'))
+    monkeypatch.setattr(sp, 'FULL_RESULTS_CSV_FILE', str(data / 'sentiment_analysis_results_full.csv'))
+    for name in ('sentiment_pipeline', 'prediction_cache', '_tokenizer'):
+        monkeypatch.setattr(sp, name, None)
+    monkeypatch.setattr(aggregates, 'AGGREGATES_FILE', str(data / 'aggregates.json'))
+    monkeypatch.setattr(search_index, 'INDEX_FILE', str(data / 'search.sqlite'))
+    monkeypatch.setattr(job_queue, 'QUEUE_FILE', str(data / 'jobs.sqlite'))
+    os.makedirs(data, exist_ok=True)
+    yield sp
+    if sp.prediction_cache is not None:
+        sp.prediction_cache.close()
+    sp.shutdown_worker_pool()
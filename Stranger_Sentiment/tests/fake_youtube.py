@@ -0,0 +1,250 @@
+import os
+import sys
+import copy
+
+# --- CLIENT FINTO DELLA YOUTUBE DATA API (SOLO PER I TEST) ---
+# Stessa interfaccia di youtube_api.SessionClient (risorsa().list(**parametri).execute()),
+# con i commenti in memoria:
+#
+#   commentThreads : thread di un video a pagine di page_size, pageToken = posizione del primo;
+#                    con part="snippet,replies" ogni thread include al più INLINE_REPLIES risposte
+#   comments       : risposte di un thread (parentId) a pagine di reply_page_size
+#
+# Con il parametro fields (risposta parziale, come FETCH_MODE 'minimal') restano solo i campi
+# richiesti. Ogni chiamata viene registrata in calls; fail() inietta errori (es. ApiHttpError 503)
+# sulle chiamate a una pagina precisa, consumati uno per chiamata; on_call(risorsa, parametri)
+# viene chiamata prima di rispondere (es. per leggere lo stato della coda durante il download).
+#
+# Le pagine registrate in tests/fixtures/api_pages (test di replay) si rigenerano con
+#   python tests/fake_youtube.py
+# da rieseguire se cambiano i parametri delle richieste (es. i campi di FETCH_MODE 'minimal').
+
+DEFAULT_TIME = '2019-06-01T10:00:00Z'
+INLINE_REPLIES = 5  # Come l'API: commentThreads include solo le prime risposte di ogni thread
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'api_pages')
+FIXTURE_VIDEO = ('vidR', 'S1_R', '2019-07-04')  # video id, chiave, data di uscita
+
+# Frasi inglesi abbastanza lunghe perché langdetect le riconosca senza incertezze
+ENGLISH = [
+    "I really cannot wait for the new season of this show",
+    "This trailer gave me chills and I have watched it ten times already",
+    "The music in this teaser is absolutely perfect for the mood",
+    "Everyone in my family is counting the days until the release",
+    "The special effects look better than anything they did before",
+    "I hope the writers give every character a proper ending this time",
+    "My favorite scene is the one at the very end of the trailer",
+    "The cast looks older but the story still feels very exciting",
+    "Please do not make us wait another three years for the next one",
+    "This is going to be the best season of the whole series",
+    "The villain in this season looks truly terrifying to me",
+    "I love how the soundtrack mixes old songs with new music",
+]
+
+
+def comment(comment_id, text, time=DEFAULT_TIME, parent_id=None):
+    """Risorsa 'comment' con lo snippet completo (textDisplay è l'HTML mostrato da YouTube)."""
+    snippet = {
+        'textDisplay': text.replace('\n', '<br>'),
+        'textOriginal': text,
+        'authorDisplayName': f"@user-{comment_id}",
+        'likeCount': 0,
+        'publishedAt': time,
+        'updatedAt': time,
+    }
+    if parent_id is not None:
+        snippet['parentId'] = parent_id
+    return {'kind': 'youtube#comment', 'id': comment_id, 'snippet': snippet}
+
+
+def english_threads(video_id, count, time=DEFAULT_TIME, replies=()):
+    """count thread con testi inglesi distinti (id '<video>-<n>').
+
+    replies: numero di risposte di ogni thread (id '<thread>.<n>'), ciclico se più corto di count.
+    """
+    threads = []
+    for i in range(count):
+        thread_id = f"{video_id}-{i}"
+        n_replies = replies[i % len(replies)] if replies else 0
+        threads.append({
+            'id': thread_id, 'text': f"{ENGLISH[i % len(ENGLISH)]} ({video_id} {i})", 'time': time,
+            'replies': [{'id': f"{thread_id}.{j}", 'text': f"{ENGLISH[(i + j + 1) % len(ENGLISH)]} ({thread_id} {j})",
+                         'time': time} for j in range(n_replies)],
+        })
+    return threads
+
+
+class _Request:
+    def __init__(self, client, resource, params):
+        self.client = client
+        self.resource = resource
+        self.params = params
+
+    def execute(self):
+        return self.client._execute(self.resource, self.params)
+
+
+class _Resource:
+    def __init__(self, client, name):
+        self.client = client
+        self.name = name
+
+    def list(self, **params):
+        return _Request(self.client, self.name, params)
+
+
+class FakeYouTube:
+    """threads: {video_id: [{'id', 'text', 'time', 'replies'}]} nell'ordine in cui l'API li restituisce."""
+
+    def __init__(self, threads, page_size=100, reply_page_size=100):
+        self.threads = threads
+        self.page_size = page_size
+        self.reply_page_size = reply_page_size
+        self.calls = []
+        self.errors = {}
+        self.on_call = None
+
+    def fail(self, resource, owner, page_token, *errors):
+        """Le prossime chiamate a quella pagina (owner: videoId o parentId) sollevano errors, uno per chiamata."""
+        self.errors.setdefault((resource, owner, page_token), []).extend(errors)
+
+    def calls_to(self, resource, owner=None, page_token=...):
+        """Chiamate registrate a una risorsa, filtrate per videoId/parentId e (se indicato) pageToken."""
+        return [p for r, p in self.calls if r == resource
+                and (owner is None or _owner(p) == owner)
+                and (page_token is ... or p.get('pageToken') == page_token)]
+
+    def commentThreads(self):
+        return _Resource(self, 'commentThreads')
+
+    def comments(self):
+        return _Resource(self, 'comments')
+
+    def _execute(self, resource, params):
+        self.calls.append((resource, dict(params)))
+        if self.on_call is not None:
+            self.on_call(resource, params)
+        pending = self.errors.get((resource, _owner(params), params.get('pageToken')))
+        if pending:
+            raise pending.pop(0)
+        page = copy.deepcopy(getattr(self, f"_{resource}")(params))
+        return _select(page, parse_fields(params['fields'])) if 'fields' in params else page
+
+    def _commentThreads(self, params):
+        threads = self.threads[params['videoId']]
+        start = int(params.get('pageToken') or 0)
+        items = []
+        for t in threads[start:start + self.page_size]:
+            replies = t.get('replies', [])
+            item = {
+                'kind': 'youtube#commentThread',
+                'id': t['id'],
+                'snippet': {'videoId': params['videoId'], 'topLevelComment': comment(t['id'], t['text'], t['time']),
+                            'totalReplyCount': len(replies), 'canReply': True, 'isPublic': True},
+            }
+            if replies and 'replies' in params['part'].split(','):
+                item['replies'] = {'comments': [comment(r['id'], r['text'], r['time'], parent_id=t['id'])
+                                                for r in replies[:INLINE_REPLIES]]}
+            items.append(item)
+        page = {'kind': 'youtube#commentThreadListResponse', 'items': items}
+        if start + self.page_size < len(threads):
+            page['nextPageToken'] = str(start + self.page_size)
+        return page
+
+    def _comments(self, params):
+        thread = next(t for threads in self.threads.values() for t in threads if t['id'] == params['parentId'])
+        start = int(params.get('pageToken') or 0)
+        items = [comment(r['id'], r['text'], r['time'], parent_id=thread['id'])
+                 for r in thread['replies'][start:start + self.reply_page_size]]
+        page = {'kind': 'youtube#commentListResponse', 'items': items}
+        if start + self.reply_page_size < len(thread['replies']):
+            page['nextPageToken'] = str(start + self.reply_page_size)
+        return page
+
+
+def _owner(params):
+    return params.get('videoId') or params.get('parentId')
+
+
+def parse_fields(spec):
+    """Parametro fields dell'API -> albero dei campi: 'a,b(c,d)' -> {'a': None, 'b': {'c': None, 'd': None}}."""
+    def parse(pos):
+        tree, name = {}, ''
+        while pos < len(spec):
+            ch = spec[pos]
+            pos += 1
+            if ch == '(':
+                tree[name], pos = parse(pos)
+                name = ''
+            elif ch == ')':
+                break
+            elif ch == ',':
+                if name:
+                    tree[name] = None
+                name = ''
+            else:
+                name += ch
+        if name:
+            tree[name] = None
+        return tree, pos
+    return parse(0)[0]
+
+
+def _select(value, tree):
+    """Solo i campi dell'albero (le liste si filtrano elemento per elemento)."""
+    if tree is None:
+        return value
+    if isinstance(value, list):
+        return [_select(v, tree) for v in value]
+    return {k: _select(value[k], sub) for k, sub in tree.items() if k in value}
+
+
+# --- PAGINE REGISTRATE PER I TEST DI REPLAY ---
+
+def fixture_threads():
+    """Thread del video registrato: risposte su più pagine, HTML nel testo, un commento non inglese e uno post-uscita."""
+    video_id = FIXTURE_VIDEO[0]
+    threads = english_threads(video_id, 4, replies=(12, 3, 0, 6))
+    threads[1]['text'] = "Steve & Robin\nthis friendship is the best part of the whole show"
+    threads += [
+        {'id': f"{video_id}-it", 'text': "Non vedo l'ora che esca la nuova stagione di questa serie",
+         'time': DEFAULT_TIME, 'replies': []},
+        {'id': f"{video_id}-late", 'text': f"{ENGLISH[0]} (after the release)", 'time': '2019-07-05T10:00:00Z',
+         'replies': []},
+    ]
+    return {video_id: threads}
+
+
+def fixture_client():
+    return FakeYouTube(fixture_threads(), page_size=2, reply_page_size=5)
+
+
+def record_fixture(pages_dir=FIXTURE_DIR):
+    """Registra in pages_dir le pagine di FIXTURE_VIDEO (FETCH_MODE 'minimal', con le risposte)."""
+    import shutil
+    import tempfile
+
+    import storage
+    import youtube_api
+    import data_acquisition
+    from api_recorder import PageRecorder
+
+    shutil.rmtree(pages_dir, ignore_errors=True)
+    with tempfile.TemporaryDirectory() as tmp:
+        storage.DATASETS['processed'] = data_acquisition.DATA_PROCESSED_DIR = tmp
+        data_acquisition.YOUTUBE = fixture_client()
+        data_acquisition.RATE_LIMITER = youtube_api.QuotaRateLimiter(requests_per_second=1e6, burst=10_000)
+        data_acquisition.RECORDER = PageRecorder('record', pages_dir)
+        data_acquisition.FETCH_MODE = 'minimal'
+        data_acquisition.LANGUAGE_WORKERS = 1
+        try:
+            data_acquisition.raccogli_e_filtra_dati(*FIXTURE_VIDEO, replies=True)
+        finally:
+            data_acquisition.get_language_identifier().close()
+            data_acquisition.close_reply_pool()
+    return data_acquisition.RECORDER.stats
+
+
+if __name__ == '__main__':
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'code'))
+    stats = record_fixture()
+    print(f"Registrate {stats['recorded']} pagine in {FIXTURE_DIR} ({stats['bytes_on_disk']} byte)")
@@ -0,0 +1,80 @@
+import pytest
+
+import storage
+import videos
+import job_queue
+from youtube_api import ApiHttpError
+from fake_youtube import FakeYouTube, english_threads
+
+VIDEOS = [
+    {'id': 'vidA', 'group': 'S1', 'key': 'S1_A', 'release_date': '2019-07-04', 'tags': [], 'show': None},
+    {'id': 'vidB', 'group': 'S2', 'key': 'S2_B', 'release_date': '2019-07-04', 'tags': [], 'show': None},
+]
+KEYS = {v['id']: v['key'] for v in VIDEOS}
+
+
+@pytest.fixture
+def fake(acquisition, monkeypatch):
+    client = FakeYouTube({'vidA': english_threads('vidA', 7), 'vidB': english_threads('vidB', 4)}, page_size=3)
+    monkeypatch.setattr(acquisition, 'YOUTUBE', client)
+    monkeypatch.setattr(videos, 'load', lambda path=None: [dict(v) for v in VIDEOS])
+    return client
+
+
+def jobs():
+    queue = job_queue.open_queue(VIDEOS)
+    try:
+        return {job['key']: job for job in queue.jobs()}
+    finally:
+        queue.close()
+
+
+def test_jobs_go_from_pending_to_fetched(acquisition, fake):
+    assert {key: job['state'] for key, job in jobs().items()} == {'S1_A': 'pending', 'S2_B': 'pending'}
+    seen = []
+    # Durante il download di una pagina il job del video è 'fetching'
+    fake.on_call = lambda resource, params: seen.append(jobs()[KEYS[params['videoId']]]['state'])
+
+    assert acquisition.acquire_all(workers=2) == 11
+    assert seen and set(seen) == {'fetching'}
+    final = jobs()
+    assert {key: (job['state'], job['attempts'], job['rows']) for key, job in final.items()} == {
+        'S1_A': ('fetched', 0, 7), 'S2_B': ('fetched', 0, 4)}
+    assert len(storage.read('processed', key='S1_A')) == 7
+
+
+def test_failed_video_is_released_and_resumed_from_checkpoint(acquisition, fake):
+    # La seconda pagina di vidA fallisce a ogni tentativo (1 + 5 retry): il video viene interrotto
+    fake.fail('commentThreads', 'vidA', '3', *[ApiHttpError(503, b'{}')] * 6)
+
+    acquisition.acquire_all(workers=1)
+    state = jobs()
+    assert (state['S1_A']['state'], state['S1_A']['attempts']) == ('pending', 1)
+    assert state['S1_A']['error']
+    assert (state['S2_B']['state'], state['S2_B']['attempts']) == ('fetched', 0)
+    assert len(fake.calls_to('commentThreads', 'vidA', '3')) == 6
+
+    checkpoint = acquisition.load_checkpoint('S1_A')
+    assert not checkpoint['completed']
+    assert (checkpoint['pages'], checkpoint['next_page_token'], checkpoint['commenti_validi']) == (1, '3', 3)
+    assert len(storage.read('processed', key='S1_A')) == 3
+
+    # Run successivo: riprende dalla pagina fallita, senza riscaricare la prima
+    acquisition.acquire_all(workers=1)
+    state = jobs()
+    assert (state['S1_A']['state'], state['S1_A']['attempts'], state['S1_A']['rows']) == ('fetched', 1, 7)
+    assert len(fake.calls_to('commentThreads', 'vidA', None)) == 1
+    assert len(fake.calls_to('commentThreads', 'vidB')) == 2  # vidB non viene riscaricato
+
+    df = storage.read('processed', key='S1_A')
+    assert sorted(df['comment_id']) == sorted(t['id'] for t in english_threads('vidA', 7))
+
+
+def test_quota_exhaustion_interrupts_without_losing_progress(acquisition, fake):
+    fake.fail('commentThreads', 'vidA', '3', ApiHttpError(403, b'{"error": {"errors": [{"reason": "quotaExceeded"}]}}'))
+
+    acquisition.acquire_all(workers=1)
+    # La quota esaurita non viene ritentata: una sola chiamata alla pagina, job di nuovo in coda
+    assert len(fake.calls_to('commentThreads', 'vidA', '3')) == 1
+    assert jobs()['S1_A']['state'] == 'pending'
+    assert acquisition.load_checkpoint('S1_A')['next_page_token'] == '3'
@@ -0,0 +1,54 @@
+import pandas as pd
+import pytest
+
+import aggregates
+
+
+def results(pairs):
+    return pd.DataFrame(pairs, columns=['season', 'Predicted_Sentiment'])
+
+
+def test_incremental_season_summary_matches_full():
+    old = results([('S1', 'POSITIVE')] * 3 + [('S1', 'NEGATIVE'), ('S2', 'NEGATIVE')])
+    new = results([('S2', 'POSITIVE'), ('S3', 'NEUTRAL'), ('S1', 'NEGATIVE')])
+    merged = aggregates.merge_season_summary(aggregates.season_summary(old), new)
+    assert merged == aggregates.season_summary(pd.concat([old, new]))
+    assert merged['S1'] == {'total': 5, 'counts': {'NEGATIVE': 2, 'POSITIVE': 3},
+                            'percentages': {'NEGATIVE': 40.0, 'POSITIVE': 60.0}}
+
+
+def test_validation_summary():
+    summary = aggregates.validation_summary(['POSITIVE', 'POSITIVE', 'NEGATIVE', 'NEGATIVE'],
+                                            ['POSITIVE', 'NEGATIVE', 'NEGATIVE', 'NEUTRAL'])
+    assert summary['labels'] == ['NEGATIVE', 'NEUTRAL', 'POSITIVE']
+    assert summary['confusion_matrix'] == [[1, 1, 0], [0, 0, 0], [1, 0, 1]]
+    assert summary['accuracy'] == 0.5
+    assert summary['per_label']['NEGATIVE'] == {'precision': 0.5, 'recall': 0.5, 'f1': 0.5, 'support': 2}
+    assert summary['per_label']['NEUTRAL']['precision'] == 0.0
+
+
+def test_version_changes_only_with_the_content(tmp_path):
+    path = str(tmp_path / 'aggregates.json')
+    seasons = aggregates.season_summary(results([('S1', 'POSITIVE'), ('S1', 'NEGATIVE')]))
+    first = aggregates.update(path, seasons=seasons, meta={'run': 1})
+    assert aggregates.load(path) == first
+    assert aggregates.update(path, seasons=seasons)['version'] == first['version']
+
+    second = aggregates.update(path, meta={'model': 'x'})
+    assert second['version'] != first['version']
+    assert second['meta'] == {'run': 1, 'model': 'x'}
+    frame = aggregates.seasons_frame(second)
+    assert frame['Percentuale'].tolist() == pytest.approx([50.0, 50.0])
+
+
+def test_other_schema_is_ignored(tmp_path):
+    path = tmp_path / 'aggregates.json'
+    path.write_text('{"schema": 0, "seasons": {}}', encoding='utf-8')
+    assert aggregates.load(str(path)) is None
+
+
+def test_default_path_is_read_at_call_time(tmp_path, monkeypatch):
+    monkeypatch.setattr(aggregates, 'AGGREGATES_FILE', str(tmp_path / 'aggregates.json'))
+    artifact = aggregates.update(seasons={'S1': {'total': 1}})
+    assert (tmp_path / 'aggregates.json').exists()
+    assert aggregates.load() == artifact
@@ -0,0 +1,48 @@
+import pandas as pd
+import pytest
+
+import storage
+import rollups
+import benchmark
+import synthetic_corpus
+import sentiment_processor
+import create_validation_sample
+
+
+def test_synthetic_corpus_is_deterministic():
+    df = synthetic_corpus.generate(3000, seed=5)
+    pd.testing.assert_frame_equal(df, synthetic_corpus.generate(3000, seed=5))
+    assert not df['text'].equals(synthetic_corpus.generate(3000, seed=6)['text'])
+
+    assert list(df.columns) == ['text', 'time', 'season', 'lang']
+    assert 0.1 < (df['lang'] != 'en').mean() < 0.2
+    # Tutti i commenti entro days_before giorni prima della fine del giorno di uscita
+    release = pd.to_datetime(df['season'].map(synthetic_corpus.DEFAULT_RELEASE_DATES), utc=True) + pd.Timedelta(days=1)
+    before = release - pd.to_datetime(df['time'], utc=True)
+    assert (before > pd.Timedelta(0)).all() and (before <= pd.Timedelta(days=61)).all()
+
+
+def test_small_benchmark_run_restores_the_pipeline_settings(work_dir):
+    def settings():
+        return (dict(storage.DATASETS), rollups.STATE_FILE, create_validation_sample.OUTPUT_FILE,
+                create_validation_sample.LABELED_FILE, sentiment_processor.MODEL_NAME,
+                sentiment_processor.PREDICTION_CACHE_FILE, sentiment_processor.prediction_cache)
+    before = settings()
+    stages = ('pre_release_filter', 'near_dedup', 'storage_read', 'create_sample', 'dashboard_loaders')
+    report = benchmark.run_benchmarks(sizes=(2000,), stages=stages, work_dir=str(work_dir / 'bench'))
+
+    assert [r['stage'] for r in report['results']] == list(stages)
+    assert all(r['rows'] >= 2000 and r['throughput_rows_per_s'] > 0 for r in report['results'])
+    assert not (work_dir / 'bench').exists()
+    # Un comando successivo nello stesso processo (es. cli bench, poi analyze) non vede il benchmark
+    assert settings() == before
+
+
+def test_regressions_beyond_the_tolerance_are_reported():
+    def report(*results):
+        return {'results': [{'stage': s, 'size': 1000, 'throughput_rows_per_s': t, 'p95_ms': p} for s, t, p in results]}
+    baseline = report(('a', 100.0, 10.0), ('b', 100.0, 10.0), ('c', 100.0, 10.0))
+    current = report(('a', 90.0, 11.0), ('b', 70.0, 10.0), ('c', 100.0, 13.0), ('d', 1.0, 1.0))
+    regressions = benchmark.compare_with_baseline(current, baseline, tolerance=0.2)
+    assert [(r['stage'], r['throughput_change'], r['p95_change']) for r in regressions] == [
+        ('b', pytest.approx(-0.3), 0.0), ('c', 0.0, pytest.approx(0.3))]
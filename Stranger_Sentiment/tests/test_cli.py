@@ -0,0 +1,51 @@
+import os
+import sys
+import subprocess
+
+import pytest
+
+import cli
+import instrumentation
+from conftest import CODE_DIR
+
+HEAVY_MODULES = ('torch', 'transformers', 'googleapiclient', 'langdetect', 'sentiment_processor')
+
+
+@pytest.fixture
+def runs_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(instrumentation, 'RUNS_DIR', str(tmp_path / 'runs'))
+    return tmp_path / 'runs'
+
+
+def test_parser_does_not_import_heavy_modules():
+    # Processo separato: nei test le librerie pesanti sono già state importate
+    code = ("import sys, cli; cli.build_parser().parse_args(['analyze', '--workers', '2']); "
+            f"print([m for m in {HEAVY_MODULES!r} if m in sys.modules])")
+    out = subprocess.run([sys.executable, '-c', code], cwd=CODE_DIR, capture_output=True, text=True, check=True)
+    assert out.stdout.strip() == '[]'
+
+
+def test_analyze_options_reach_the_pipeline(runs_dir, monkeypatch):
+    import sentiment_processor as sp
+    calls = []
+    monkeypatch.setattr(sp, 'run_full_analysis', lambda **kwargs: calls.append(kwargs))
+    monkeypatch.setattr(sp, 'report_cache', lambda: None)
+
+    cli.main(['analyze', '--workers', '3', '--batch-size', '8', '--no-dedup', '--groups', 'S1', 'S2',
+              '--chunk-rows', '500'])
+    assert calls == [{'export_csv': False, 'dedup': False, 'rescore': False, 'groups': ['S1', 'S2'], 'tags': None,
+                      'acquisition_running': None, 'chunk_rows': 500, 'batch_size': 8, 'workers': 3}]
+    # Ogni comando scrive il manifest del run
+    assert [f for f in os.listdir(runs_dir) if f.endswith('.json')]
+
+
+def test_unknown_options_are_rejected_except_for_bench(runs_dir, monkeypatch):
+    with pytest.raises(SystemExit):
+        cli.main(['aggregate', '--nope'])
+
+    import benchmark
+    received = []
+    monkeypatch.setattr(benchmark, 'main', lambda argv: received.append(argv) or 0)
+    cli.main(['bench', '--sizes', '100', '--nope'])
+    assert received == [['--sizes', '100', '--nope']]
+    assert not runs_dir.exists()  # Il benchmark ha il proprio report
@@ -0,0 +1,25 @@
+from comment_filters import CommentFilter, FilterPipeline
+
+
+def test_filters_run_by_cost_on_survivors_only():
+    seen = {'cheap': [], 'batch': []}
+
+    def cheap(c):
+        seen['cheap'].append(c)
+        return c % 2 == 0
+
+    def expensive(cs):
+        seen['batch'].append(list(cs))
+        return [c > 2 for c in cs]
+
+    pipeline = FilterPipeline([CommentFilter('batch', expensive, cost=100, batch=True),
+                               CommentFilter('cheap', cheap, cost=1)])
+    assert [f.name for f in pipeline.filters] == ['cheap', 'batch']
+    assert pipeline.filter_page([5, 4, 3, 2, 1, 6]) == [4, 6]
+    # Il filtro costoso vede solo i sopravvissuti, in un'unica chiamata
+    assert seen == {'cheap': [5, 4, 3, 2, 1, 6], 'batch': [[4, 2, 6]]}
+
+    pipeline.filter_page([1, 3])  # Nessun sopravvissuto: il filtro costoso non viene chiamato
+    assert len(seen['batch']) == 1
+    stats = {name: (s['evaluated'], s['passed'], s['rejected']) for name, s in pipeline.stats.items()}
+    assert stats == {'cheap': (8, 3, 5), 'batch': (3, 2, 1)}
@@ -0,0 +1,74 @@
+import pandas as pd
+
+import storage
+import text_normalization
+import create_validation_sample
+
+
+def test_labeled_texts_are_excluded_in_raw_and_normalized_form(work_dir, monkeypatch):
+    labeled = work_dir / 'validation_set_labeled.csv'
+    pd.DataFrame({'text': ["Hopper &amp; Joyce<br>forever", "plain text"], 'label': 'POSITIVE'}).to_csv(labeled, index=False)
+    monkeypatch.setattr(create_validation_sample, 'LABELED_FILE', str(labeled))
+
+    raw = ["Hopper &amp; Joyce<br>forever", "plain text", "another comment", "one more comment"]
+    df = text_normalization.normalize_frame(pd.DataFrame({'text': raw, 'season': 'S1'}))
+    storage.replace('processed', 'S1_A', 'S1', df)
+
+    sample, seen = create_validation_sample.stratified_sample(10, seed=1, exclude=create_validation_sample._labeled_texts())
+    # Il testo etichettato grezzo è escluso anche se i dati processati hanno la forma normalizzata
+    assert sorted(sample['text']) == ["another comment", "one more comment"]
+    assert seen == {'S1': 2}
+
+
+def test_allocation_redistributes_missing_rows():
+    quotas = create_validation_sample._allocate({'S1': 900, 'S2': 90, 'S3': 10}, {'S1': 5, 'S2': 50, 'S3': 10},
+                                                40, 'proportional')
+    # S1 ha solo 5 righe: le 31 mancanti vanno a S2 e S3 in proporzione (90:10)
+    assert quotas == {'S1': 5, 'S2': 32, 'S3': 3}
+    equal = create_validation_sample._allocate({'S1': 900, 'S2': 90, 'S3': 10}, {'S1': 50, 'S2': 50, 'S3': 5},
+                                               30, 'equal')
+    assert equal == {'S1': 13, 'S2': 12, 'S3': 5}
+
+
+def comments(season, texts, **columns):
+    return pd.DataFrame({'text': texts, 'season': season, **columns})
+
+
+def test_texts_shared_by_seasons_do_not_shrink_the_sample(work_dir):
+    shared = [f"shared comment {i}" for i in range(30)]
+    storage.replace('processed', 'S1_A', 'S1', comments('S1', shared + [f"first season {i}" for i in range(10)]))
+    storage.replace('processed', 'S2_A', 'S2', comments('S2', shared + [f"second season {i}" for i in range(10)]))
+
+    for seed in range(5):
+        sample, seen = create_validation_sample.stratified_sample(45, seed=seed, allocation='equal')
+        assert len(sample) == 45 and sample['text'].is_unique
+        assert seen == {'S1': 40, 'S2': 40}
+        # Le righe mancanti a una stagione vengono prese dall'altra
+        assert sample['season'].value_counts().min() >= 45 - 40
+
+
+def test_seed_makes_the_sample_reproducible(work_dir):
+    storage.replace('processed', 'S1_A', 'S1', comments('S1', [f"comment {i}" for i in range(200)]))
+    first, _ = create_validation_sample.stratified_sample(20, seed=7)
+    again, _ = create_validation_sample.stratified_sample(20, seed=7)
+    other, _ = create_validation_sample.stratified_sample(20, seed=8)
+    pd.testing.assert_frame_equal(first, again)
+    assert set(first['text']) != set(other['text'])
+
+
+def test_low_confidence_oversamples_uncertain_predictions(work_dir):
+    texts = [f"comment {i}" for i in range(1000)]
+    scores = [0.5 if i % 2 else 0.99 for i in range(1000)]  # Righe dispari incerte
+    storage.replace('results', 'S1_A', 'S1', comments('S1', texts, Sentiment_Score=scores))
+    storage.replace('processed', 'S1_A', 'S1', comments('S1', texts))  # Senza campionamento attivo
+
+    def uncertain_share(low_confidence):
+        shares = []
+        for seed in range(5):
+            sample, _ = create_validation_sample.stratified_sample(100, seed=seed, low_confidence=low_confidence)
+            shares.append(sample['text'].str.split().str[1].astype(int).mod(2).mean())
+        return sum(shares) / len(shares)
+
+    # Peso 1 + LOW_CONFIDENCE_WEIGHT per le incerte contro ~1.1: ben oltre la metà del campione
+    assert uncertain_share(True) > 0.75
+    assert 0.35 < uncertain_share(False) < 0.65
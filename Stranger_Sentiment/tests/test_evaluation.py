@@ -0,0 +1,82 @@
+import numpy as np
+import pytest
+
+import evaluation
+
+THRESHOLDS = (0.5, 0.7, 0.9, 0.99)
+
+
+@pytest.fixture(scope='module')
+def data():
+    rng = np.random.default_rng(3)
+    n = 80
+    y_true = rng.choice(evaluation.LABELS, n)
+    # Previsione corretta nel 75% dei casi, score più alti quando è corretta
+    correct = rng.random(n) < 0.75
+    other = {'POSITIVE': 'NEGATIVE', 'NEGATIVE': 'POSITIVE'}
+    labels = np.where(correct, y_true, [other[t] for t in y_true])
+    scores = np.where(correct, rng.uniform(0.6, 1.0, n), rng.uniform(0.5, 0.8, n))
+    scores[:3] = np.nan  # Righe senza score: sempre astenute
+    return y_true, labels, scores
+
+
+def naive_metrics(y_true, labels, scores, threshold):
+    """Metriche di un campione calcolate riga per riga."""
+    pred = [label if score >= threshold else evaluation.ABSTAIN for label, score in zip(labels, scores)]
+    covered = [(t, p) for t, p in zip(y_true, pred) if p != evaluation.ABSTAIN]
+    out = {'coverage': len(covered) / len(y_true),
+           'accuracy': sum(t == p for t, p in covered) / len(covered) if covered else np.nan}
+    f1s = []
+    for label in evaluation.LABELS:
+        tp = sum(t == p == label for t, p in zip(y_true, pred))
+        predicted = sum(p == label for p in pred)
+        support = sum(t == label for t in y_true)
+        precision = tp / predicted if predicted else 0.0
+        recall = tp / support if support else 0.0
+        f1s.append(2 * precision * recall / (precision + recall) if precision + recall else 0.0)
+        out[f'recall_{label}'] = recall
+    out['macro_f1'] = np.mean(f1s)
+    return out
+
+
+def test_bootstrap_intervals_match_a_naive_loop(data):
+    y_true, labels, scores = data
+    n_boot, seed = 200, 7
+    result = evaluation.evaluate(y_true, {'model': (labels, scores)}, thresholds=THRESHOLDS, n_boot=n_boot, seed=seed)
+    model = result['models']['model']
+
+    # Stessi campioni di evaluate(): conteggi multinomiali -> indici delle righe ripetute
+    counts = np.random.default_rng(seed).multinomial(len(y_true), np.full(len(y_true), 1 / len(y_true)), size=n_boot)
+    samples = [np.repeat(np.arange(len(y_true)), c) for c in counts]
+    for i, threshold in enumerate(THRESHOLDS):
+        original = naive_metrics(y_true, labels, scores, threshold)
+        boot = [naive_metrics(y_true[s], labels[s], scores[s], threshold) for s in samples]
+        for metric in evaluation.METRICS:
+            low, high = np.nanpercentile([b[metric] for b in boot], [2.5, 97.5])
+            assert model[metric]['value'][i] == pytest.approx(original[metric])
+            assert (model[metric]['low'][i], model[metric]['high'][i]) == pytest.approx((low, high))
+        recall = model['per_label']['NEGATIVE']['recall']
+        assert recall['value'][i] == pytest.approx(original['recall_NEGATIVE'])
+
+
+def test_confusion_matrix_counts_abstentions(data):
+    y_true, labels, scores = data
+    result = evaluation.evaluate(y_true, {'model': (labels, scores)}, thresholds=(0.0, 2.0), n_boot=0)
+    everything, nothing = np.array(result['models']['model']['confusion_matrices'])
+    # Soglia 0: astenute solo le righe senza score; soglia 2: tutto astenuto
+    assert everything.sum() == nothing.sum() == len(y_true)
+    assert everything[:, -1].sum() == 3
+    assert nothing[:, :-1].sum() == 0
+    assert result['models']['model']['accuracy']['value'][1] is None
+    assert result['models']['model']['coverage']['low'] == [None, None]
+
+
+def test_evaluation_frame_is_long(data):
+    y_true, labels, scores = data
+    result = evaluation.evaluate(y_true, {'a': (labels, scores), 'b': (labels, scores)}, thresholds=THRESHOLDS, n_boot=20)
+    df = evaluation.evaluation_frame(result)
+    per_model = len(evaluation.METRICS) + len(evaluation.LABELS) * len(evaluation.LABEL_METRICS)
+    assert len(df) == 2 * per_model * len(THRESHOLDS)
+    # Stessi campioni bootstrap (appaiati) per tutti i modelli
+    a, b = (df[df['model'] == m].drop(columns='model').reset_index(drop=True) for m in 'ab')
+    assert a.equals(b)
@@ -0,0 +1,42 @@
+import numpy as np
+import pytest
+
+import inference_backends
+from inference_backends import build_pipeline
+
+TEXTS = ["I love this show", "the worst trailer ever", "Eleven is back and I cannot wait to see what happens next",
+         "meh"] * 3
+
+
+def probabilities(results):
+    """Probabilità di POSITIVE da [{'label', 'score'}] (confrontabile anche quando l'etichetta cambia)."""
+    return np.array([r['score'] if r['label'] == 'POSITIVE' else 1 - r['score'] for r in results])
+
+
+@pytest.fixture(scope='module')
+def reference(tiny_model):
+    return probabilities(build_pipeline('pytorch', tiny_model)(TEXTS, truncation=True, max_length=512, batch_size=5))
+
+
+def test_onnx_matches_pytorch(tiny_model, reference, tmp_path):
+    pipe = build_pipeline('onnx', tiny_model, onnx_dir=str(tmp_path))
+    results = pipe(TEXTS, truncation=True, max_length=512, batch_size=5)
+    assert len(results) == len(TEXTS) and {r['label'] for r in results} <= {'POSITIVE', 'NEGATIVE'}
+    np.testing.assert_allclose(probabilities(results), reference, atol=1e-4)
+    # Un testo singolo come la pipeline transformers; l'esportazione viene riutilizzata
+    assert pipe(TEXTS[0])[0]['score'] == pytest.approx(results[0]['score'], abs=1e-5)
+    assert len(list(tmp_path.iterdir())) == 1
+
+
+def test_quantized_is_close_to_pytorch(tiny_model, reference):
+    pipe = build_pipeline('quantized', tiny_model)
+    results = pipe(TEXTS, truncation=True, max_length=512, batch_size=5)
+    np.testing.assert_allclose(probabilities(results), reference, atol=0.02)
+    assert hasattr(pipe, 'tokenizer')
+
+
+def test_softmax_and_unknown_backend():
+    probs = inference_backends._softmax(np.array([[0.0, 0.0], [1000.0, 0.0]]))
+    np.testing.assert_allclose(probs, [[0.5, 0.5], [1.0, 0.0]])
+    with pytest.raises(ValueError):
+        build_pipeline('tensorrt', 'any-model')
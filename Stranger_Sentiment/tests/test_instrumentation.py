@@ -0,0 +1,55 @@
+import os
+import threading
+
+import instrumentation
+from instrumentation import timer
+
+
+@timer('decorato')
+def work(n):
+    return sum(range(n))
+
+
+def test_run_manifest_collects_stages_counters_and_sections(tmp_path, monkeypatch):
+    monkeypatch.setattr(instrumentation, 'RUNS_DIR', str(tmp_path / 'runs'))
+    instrumentation.start_run('test', profile_stage='decorato')
+
+    def worker():
+        for _ in range(5):
+            with timer('pagine') as t:
+                t.items += 10
+            instrumentation.count('pagine_api')
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert work(1000) == 499500
+    instrumentation.record('filters', {'passed': 3}, key='S1_A')
+    instrumentation.record('filters', {'passed': 1}, key='S2_A')
+
+    path = instrumentation.finish_run()
+    manifest = instrumentation.load_manifest(path)
+    assert instrumentation.list_runs() == [path]
+    assert manifest['command'] == 'test' and manifest['run_id'].endswith('-test')
+    # I thread sommano i propri tempi e item nello stesso stadio
+    assert (manifest['stages']['pagine']['calls'], manifest['stages']['pagine']['items']) == (20, 200)
+    assert manifest['stages']['decorato']['calls'] == 1
+    assert manifest['counters'] == {'pagine_api': 20}
+    assert manifest['filters'] == {'S1_A': {'passed': 3}, 'S2_A': {'passed': 1}}
+    assert manifest['peak_rss_mb'] > 0
+    assert os.path.exists(manifest['profile']['path'])
+
+
+def test_old_manifests_are_pruned(tmp_path, monkeypatch):
+    runs = tmp_path / 'runs'
+    runs.mkdir()
+    monkeypatch.setattr(instrumentation, 'RUNS_DIR', str(runs))
+    monkeypatch.setattr(instrumentation, 'RUNS_KEEP', 2)
+    for day in range(1, 4):
+        (runs / f"2020010{day}-000000-old.json").write_text('{}', encoding='utf-8')
+    (runs / "20200101-000000-old.prof").write_bytes(b'')
+
+    instrumentation.start_run('new')
+    path = instrumentation.finish_run()
+    assert sorted(os.listdir(runs)) == ['20200103-000000-old.json', os.path.basename(path)]
@@ -0,0 +1,115 @@
+import os
+import json
+import threading
+
+import pandas as pd
+import pytest
+
+import storage
+import job_queue
+
+
+def video(i, group='S1', video_id=None):
+    return {'id': video_id or f"vid{i}", 'group': group, 'key': f"{group}_{i}"}
+
+
+@pytest.fixture
+def queue_path(work_dir):
+    return str(work_dir / 'data' / 'jobs.sqlite')
+
+
+def states(queue):
+    return {job['key']: job['state'] for job in queue.jobs()}
+
+
+def test_concurrent_claims_never_take_a_job_twice(queue_path):
+    videos = [video(i) for i in range(40)]
+    job_queue.open_queue(videos, path=queue_path).close()
+    claimed, barrier = [], threading.Barrier(8)
+
+    def worker():
+        # Una connessione per thread, come processi diversi sullo stesso file
+        queue = job_queue.JobQueue(queue_path)
+        barrier.wait()
+        while True:
+            jobs = queue.claim('pending', 'fetching', limit=3)
+            if not jobs:
+                break
+            claimed.extend(job['key'] for job in jobs)
+        queue.close()
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert sorted(claimed) == sorted(v['key'] for v in videos)
+    queue = job_queue.JobQueue(queue_path)
+    assert queue.counts()['fetching'] == 40
+    queue.close()
+
+
+def test_sync_follows_the_manifest(queue_path):
+    # Video già scaricato prima della coda (checkpoint completato): entra come fetched
+    storage.write_part('processed', 'S1_1', 'S1', pd.DataFrame({'text': ['x']}))
+    checkpoint = os.path.join(storage.DATASETS['processed'], 'S1_1_checkpoint.json')
+    with open(checkpoint, 'w', encoding='utf-8') as f:
+        json.dump({'completed': True}, f)
+
+    queue = job_queue.open_queue([video(0), video(1), video(2)], path=queue_path)
+    assert states(queue) == {'S1_0': 'pending', 'S1_1': 'fetched', 'S1_2': 'pending'}
+    queue.claim('pending', 'fetching')
+    queue.finish('S1_0', 'fetched', rows=10)
+
+    # Id cambiato: riparte da pending; video tolto: esce dalla coda; nuovo: pending
+    changes = queue.sync([video(0, video_id='other'), video(1), video(3)])
+    assert changes == {'added': 1, 'restarted': 1, 'removed': 1}
+    assert states(queue) == {'S1_0': 'pending', 'S1_1': 'fetched', 'S1_3': 'pending'}
+    queue.close()
+
+
+def test_interrupted_and_stale_jobs_go_back(queue_path):
+    queue = job_queue.open_queue([video(0), video(1), video(2)], path=queue_path)
+    queue.claim('pending', 'fetching', limit=3)
+    queue.finish('S1_2', 'fetched', rows=5)
+    queue.claim('fetched', 'scoring')
+
+    queue.release('S1_0', RuntimeError('quota'))
+    job = {j['key']: j for j in queue.jobs()}['S1_0']
+    assert (job['state'], job['attempts'], job['error'], job['worker']) == ('pending', 1, 'quota', None)
+
+    # Worker terminati: i job "in corso" tornano allo stato precedente
+    assert queue.reset_stale(max_age=-1) == 2
+    assert states(queue) == {'S1_0': 'pending', 'S1_1': 'pending', 'S1_2': 'fetched'}
+
+    queue.finish('S1_2', 'scored', rows=5)
+    queue.reset('scored', 'fetched', keys=['S1_2'])
+    assert queue.counts() == {'pending': 2, 'fetching': 0, 'fetched': 1, 'scoring': 0, 'scored': 0}
+    assert {j['key']: j['rows'] for j in queue.jobs()}['S1_2'] == 5
+    queue.close()
+
+
+def test_read_only_snapshot_does_not_wait_for_writers(queue_path):
+    assert job_queue.read_jobs(queue_path) is None
+    queue = job_queue.open_queue([video(1), video(2)], path=queue_path)
+    try:
+        queue.claim('pending', 'fetching')
+        # Un worker dentro una transazione di scrittura non blocca la dashboard
+        with queue._immediate():
+            jobs, counts = job_queue.read_jobs(queue_path)
+        assert jobs == queue.jobs()
+        assert counts == queue.counts() == {'pending': 1, 'fetching': 1, 'fetched': 0, 'scoring': 0, 'scored': 0}
+    finally:
+        queue.close()
+    # Sola lettura: il file non viene modificato né il job rinfrescato
+    mtime = os.path.getmtime(queue_path)
+    job_queue.read_jobs(queue_path)
+    assert os.path.getmtime(queue_path) == mtime
+
+
+def test_default_path_is_read_at_call_time(queue_path, monkeypatch):
+    monkeypatch.setattr(job_queue, 'QUEUE_FILE', queue_path)
+    job_queue.open_queue([video(1)]).close()
+    assert os.path.exists(queue_path)
+    jobs, _ = job_queue.read_jobs()
+    assert [job['key'] for job in jobs] == ['S1_1']
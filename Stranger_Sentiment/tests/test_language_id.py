@@ -0,0 +1,51 @@
+import threading
+
+import pytest
+
+import language_id
+from language_id import LanguageIdentifier
+
+ENGLISH = "I really cannot wait for the new season of this show"
+ITALIAN = "Non vedo l'ora che esca la nuova stagione di questa serie"
+
+
+def test_short_texts_are_rejected_without_detection():
+    identifier = LanguageIdentifier(workers=1)
+    assert identifier.is_target_batch(['too short', '', ENGLISH]) == [False, False, True]
+    assert identifier.stats['short'] == 2 and identifier.stats['detected'] == 1
+
+
+def test_repeated_texts_are_detected_once():
+    identifier = LanguageIdentifier(workers=1)
+    decisions = identifier.is_target_batch([ENGLISH, ITALIAN, "  " + ENGLISH.replace(' ', '   '), ENGLISH])
+    assert decisions == [True, False, True, True]
+    assert identifier.stats['detected'] == 2
+    assert identifier.is_target(ITALIAN) is False
+    assert identifier.stats['detected'] == 2  # Dal memo
+
+
+def test_concurrent_first_use_detects_correctly(monkeypatch):
+    # Profili di langdetect non ancora caricati: più thread li richiedono insieme
+    langdetect_factory = pytest.importorskip('langdetect.detector_factory')
+    monkeypatch.setattr(langdetect_factory, '_factory', None)
+    barrier = threading.Barrier(8)
+    results = []
+
+    def worker():
+        identifier = LanguageIdentifier(workers=1)
+        barrier.wait()
+        results.append(identifier.is_target(ENGLISH))
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert results == [True] * 8
+
+
+def test_unknown_detector_is_rejected():
+    with pytest.raises(ValueError):
+        LanguageIdentifier(detector='nope')
+    with pytest.raises(TypeError):
+        language_id.LanguageDetector()
@@ -0,0 +1,87 @@
+import numpy as np
+import pytest
+
+import near_dedup
+
+WORDS = ("season trailer hopper eleven upside down demogorgon cannot wait netflix hawkins mall "
+         "summer finally who here after dropped best show ever love this music scary monster "
+         "kids bikes lab russians fireworks fourth july").split()
+
+
+def exact_jaccard(a, b):
+    k = near_dedup.SHINGLE_BYTES
+    grams = [{t.encode('utf-8')[i:i + k] for i in range(max(len(t.encode('utf-8')) - k + 1, 1))} for t in (a, b)]
+    return len(grams[0] & grams[1]) / len(grams[0] | grams[1])
+
+
+@pytest.fixture(scope='module')
+def texts():
+    """Testi base casuali e, per ognuno, varianti quasi identiche (maiuscole, HTML, punteggiatura, una parola in più)."""
+    rng = np.random.default_rng(0)
+    bases = [' '.join(rng.choice(WORDS, 14)) for _ in range(60)]
+    texts, origin = [], []
+    for i, base in enumerate(bases):
+        variants = [base, base.upper() + '!!!', base.replace(' ', ' &amp; ', 1), f"<b>{base}</b> 🔥",
+                    base + ' ' + rng.choice(WORDS)]
+        texts += variants
+        origin += [i] * len(variants)
+    return texts, np.array(origin)
+
+
+def test_minhash_estimates_jaccard(texts):
+    texts, _ = texts
+    normalized = [near_dedup.normalize(t) for t in texts]
+    sig = near_dedup.signatures(normalized)
+    rng = np.random.default_rng(1)
+    pairs = rng.integers(0, len(texts), (300, 2))
+    estimated = np.array([(sig[a] == sig[b]).mean() for a, b in pairs])
+    exact = np.array([exact_jaccard(normalized[a], normalized[b]) for a, b in pairs])
+    # Errore standard della stima con 64 permutazioni: al più 1/(2*sqrt(64)) = 0.0625
+    assert np.abs(estimated - exact).mean() < 0.05
+
+
+def test_near_duplicates_are_clustered(texts):
+    texts, origin = texts
+    ids = near_dedup.cluster(texts)
+    normalized = [near_dedup.normalize(t) for t in texts]
+
+    same_origin = [(a, b) for a in range(len(texts)) for b in range(a + 1, len(texts)) if origin[a] == origin[b]]
+    near = [(a, b) for a, b in same_origin if exact_jaccard(normalized[a], normalized[b]) >= 0.9]
+    recall = np.mean([ids[a] == ids[b] for a, b in near])
+    assert len(near) > 300 and recall >= 0.95
+    # I testi di origini diverse non vengono mai uniti
+    assert all(len(set(origin[ids == c])) == 1 for c in np.unique(ids))
+    # Il rappresentante è il primo testo del cluster
+    assert all(ids[i] <= i and ids[ids[i]] == ids[i] for i in range(len(ids)))
+
+
+def test_chunking_does_not_change_signatures(texts, monkeypatch):
+    texts, _ = texts
+    normalized = [near_dedup.normalize(t) for t in texts] + ['', 'abc']
+    expected = near_dedup.signatures(normalized)
+    monkeypatch.setattr(near_dedup, 'CHUNK_GRAMS', 200)
+    np.testing.assert_array_equal(near_dedup.signatures(normalized), expected)
+
+
+def test_chunks_are_bounded_by_shingles_not_texts(monkeypatch):
+    monkeypatch.setattr(near_dedup, 'CHUNK_GRAMS', 1000)
+    texts = ['x' * 1999] * 3 + ['abcdefgh'] * 500 + ['']
+    bounds = near_dedup._chunk_bounds(texts)
+    assert bounds[0] == 0 and bounds[-1] == len(texts)
+    grams = [max(len(t), 5) - 4 for t in texts]
+    for start, stop in zip(bounds[:-1], bounds[1:]):
+        # Un testo oltre il limite forma un blocco da solo
+        assert sum(grams[start:stop]) <= 1000 or stop == start + 1
+    assert bounds[:4] == [0, 1, 2, 3]
+
+
+def test_short_texts_stay_alone():
+    ids = near_dedup.cluster(['🔥🔥', '🔥🔥', 'ok', 'ok', None, 'same text here', 'Same text here!'])
+    assert ids.tolist() == [0, 1, 2, 3, 4, 5, 5]
+
+
+def test_duplicate_stats():
+    stats = near_dedup.duplicate_stats(np.array([0, 0, 0, 3, 4]))
+    assert stats == {'comments': 5, 'clusters': 3, 'duplicate_rate': 0.4, 'largest_cluster': 3}
+    combined = near_dedup.combine_stats([stats, near_dedup.duplicate_stats(np.array([0, 1])), None])
+    assert combined == {'comments': 7, 'clusters': 5, 'duplicate_rate': 2 / 7, 'largest_cluster': 3}
@@ -0,0 +1,41 @@
+from prediction_cache import PredictionCache, make_key
+
+
+def test_key_ignores_whitespace_but_not_model_or_truncation():
+    key = make_key("great  trailer\n!", 'model-a', 512)
+    assert key == make_key("great trailer !", 'model-a', 512)
+    assert key != make_key("great trailer !", 'model-b', 512)
+    assert key != make_key("great trailer !", 'model-a', 256)
+
+
+def test_predictions_persist_across_reopen(tmp_path):
+    path = str(tmp_path / 'cache' / 'predictions.sqlite')
+    cache = PredictionCache(path)
+    cache.put_many({'a': ('POSITIVE', 0.9), 'b': ('NEGATIVE', 0.7)}, inference_seconds=2.0)
+    cache.close()
+
+    cache = PredictionCache(path)
+    assert cache.get_many(['a', 'b', 'c']) == {'a': ('POSITIVE', 0.9), 'b': ('NEGATIVE', 0.7)}
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['entries']) == (2, 1, 2)
+    cache.close()
+
+
+def test_entries_without_score_count_as_missing(tmp_path):
+    cache = PredictionCache(str(tmp_path / 'predictions.sqlite'))
+    # Voce scritta da una versione precedente, senza score: va ricalcolata
+    cache.conn.execute("INSERT INTO predictions (key, label, last_used) VALUES ('old', 'POSITIVE', 0)")
+    assert cache.get_many(['old']) == {}
+    cache.close()
+
+
+def test_evict_removes_least_recently_used(tmp_path):
+    cache = PredictionCache(str(tmp_path / 'predictions.sqlite'), max_entries=2)
+    for i, key in enumerate(['old', 'mid', 'new']):
+        cache.put_many({key: ('POSITIVE', 0.6)})
+        cache.conn.execute("UPDATE predictions SET last_used = ? WHERE key = ?", (i, key))
+    cache.conn.commit()
+
+    assert cache.evict() == 1
+    assert set(cache.get_many(['old', 'mid', 'new'])) == {'mid', 'new'}
+    cache.close()
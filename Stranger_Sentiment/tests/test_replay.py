@@ -0,0 +1,70 @@
+import pandas as pd
+import pytest
+
+import storage
+from api_recorder import PageRecorder, MissingPageError
+from fake_youtube import FIXTURE_DIR, FIXTURE_VIDEO, FakeYouTube, fixture_client, parse_fields
+
+VIDEO_ID, KEY, RELEASE = FIXTURE_VIDEO
+
+
+def collect(acquisition, monkeypatch, client, fetch_mode, recorder=None, key=KEY):
+    """Acquisizione completa (con le risposte) del video della fixture; restituisce le righe salvate."""
+    monkeypatch.setattr(acquisition, 'YOUTUBE', client)
+    monkeypatch.setattr(acquisition, 'FETCH_MODE', fetch_mode)
+    monkeypatch.setattr(acquisition, 'RECORDER', recorder or PageRecorder('off'))
+    acquisition.raccogli_e_filtra_dati(VIDEO_ID, key, RELEASE, season='S1', replies=True)
+    assert acquisition.load_checkpoint(key)['completed']
+    return storage.read('processed', key=key).sort_values('comment_id', ignore_index=True)
+
+
+def offline_client():
+    client = FakeYouTube({})
+    client.on_call = lambda resource, params: pytest.fail(f"Richiesta all'API in replay: {resource} {params}")
+    return client
+
+
+def test_minimal_fields_return_the_same_rows_as_full(acquisition, monkeypatch):
+    full_client, minimal_client = fixture_client(), fixture_client()
+    full = collect(acquisition, monkeypatch, full_client, 'full', key='S1_full')
+    minimal = collect(acquisition, monkeypatch, minimal_client, 'minimal', key='S1_minimal')
+
+    assert len(full) == 25 and full['depth'].sum() == 21
+    pd.testing.assert_frame_equal(minimal, full)
+    assert all('fields' in params for _, params in minimal_client.calls)
+    assert not any('fields' in params for _, params in full_client.calls)
+    # Il testo salvato è textOriginal (senza l'HTML di textDisplay), normalizzato in text
+    row = full[full['comment_id'] == 'vidR-1'].iloc[0]
+    assert (row['text_raw'], row['text']) == ("Steve & Robin\nthis friendship is the best part of the whole show",
+                                              "Steve & Robin this friendship is the best part of the whole show")
+
+
+def test_replay_of_recorded_pages_matches_a_live_full_run(acquisition, monkeypatch):
+    live = collect(acquisition, monkeypatch, fixture_client(), 'full', key='S1_live')
+    recorder = PageRecorder('replay', FIXTURE_DIR)
+    replayed = collect(acquisition, monkeypatch, offline_client(), 'minimal', recorder, key='S1_replay')
+
+    pd.testing.assert_frame_equal(replayed, live)
+    # 3 pagine di thread + 5 di risposte, nessuna scrittura nella fixture
+    assert recorder.stats == {'replayed': 8, 'recorded': 0, 'bytes_on_disk': 0}
+
+
+def test_replay_never_calls_the_api_for_missing_pages(acquisition, monkeypatch, tmp_path):
+    recorder = PageRecorder('replay', str(tmp_path / 'empty'))
+    with pytest.raises(MissingPageError):
+        recorder.fetch('commentThreads', {'videoId': VIDEO_ID, 'part': 'snippet'}, lambda: pytest.fail("richiesta"))
+
+    # Nell'acquisizione la pagina mancante interrompe il video (riprendibile), senza richieste
+    client = offline_client()
+    monkeypatch.setattr(acquisition, 'YOUTUBE', client)
+    monkeypatch.setattr(acquisition, 'RECORDER', recorder)
+    assert acquisition.raccogli_e_filtra_dati(VIDEO_ID, KEY, RELEASE, season='S1', replies=True) == 0
+    assert not acquisition.load_checkpoint(KEY)['completed']
+    assert client.calls == []
+
+
+def test_parse_fields():
+    assert parse_fields("nextPageToken,items(id,snippet(a,b(c)),replies(comments(id)))") == {
+        'nextPageToken': None,
+        'items': {'id': None, 'snippet': {'a': None, 'b': {'c': None}}, 'replies': {'comments': {'id': None}}},
+    }
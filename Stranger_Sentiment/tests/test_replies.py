@@ -0,0 +1,70 @@
+import pytest
+
+import storage
+from youtube_api import ApiHttpError
+from fake_youtube import FakeYouTube, english_threads, INLINE_REPLIES
+
+RELEASE = '2019-07-04'
+# Thread 0: 12 risposte (3 pagine di comments), 1: 3 (tutte nella pagina), 2: nessuna, 3: 6 (2 pagine)
+REPLIES = (12, 3, 0, 6)
+
+
+@pytest.fixture
+def fake(acquisition, monkeypatch):
+    client = FakeYouTube({'vidA': english_threads('vidA', 4, replies=REPLIES)}, page_size=2, reply_page_size=5)
+    monkeypatch.setattr(acquisition, 'YOUTUBE', client)
+    return client
+
+
+def expected_rows():
+    rows = {}
+    for thread in english_threads('vidA', 4, replies=REPLIES):
+        rows[thread['id']] = (None, 0)
+        rows.update({r['id']: (thread['id'], 1) for r in thread['replies']})
+    return rows
+
+
+def stored_rows():
+    df = storage.read('processed', key='S1_A')
+    assert df['comment_id'].is_unique
+    return {row.comment_id: (row.parent_id if row.depth else None, row.depth) for row in df.itertuples()}
+
+
+def test_incomplete_threads_are_fetched_page_by_page(acquisition, fake):
+    assert acquisition.raccogli_e_filtra_dati('vidA', 'S1_A', RELEASE, season='S1', replies=True) == 25
+    # Ogni risposta una sola volta: quelle incluse nella pagina non si sommano a quelle scaricate
+    assert stored_rows() == expected_rows()
+
+    assert [c.get('pageToken') for c in fake.calls_to('comments', 'vidA-0')] == [None, '5', '10']
+    assert len(fake.calls_to('comments', 'vidA-3')) == 2
+    # Thread completi (o senza risposte): nessuna chiamata a comments
+    assert fake.calls_to('comments', 'vidA-1') == fake.calls_to('comments', 'vidA-2') == []
+    assert all(c['part'] == 'snippet,replies' for c in fake.calls_to('commentThreads'))
+
+    checkpoint = acquisition.load_checkpoint('S1_A')
+    assert (checkpoint['commenti_totali_letti'], checkpoint['risposte_lette']) == (25, 21)
+
+
+def test_inline_replies_are_used_when_complete(acquisition, fake):
+    # Pagina con il solo thread 1 (3 risposte, tutte incluse)
+    page = fake.commentThreads().list(part='snippet,replies', videoId='vidA', pageToken=None).execute()
+    assert len(page['items'][0]['replies']['comments']) == INLINE_REPLIES
+    rows = acquisition._thread_rows(page['items'][1:], acquisition.get_reply_pool())
+    assert [(r['comment_id'], r['parent_id'], r['depth']) for r in rows] == [
+        ('vidA-1', None, 0), ('vidA-1.0', 'vidA-1', 1), ('vidA-1.1', 'vidA-1', 1), ('vidA-1.2', 'vidA-1', 1)]
+    assert fake.calls_to('comments') == []
+
+
+def test_failed_reply_page_is_retried_with_its_thread_page(acquisition, fake):
+    # Una pagina di risposte fallisce a ogni tentativo: la pagina di thread che la contiene non viene salvata
+    fake.fail('comments', 'vidA-3', '5', *[ApiHttpError(503, b'{}')] * 6)
+    acquisition.raccogli_e_filtra_dati('vidA', 'S1_A', RELEASE, season='S1', replies=True)
+    checkpoint = acquisition.load_checkpoint('S1_A')
+    assert not checkpoint['completed'] and checkpoint['next_page_token'] == '2'
+    first_page = {'vidA-0', 'vidA-1'} | {f"vidA-0.{j}" for j in range(12)} | {f"vidA-1.{j}" for j in range(3)}
+    assert set(stored_rows()) == first_page
+
+    # Ripresa: la seconda pagina di thread viene riletta per intero, senza righe doppie
+    acquisition.raccogli_e_filtra_dati('vidA', 'S1_A', RELEASE, season='S1', replies=True)
+    assert stored_rows() == expected_rows()
+    assert len(fake.calls_to('commentThreads', 'vidA', None)) == 1
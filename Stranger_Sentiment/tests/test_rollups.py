@@ -0,0 +1,77 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import rollups
+
+RELEASE = {'S1_A': '2019-07-04', 'S1_B': '2019-07-14', 'S2_A': '2022-05-27'}
+SEASONS = {'S1_A': 'S1', 'S1_B': 'S1', 'S2_A': 'S2'}
+
+
+def scored(key, n, seed):
+    rng = np.random.default_rng(seed)
+    start = pd.Timestamp(RELEASE[key], tz='UTC') - pd.Timedelta(days=20)
+    times = start + pd.to_timedelta(np.sort(rng.integers(0, 20 * 24 * 60, n)), unit='min')
+    return pd.DataFrame({'time': times.strftime('%Y-%m-%dT%H:%M:%SZ'),
+                         'Predicted_Sentiment': rng.choice(['POSITIVE', 'NEGATIVE', 'NEUTRAL'], n)})
+
+
+@pytest.fixture
+def corpus():
+    return {key: scored(key, 400, seed) for seed, key in enumerate(RELEASE)}
+
+
+def full_recompute(corpus):
+    counts = pd.concat([rollups._hourly_counts(df).assign(key=key, season=SEASONS[key]) for key, df in corpus.items()])
+    counts = counts.groupby(['key', 'season', 'hour'], as_index=False)[rollups.LABELS].sum()
+    return rollups.derive(counts, RELEASE)
+
+
+def assert_same_table(stored, expected, time_col):
+    stored = stored.sort_values(['season', time_col]).reset_index(drop=True)
+    expected = expected.sort_values(['season', time_col]).reset_index(drop=True)
+    pd.testing.assert_frame_equal(stored[expected.columns], expected, check_dtype=False)
+
+
+def test_incremental_updates_match_full_recompute(work_dir, corpus):
+    for end in (100, 250, 400):
+        rollups.update([(key, SEASONS[key], df.iloc[:end]) for key, df in corpus.items()], RELEASE)
+    daily, hourly = full_recompute(corpus)
+    assert_same_table(rollups.read('daily'), daily, 'date')
+    assert_same_table(rollups.read('hourly'), hourly, 'hour')
+    assert rollups.load_state()['version'] == 3
+
+    # Nessuna riga nuova: nessuna nuova versione
+    rollups.update([(key, SEASONS[key], df) for key, df in corpus.items()], RELEASE)
+    assert rollups.load_state()['version'] == 3
+
+
+def test_append_keeps_state_consistent_with_update(work_dir, corpus):
+    for start, end in ((0, 150), (150, 400)):
+        rollups.append([(key, SEASONS[key], df.iloc[start:end]) for key, df in corpus.items()], RELEASE)
+    assert_same_table(rollups.read('daily'), full_recompute(corpus)[0], 'date')
+
+    # update() riconosce le righe già sommate da append() e non ricalcola nulla
+    version = rollups.load_state()['version']
+    rollups.update([(key, SEASONS[key], df) for key, df in corpus.items()], RELEASE)
+    assert rollups.load_state()['version'] == version
+
+
+def test_relabeled_key_is_rebuilt(work_dir, corpus):
+    rollups.update([(key, SEASONS[key], df) for key, df in corpus.items()], RELEASE)
+    relabeled = corpus['S1_A'].assign(Predicted_Sentiment='POSITIVE')
+    corpus = dict(corpus, S1_A=relabeled)
+    rollups.update([(key, SEASONS[key], df) for key, df in corpus.items()], RELEASE)
+    assert_same_table(rollups.read('daily'), full_recompute(corpus)[0], 'date')
+
+
+def test_days_before_release_is_weighted_per_video(work_dir):
+    # Due video della stessa stagione, con date di uscita diverse, commentati nella stessa ora
+    hour = '2019-07-01T12:00:00Z'
+    frames = [('S1_A', 'S1', pd.DataFrame({'time': [hour] * 3, 'Predicted_Sentiment': 'POSITIVE'})),
+              ('S1_B', 'S1', pd.DataFrame({'time': [hour], 'Predicted_Sentiment': 'NEGATIVE'}))]
+    rollups.update(frames, RELEASE)
+    row = rollups.read('hourly').iloc[0]
+    # S1_A esce 2.5 giorni dopo, S1_B 12.5 giorni dopo: media pesata sui 4 commenti
+    assert row['total'] == 4 and row['positive_ratio'] == 0.75
+    assert row['days_before_release'] == pytest.approx((3 * 2.5 + 1 * 12.5) / 4)
@@ -0,0 +1,87 @@
+import pandas as pd
+import pytest
+
+import storage
+import search_index
+from search_index import SearchQueryError
+
+
+@pytest.fixture
+def index(work_dir):
+    return str(work_dir / 'data' / 'results' / 'search.sqlite')
+
+
+def results(texts, labels=None, start='2019-06-01T10:00:00Z'):
+    n = len(texts)
+    return pd.DataFrame({
+        'text': texts,
+        'time': pd.date_range(start, periods=n, freq='D').strftime('%Y-%m-%dT%H:%M:%SZ'),
+        'Predicted_Sentiment': labels or ['POSITIVE'] * n,
+        'Sentiment_Score': [0.9] * n,
+    })
+
+
+def save_and_index(key, season, df, index):
+    storage.replace('results', key, season, df)
+    return search_index.update([(key, season, storage.read('results', key=key))], path=index)
+
+
+def test_search_returns_inserted_rows(index):
+    save_and_index('S1_A', 'S1', results(["Eleven saves Hopper", "the demogorgon is scary", "Café in Hawkins"],
+                                         labels=['POSITIVE', 'NEGATIVE', 'POSITIVE']), index)
+    save_and_index('S2_A', 'S2', results(["Hopper is back"], start='2022-05-01T10:00:00Z'), index)
+
+    page, total, _ = search_index.search('hopper', path=index)
+    assert total == 2 and set(page['text']) == {"Eleven saves Hopper", "Hopper is back"}
+    page, total, _ = search_index.search('demo*', path=index)
+    assert (total, page.iloc[0]['label'], page.iloc[0]['key']) == (1, 'NEGATIVE', 'S1_A')
+    # Accenti ignorati, parole in AND, caratteri FTS5 trattati come testo
+    assert search_index.search('cafe', path=index)[1] == 1
+    assert search_index.search('hopper eleven', path=index)[1] == 1
+    assert search_index.search('hopper AND (', path=index)[1] == 0
+
+    assert search_index.search('hopper', seasons=['S2'], path=index)[0]['text'].tolist() == ["Hopper is back"]
+    assert search_index.search(labels=['NEGATIVE'], path=index)[1] == 1
+    assert search_index.search(start='2019-06-02', end='2019-06-03', sort='oldest', path=index)[0]['text'].tolist() == [
+        "the demogorgon is scary", "Café in Hawkins"]
+    assert search_index.stats(path=index) == {'S1': 3, 'S2': 1}
+
+
+def test_only_new_or_changed_rows_are_indexed(index):
+    df = results(["one", "two", "three"])
+    assert save_and_index('S1_A', 'S1', df, index) == 3
+    assert save_and_index('S1_A', 'S1', df, index) == 0
+
+    grown = pd.concat([df, results(["four"], start='2019-07-01T10:00:00Z')], ignore_index=True)
+    assert save_and_index('S1_A', 'S1', grown, index) == 1
+
+    # Etichetta cambiata: la chiave viene reindicizzata senza righe doppie
+    relabeled = grown.assign(Predicted_Sentiment='NEGATIVE')
+    assert save_and_index('S1_A', 'S1', relabeled, index) == 4
+    page, total, _ = search_index.search(path=index)
+    assert total == 4 and set(page['label']) == {'NEGATIVE'}
+    assert search_index.search('two', path=index)[1] == 1
+
+
+def test_append_is_consistent_with_update(index):
+    df = results(["first comment", "second comment"])
+    storage.replace('results', 'S1_A', 'S1', df)
+    search_index.append([('S1_A', 'S1', df.iloc[:1]), ('S1_A', 'S1', df.iloc[1:])], path=index)
+    assert search_index.indexed_rows(path=index) == {'S1_A': 2}
+    assert search_index.update([('S1_A', 'S1', storage.read('results', key='S1_A'))], path=index) == 0
+    assert search_index.search('comment', path=index)[1] == 2
+
+
+def test_invalid_sort_is_rejected(index):
+    save_and_index('S1_A', 'S1', results(["text"]), index)
+    with pytest.raises(SearchQueryError):
+        search_index.search('text', sort='random', path=index)
+
+
+def test_default_path_is_read_at_call_time(index, monkeypatch):
+    monkeypatch.setattr(search_index, 'INDEX_FILE', index)
+    assert not search_index.exists() and search_index.indexed_rows() == {}
+    storage.replace('results', 'S1_A', 'S1', results(["one comment", "two comments"]))
+    search_index.append([('S1_A', 'S1', storage.read('results', key='S1_A'))])
+    assert search_index.exists(index)
+    assert search_index.stats() == {'S1': 2} and search_index.search('comment*')[1] == 2
@@ -0,0 +1,221 @@
+import types
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import storage
+import videos
+import aggregates
+import synthetic_corpus
+
+TEXTS = ["I love this show", "the worst trailer I have ever seen in my whole life honestly",
+         "ok", "Eleven is back and I cannot wait to see what happens next", "I love this show", "", None,
+         "meh", "the soundtrack is amazing"]
+RELEASE_DATES = {'S1': '2016-07-15', 'S3': '2019-07-04'}
+VIDEOS = [{'id': f"vid{s}", 'group': s, 'key': f"{s}_Hype", 'release_date': date, 'tags': [], 'show': None}
+          for s, date in RELEASE_DATES.items()]
+
+
+@pytest.fixture
+def batches(processor, monkeypatch):
+    """Batch passati al modello (nel processo principale)."""
+    recorded = []
+    infer_batch = processor._infer_batch
+
+    def record(batch):
+        recorded.append(list(batch))
+        return infer_batch(batch)
+    monkeypatch.setattr(processor, '_infer_batch', record)
+    return recorded
+
+
+@pytest.fixture
+def corpus(processor, monkeypatch):
+    """Dati processati di due video dal corpus sintetico (con spam ripetuto e varianti quasi identiche)."""
+    monkeypatch.setattr(videos, 'load', lambda path=None: [dict(v) for v in VIDEOS])
+    df = synthetic_corpus.generate(800, seed=1, release_dates=RELEASE_DATES)
+    df = df[df['lang'] == 'en'].drop(columns='lang')
+    frames = {}
+    for video in VIDEOS:
+        frame = df[df['season'] == video['group']].reset_index(drop=True)
+        frame = frame.assign(comment_id=[f"{video['key']}-{i}" for i in range(len(frame))])
+        storage.replace('processed', video['key'], video['group'], frame)
+        frames[video['key']] = frame
+    return frames
+
+
+def results(key, columns=('comment_id', 'Predicted_Sentiment', 'Sentiment_Score')):
+    return storage.read('results', key=key)[list(columns)].sort_values('comment_id', ignore_index=True)
+
+
+def test_batched_scores_match_single_text_inference(processor, batches):
+    texts = pd.Series(TEXTS, index=range(100, 100 + len(TEXTS)))
+    df = processor.predict_sentiment_scores(texts, batch_size=3)
+    assert df.index.equals(texts.index)
+
+    pipe = processor.get_pipeline()
+    for text, label, score in zip(TEXTS, df['Predicted_Sentiment'], df['Sentiment_Score']):
+        if not text:
+            assert label is None and np.isnan(score)
+            continue
+        expected = pipe(text, truncation=True, max_length=processor.MAX_LENGTH)[0]
+        assert label == expected['label'] and score == pytest.approx(expected['score'], abs=1e-5)
+
+    # Testi ripetuti calcolati una volta, batch di al più 3 testi ordinati per lunghezza
+    sent = [t for batch in batches for t in batch]
+    assert sorted(sent) == sorted({t for t in TEXTS if t})
+    assert all(len(batch) <= 3 for batch in batches)
+    lengths = processor._token_lengths(sent)
+    assert lengths == sorted(lengths)
+
+
+def test_cached_predictions_skip_the_model(processor, batches):
+    first = processor.predict_sentiment_scores(TEXTS)
+    batches.clear()
+    second = processor.predict_sentiment_scores(TEXTS)
+    assert batches == []
+    pd.testing.assert_frame_equal(first, second)
+    assert processor.predict_sentiment_batch(["I love this show", None]) == [first['Predicted_Sentiment'][0], None]
+    assert processor.predict_sentiment("I love this show") == first['Predicted_Sentiment'][0]
+    assert batches == []
+
+
+def test_worker_processes_give_the_serial_results(processor, monkeypatch, tmp_path):
+    # Anche su una macchina con un solo core: il pool viene comunque avviato
+    monkeypatch.setattr(processor, '_available_cores', lambda: 2)
+    texts = [f"{text} {i}" for i in range(20) for text in TEXTS[:4]]
+    serial = processor.predict_sentiment_scores(texts, batch_size=8)
+    # Cache nuova: i worker devono ricalcolare tutto con lo stesso modello
+    processor.prediction_cache.close()
+    monkeypatch.setattr(processor, 'prediction_cache', None)
+    monkeypatch.setattr(processor, 'PREDICTION_CACHE_FILE', str(tmp_path / 'workers.sqlite'))
+    parallel = processor.predict_sentiment_scores(texts, batch_size=8, workers=2)
+    pd.testing.assert_frame_equal(parallel, serial, atol=1e-5)
+
+
+def test_cluster_labels_are_copied_from_the_representative(processor, corpus, batches):
+    processor.run_full_analysis(batch_size=16, dedup=True)
+    for key, processed in corpus.items():
+        df = storage.read('results', key=key)
+        assert len(df) == len(processed)
+        # Ogni riga ha etichetta e score del suo rappresentante (cluster_id = posizione nel video)
+        rep = df.set_index(np.arange(len(df))).loc[df['cluster_id']]
+        assert (df['Predicted_Sentiment'].to_numpy() == rep['Predicted_Sentiment'].to_numpy()).all()
+        assert np.allclose(df['Sentiment_Score'].to_numpy(), rep['Sentiment_Score'].to_numpy())
+        assert df['cluster_id'].nunique() < len(df)
+    # Al modello arrivano solo i rappresentanti
+    representatives = sum(storage.read('results', key=key)['cluster_id'].nunique() for key in corpus)
+    assert sum(len(b) for b in batches) <= representatives
+
+    artifact = aggregates.load()
+    assert {season: entry['total'] for season, entry in artifact['seasons'].items()} == {
+        video['group']: len(corpus[video['key']]) for video in VIDEOS}
+    assert artifact['duplicates']['S1']['clusters'] == storage.read('results', key='S1_Hype')['cluster_id'].nunique()
+
+
+def test_streaming_mode_matches_whole_video_mode(processor, corpus, monkeypatch):
+    import rollups
+    import search_index
+
+    processor.run_full_analysis(batch_size=16, dedup=False)
+    whole = {key: results(key) for key in corpus}
+    whole_seasons, whole_daily = aggregates.load()['seasons'], rollups.read('daily')
+
+    processor.run_full_analysis(batch_size=16, dedup=False, rescore=True, chunk_rows=100)
+    for key, processed in corpus.items():
+        assert storage.count_parts('results', key) == -(-len(processed) // 100)
+        pd.testing.assert_frame_equal(results(key), whole[key])
+    assert aggregates.load()['seasons'] == whole_seasons
+    pd.testing.assert_frame_equal(rollups.read('daily'), whole_daily)
+    assert search_index.stats() == {'S1': len(corpus['S1_Hype']), 'S3': len(corpus['S3_Hype'])}
+
+    # Con i quasi-duplicati i cluster restano dentro il blocco
+    processor.run_full_analysis(batch_size=16, dedup=True, rescore=True, chunk_rows=100)
+    for key in corpus:
+        ids = storage.read('results', columns=['cluster_id'], key=key)['cluster_id'].to_numpy()
+        assert (ids // 100 == np.arange(len(ids)) // 100).all()
+
+
+@pytest.mark.parametrize('chunk_rows', [None, 100])
+def test_long_scoring_jobs_are_not_reset_by_another_process(processor, corpus, monkeypatch, chunk_rows):
+    import job_queue
+
+    # Orologio della coda finto: ogni batch dura 20 minuti, oltre STALE_AFTER_SECONDS in due batch
+    clock = [1e9]
+    monkeypatch.setattr(job_queue, 'time', types.SimpleNamespace(time=lambda: clock[0]))
+    monkeypatch.setattr(processor, 'HEARTBEAT_SECONDS', 0)
+    states = []
+    infer_batch = processor._infer_batch
+
+    def slow_batch(batch):
+        clock[0] += 20 * 60
+        # Un secondo processo apre la coda (reset_stale) mentre l'analisi è in corso
+        other = job_queue.open_queue(VIDEOS)
+        try:
+            states.append({job['key']: job['state'] for job in other.jobs()})
+        finally:
+            other.close()
+        return infer_batch(batch)
+    monkeypatch.setattr(processor, '_infer_batch', slow_batch)
+
+    processor.run_full_analysis(batch_size=16, dedup=False, chunk_rows=chunk_rows)
+    assert len(states) > 2
+    for key in corpus:
+        # Una volta in analisi il job non torna mai 'fetched' (nessuna doppia analisi)
+        seen = [s[key] for s in states]
+        if 'scoring' in seen:
+            assert 'fetched' not in seen[seen.index('scoring'):]
+    queue = job_queue.open_queue(VIDEOS)
+    try:
+        final = {job['key']: (job['state'], job['attempts'], job['error']) for job in queue.jobs()}
+    finally:
+        queue.close()
+    assert final == {'S1_Hype': ('scored', 0, None), 'S3_Hype': ('scored', 0, None)}
+
+
+def test_new_analysis_merges_only_new_rows_into_rollups_and_index(processor, corpus, monkeypatch):
+    import rollups
+    import job_queue
+    import search_index
+
+    processor.run_full_analysis(batch_size=16, dedup=False)
+    daily = rollups.read('daily')
+
+    # S3 riacquisito e S1 con una parte di risultati in più (es. watch interrotto prima dei rollup)
+    queue = job_queue.open_queue(VIDEOS)
+    queue.reset('scored', 'fetched', keys=['S3_Hype'])
+    queue.close()
+    extra = storage.read('results', key='S1_Hype').iloc[:5]
+    storage.write_part('results', 'S1_Hype', 'S1', extra)
+
+    read = []
+    iter_parts = storage.iter_parts
+
+    def record(dataset, columns=None, key=None, skip_rows=0):
+        read.append((tuple(columns or ()), key, skip_rows))
+        return iter_parts(dataset, columns=columns, key=key, skip_rows=skip_rows)
+    monkeypatch.setattr(storage, 'iter_parts', record)
+    monkeypatch.setattr(rollups, 'update', None)  # Il percorso con le impronte resta solo per --rescore
+    monkeypatch.setattr(search_index, 'update', None)
+    processor.run_full_analysis(batch_size=16, dedup=False)
+
+    totals = {key: storage.count_rows('results', key) for key in corpus}
+    assert totals == {'S1_Hype': len(corpus['S1_Hype']) + 5, 'S3_Hype': len(corpus['S3_Hype'])}
+    assert {key: done['rows'] for key, done in rollups.load_state()['keys'].items()} == totals
+    assert search_index.stats() == {'S1': totals['S1_Hype'], 'S3': totals['S3_Hype']}
+    # S1 riceve solo la parte nuova (la storia non viene riletta), S3 è ricostruito
+    assert {(key, skip) for columns, key, skip in read if columns == ('time', 'Predicted_Sentiment')} == {
+        ('S1_Hype', len(corpus['S1_Hype'])), ('S3_Hype', 0)}
+    merged = rollups.read('daily')
+    assert merged['total'].sum() == daily['total'].sum() + 5
+    pd.testing.assert_frame_equal(merged[merged['season'] == 'S3'].reset_index(drop=True),
+                                  daily[daily['season'] == 'S3'].reset_index(drop=True))
+
+
+def test_extra_workers_are_clamped_with_a_single_warning(processor, monkeypatch, capsys):
+    monkeypatch.setattr(processor, '_available_cores', lambda: 1)
+    for i in range(3):  # Come un video dopo l'altro nello stesso run
+        processor.predict_sentiment_scores([f"{text} {i}" for text in TEXTS[:4]], batch_size=2, workers=4)
+    assert capsys.readouterr().out.count("[AVVISO]") == 1
+    assert processor._worker_pool is None  # Un solo core: esecuzione seriale, nessun pool
@@ -0,0 +1,83 @@
+import os
+
+import pandas as pd
+import pytest
+
+import storage
+
+
+@pytest.fixture(params=['parquet', 'csv'])
+def fmt(request, work_dir, monkeypatch):
+    if request.param == 'parquet':
+        pytest.importorskip('pyarrow')
+    monkeypatch.setenv('STRANGER_STORAGE', request.param)
+    return request.param
+
+
+def frame(n, start=0, season='S1'):
+    return pd.DataFrame({
+        'text': [f"comment {i}" for i in range(start, start + n)],
+        'time': pd.date_range('2019-06-01', periods=n, freq='h', tz='UTC').strftime('%Y-%m-%dT%H:%M:%SZ'),
+        'season': season,
+    })
+
+
+def test_parts_round_trip_in_order(fmt):
+    for i in range(3):
+        path = storage.write_part('processed', 'S1_Hype', 'S1', frame(4, start=4 * i))
+        assert path.endswith(f"S1_Hype-{i:05d}.{fmt}")
+    storage.write_part('processed', 'S2_Hype', 'S2', frame(2, season='S2'))
+
+    df = storage.read('processed', key='S1_Hype')
+    assert df['text'].tolist() == [f"comment {i}" for i in range(12)]
+    assert isinstance(df['season'].dtype, pd.CategoricalDtype)
+    assert str(df['time'].dt.tz) == 'UTC'
+    assert storage.count_rows('processed') == 14
+    assert storage.list_keys('processed') == ['S1_Hype', 'S2_Hype']
+    assert storage.read('processed', columns=['text'], seasons=['S2']).columns.tolist() == ['text']
+
+
+def test_batches_and_parts_cover_every_row(fmt):
+    for i in range(3):
+        storage.write_part('results', 'S1_Hype', 'S1', frame(5, start=5 * i))
+    batches = list(storage.iter_batches('results', columns=['text'], batch_size=2, key='S1_Hype'))
+    assert max(len(b) for b in batches) <= 2
+    assert pd.concat(batches)['text'].tolist() == [f"comment {i}" for i in range(15)]
+    assert [len(p) for p in storage.iter_parts('results', key='S1_Hype')] == [5, 5, 5]
+
+
+def test_parts_after_skipped_rows(fmt):
+    for i in range(3):
+        storage.write_part('results', 'S1_Hype', 'S1', frame(4, start=4 * i))
+    parts = list(storage.iter_parts('results', columns=['text'], key='S1_Hype', skip_rows=6))
+    assert [p['text'].tolist() for p in parts] == [['comment 6', 'comment 7'], [f"comment {i}" for i in range(8, 12)]]
+    assert list(storage.iter_parts('results', key='S1_Hype', skip_rows=12)) == []
+
+
+def test_remove_parts_keeps_the_first_parts(fmt):
+    for i in range(3):
+        storage.write_part('processed', 'S1_Hype', 'S1', frame(2, start=2 * i))
+    storage.remove_parts('processed', 'S1_Hype', keep=1)
+    assert storage.count_parts('processed', 'S1_Hype') == 1
+    storage.replace('processed', 'S1_Hype', 'S1', frame(3))
+    assert storage.count_rows('processed', 'S1_Hype') == 3
+
+
+def test_legacy_csv_is_read_until_parts_exist(fmt):
+    os.makedirs(storage.DATASETS['processed'], exist_ok=True)
+    legacy = os.path.join(storage.DATASETS['processed'], 'S1_Hype_processed.csv')
+    frame(3).to_csv(legacy, sep=';', index=False)  # Vecchio separatore
+
+    assert storage.list_keys('processed') == ['S1_Hype']
+    assert storage.read('processed', key='S1_Hype')['text'].tolist() == ['comment 0', 'comment 1', 'comment 2']
+    # Con una parte presente il vecchio CSV viene ignorato
+    storage.write_part('processed', 'S1_Hype', 'S1', frame(1, start=10))
+    assert storage.read('processed', key='S1_Hype')['text'].tolist() == ['comment 10']
+
+
+def test_export_csv_concatenates_parts(fmt, work_dir):
+    storage.write_part('results', 'S1_Hype', 'S1', frame(2))
+    storage.write_part('results', 'S2_Hype', 'S2', frame(2, start=2, season='S2'))
+    path = storage.export_csv('results', str(work_dir / 'full.csv'), columns=['text', 'season'])
+    assert pd.read_csv(path).to_dict('list') == {'text': ['comment 0', 'comment 1', 'comment 2', 'comment 3'],
+                                                 'season': ['S1', 'S1', 'S2', 'S2']}
@@ -0,0 +1,53 @@
+import pandas as pd
+import pytest
+
+import text_normalization
+from text_normalization import normalize_texts
+
+
+@pytest.mark.parametrize('raw, expected', [
+    ("Best show ever<br>can't wait<br/>!", "Best show ever can't wait !"),
+    ('<a href="https://www.youtube.com/watch?v=x&amp;t=90">1:30</a> the lab scene', "1:30 the lab scene"),
+    ("<b>Hopper</b> is back", "Hopper is back"),
+    ("watch it here https://netflix.com/title/80057281 now", "watch it here now"),
+    ("Steve &amp; Robin &#39;forever&#39; &lt;3", "Steve & Robin 'forever' <3"),
+    ("NOOOOOOOO!!!!!!!!  sooo   good", "NOOOOOOOO!!!!!!!! sooo good"),  # Le ripetizioni restano
+    ("  \n spaced \t out  ", "spaced out"),
+    (None, ""),
+])
+def test_normalize_texts(raw, expected):
+    assert normalize_texts([raw]).tolist() == [expected]
+
+
+def test_long_texts_are_cut():
+    assert normalize_texts(["word " * 1000])[0] == ("word " * 400).rstrip()
+    assert len(normalize_texts(["x" + "ab" * 2000])[0]) == text_normalization.MAX_CHARS
+
+
+def test_normalize_frame_keeps_the_raw_text_and_is_repeatable():
+    df = pd.DataFrame({'text': ["a<br>b", "plain", "x &amp; y"]})
+    text_normalization.normalize_frame(df)
+    assert df['text_raw'].tolist() == ["a<br>b", "plain", "x &amp; y"]
+    assert df['text'].tolist() == ["a b", "plain", "x & y"]
+    # Si riparte sempre da text_raw: rieseguire non cambia nulla
+    assert text_normalization.normalize_frame(df.copy()).equals(df)
+
+    # Parti scritte prima della normalizzazione: text_raw mancante su alcune righe
+    mixed = pd.DataFrame({'text': ["a<br>b", "c &amp; d"], 'text_raw': ["e<br>f", None]})
+    assert text_normalization.normalize_frame(mixed)['text'].tolist() == ["e f", "c & d"]
+
+
+def test_token_counts_and_describe():
+    df = text_normalization.normalize_frame(pd.DataFrame({'text': ["one<br>two", "three", "four http://x.y five"]}))
+
+    # "Token" = parole, con i tag come parole a sé
+    def token_lengths(texts):
+        return [len(t.replace('<', ' <').split()) for t in texts]
+
+    counts = text_normalization.token_counts(df, token_lengths)
+    assert counts == {'rows': 3, 'changed': 2, 'sampled': 3, 'tokens_before': 6, 'tokens_after': 5}
+    total = text_normalization.combine_counts([counts, counts])
+    summary = text_normalization.describe(total)
+    assert (summary['rows'], summary['avg_tokens_before'], summary['avg_tokens_after']) == (6, 2.0, 5 / 3)
+    assert summary['token_reduction'] == pytest.approx(1 / 6)
+    assert summary['changed_rate'] == pytest.approx(2 / 3)
@@ -0,0 +1,53 @@
+import json
+
+import pytest
+
+import videos
+from videos import ManifestError
+
+GROUPS = {'S1': {'release_date': '2016-07-15', 'show': 'Stranger Things'}, 'S2': {'release_date': '2017-10-27'}}
+
+
+def write_manifest(tmp_path, entries, groups=GROUPS):
+    path = tmp_path / 'videos.json'
+    path.write_text(json.dumps({'groups': groups, 'videos': entries}), encoding='utf-8')
+    return str(path)
+
+
+def test_entries_are_completed_from_their_group(tmp_path):
+    path = write_manifest(tmp_path, [
+        {'id': 'a1', 'group': 'S1', 'key': 'S1_Hype', 'tags': ['trailer']},
+        {'id': 'b2', 'group': 'S2', 'release_date': '2017-10-20', 'tags': ['teaser']},
+    ])
+    loaded = videos.load(path)
+    assert loaded == [
+        {'id': 'a1', 'group': 'S1', 'key': 'S1_Hype', 'release_date': '2016-07-15', 'tags': ['trailer'],
+         'show': 'Stranger Things'},
+        {'id': 'b2', 'group': 'S2', 'key': 'S2_b2', 'release_date': '2017-10-20', 'tags': ['teaser'], 'show': None},
+    ]
+    # La data del video prevale su quella del gruppo
+    assert videos.release_dates(path) == {'S1_Hype': '2016-07-15', 'S2_b2': '2017-10-20'}
+    assert [v['id'] for v in videos.select(loaded, groups=['S2'])] == ['b2']
+    assert [v['id'] for v in videos.select(loaded, tags=['trailer', 'clip'])] == ['a1']
+    assert list(videos.load_groups(path)) == ['S1', 'S2']
+
+
+@pytest.mark.parametrize('entries, groups', [
+    ([{'group': 'S1'}], GROUPS),
+    ([{'id': 'a1', 'group': 'S9'}], GROUPS),
+    ([{'id': 'a1', 'group': 'S1'}, {'id': 'a1', 'group': 'S2'}], GROUPS),
+    ([{'id': 'a1', 'group': 'S1', 'key': 'K'}, {'id': 'b2', 'group': 'S2', 'key': 'K'}], GROUPS),
+    ([{'id': 'a1', 'group': 'S1', 'release_date': '15/07/2016'}], GROUPS),
+    ([], {'S1': {'release_date': None}}),
+])
+def test_invalid_manifests_are_rejected(tmp_path, entries, groups):
+    with pytest.raises(ManifestError):
+        videos.load(write_manifest(tmp_path, entries, groups))
+
+
+def test_unreadable_manifest(tmp_path):
+    (tmp_path / 'broken.json').write_text('{"groups": ', encoding='utf-8')
+    with pytest.raises(ManifestError):
+        videos.load(str(tmp_path / 'broken.json'))
+    with pytest.raises(ManifestError):
+        videos.load(str(tmp_path / 'missing.json'))
@@ -0,0 +1,86 @@
+import os
+import shutil
+
+import pandas as pd
+import pytest
+
+import storage
+import videos
+import rollups
+import job_queue
+import aggregates
+import search_index
+import data_acquisition
+import synthetic_corpus
+import watch
+
+RELEASE_DATES = {'S1': '2016-07-15', 'S3': '2099-07-04'}
+VIDEOS = [{'id': f"vid{s}", 'group': s, 'key': f"{s}_Hype", 'release_date': date, 'tags': [], 'show': None}
+          for s, date in RELEASE_DATES.items()]
+
+
+@pytest.fixture
+def scored(processor, monkeypatch):
+    """Primi due terzi di ogni video già analizzati; restituisce le righe che arriveranno dopo."""
+    monkeypatch.setattr(videos, 'load', lambda path=None: [dict(v) for v in VIDEOS])
+    df = synthetic_corpus.generate(600, seed=2, release_dates={'S1': '2016-07-15', 'S3': '2019-07-04'})
+    df = df[df['lang'] == 'en'].drop(columns='lang')
+    later = {}
+    for video in VIDEOS:
+        frame = df[df['season'] == video['group']].reset_index(drop=True)
+        frame = frame.assign(comment_id=[f"{video['key']}-{i}" for i in range(len(frame))])
+        split = 2 * len(frame) // 3
+        storage.replace('processed', video['key'], video['group'], frame.iloc[:split])
+        later[video['key']] = frame.iloc[split:].reset_index(drop=True)
+    processor.run_full_analysis(batch_size=16, dedup=True)
+    return later
+
+
+def snapshot():
+    artifact = aggregates.load()
+    return (artifact['seasons'], artifact['duplicates'], rollups.read('daily'),
+            search_index.stats())
+
+
+def test_watched_videos_are_scored_and_not_yet_released(scored):
+    queue = job_queue.open_queue(VIDEOS)
+    try:
+        assert [v['key'] for v in watch.watched_videos(queue)] == ['S3_Hype']
+        assert [v['key'] for v in watch.watched_videos(queue, include_released=True)] == ['S1_Hype', 'S3_Hype']
+        assert watch.watched_videos(queue, groups=['S1']) == []
+    finally:
+        queue.close()
+
+
+def test_incremental_update_matches_full_refresh(processor, scored, work_dir, monkeypatch):
+    def poll_new_comments(video_id, key, release_date, season=None):
+        if key == 'S1_Hype':
+            raise ConnectionError("reset")  # Un video con errori non ferma gli altri
+        storage.write_part('processed', key, season, scored[key])
+        return scored[key]
+    monkeypatch.setattr(data_acquisition, 'poll_new_comments', poll_new_comments)
+
+    queue = job_queue.open_queue(VIDEOS)
+    try:
+        assert watch.poll_once(queue, VIDEOS, batch_size=16, workers=1, dedup=True) == {'S3_Hype': len(scored['S3_Hype'])}
+        rows = {job['key']: job['rows'] for job in queue.jobs()}
+    finally:
+        queue.close()
+    assert rows['S3_Hype'] == storage.count_rows('processed', 'S3_Hype') == storage.count_rows('results', 'S3_Hype')
+    # I cluster delle righe nuove proseguono la numerazione: nessuna collisione con quelle già analizzate
+    first, added = [part['cluster_id'] for part in storage.iter_parts('results', key='S3_Hype')]
+    assert first.max() < len(first) <= added.min() and added.max() < rows['S3_Hype']
+    incremental = snapshot()
+
+    # Ricalcolo da zero dai risultati salvati
+    os.remove(aggregates.AGGREGATES_FILE)
+    os.remove(search_index.INDEX_FILE)
+    shutil.rmtree(storage.DATASETS['rollups'])
+    processor.aggregate_results()
+    full = snapshot()
+
+    assert incremental[0] == full[0]
+    for season, stats in full[1].items():
+        assert incremental[1][season] == pytest.approx(stats)
+    pd.testing.assert_frame_equal(incremental[2], full[2])
+    assert incremental[3] == full[3] == {'S1': storage.count_rows('results', 'S1_Hype'), 'S3': rows['S3_Hype']}
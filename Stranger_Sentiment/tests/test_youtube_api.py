@@ -0,0 +1,121 @@
+import json
+
+import pytest
+
+import youtube_api
+from youtube_api import ApiHttpError, QuotaExceededError, QuotaRateLimiter, execute_with_retry
+
+
+def http_error(status, reason=None):
+    content = json.dumps({'error': {'errors': [{'reason': reason}]}}).encode() if reason else b'{}'
+    return ApiHttpError(status, content)
+
+
+class FlakyRequest:
+    """make_request per execute_with_retry: solleva gli errori indicati (uno per tentativo), poi risponde."""
+
+    def __init__(self, *errors):
+        self.errors = list(errors)
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return self
+
+    def execute(self):
+        if self.errors:
+            raise self.errors.pop(0)
+        return {'items': []}
+
+
+@pytest.fixture
+def limiter():
+    return QuotaRateLimiter(requests_per_second=1e6, burst=1000)
+
+
+@pytest.fixture
+def delays(monkeypatch):
+    """Attese del backoff registrate invece che eseguite."""
+    recorded = []
+    monkeypatch.setattr(youtube_api.time, 'sleep', recorded.append)
+    return recorded
+
+
+@pytest.mark.parametrize('error', [http_error(500), http_error(503), http_error(429),
+                                   http_error(403, 'rateLimitExceeded'), ConnectionError("reset")])
+def test_transient_errors_are_retried(error, limiter, delays):
+    request = FlakyRequest(error, error)
+    assert execute_with_retry(request, limiter) == {'items': []}
+    assert request.calls == 3
+    assert limiter.requests == 3 and limiter.units_used == 3
+    assert len(delays) == 2
+
+
+def test_gives_up_after_max_retries(limiter, delays):
+    request = FlakyRequest(*[http_error(503)] * 4)
+    with pytest.raises(ApiHttpError):
+        execute_with_retry(request, limiter, max_retries=3)
+    assert request.calls == 4
+    assert len(delays) == 3
+
+
+def test_quota_exceeded_is_not_retried(limiter, delays):
+    request = FlakyRequest(http_error(403, 'quotaExceeded'))
+    with pytest.raises(QuotaExceededError):
+        execute_with_retry(request, limiter)
+    assert request.calls == 1
+    assert delays == []
+
+
+@pytest.mark.parametrize('error', [http_error(403, 'commentsDisabled'), http_error(404), http_error(400)])
+def test_permanent_errors_are_not_retried(error, limiter, delays):
+    request = FlakyRequest(error)
+    with pytest.raises(ApiHttpError):
+        execute_with_retry(request, limiter)
+    assert request.calls == 1
+    assert delays == []
+
+
+def test_backoff_grows_exponentially_up_to_the_cap(limiter, delays, monkeypatch):
+    # Con il jitter al massimo le attese sono esattamente i limiti superiori
+    monkeypatch.setattr(youtube_api.random, 'uniform', lambda low, high: high)
+    execute_with_retry(FlakyRequest(*[http_error(503)] * 6), limiter, max_retries=6, base_delay=1.0, max_delay=10.0)
+    assert delays == [1.0, 2.0, 4.0, 8.0, 10.0, 10.0]
+
+
+def test_jitter_stays_within_bounds(limiter, delays):
+    youtube_api.random.seed(0)
+    for _ in range(50):
+        delays.clear()
+        execute_with_retry(FlakyRequest(*[http_error(502)] * 6), limiter, max_retries=6, base_delay=0.5, max_delay=5.0)
+        bounds = [min(5.0, 0.5 * 2 ** attempt) for attempt in range(6)]
+        assert all(0 <= d <= bound for d, bound in zip(delays, bounds))
+    # Full jitter: le attese non sono sempre il limite superiore
+    assert any(d < bound / 2 for d, bound in zip(delays, bounds))
+
+
+def test_local_daily_quota_stops_requests():
+    limiter = QuotaRateLimiter(requests_per_second=1e6, burst=100, daily_quota=3)
+    for _ in range(3):
+        limiter.acquire()
+    with pytest.raises(QuotaExceededError):
+        limiter.acquire()
+    assert (limiter.requests, limiter.units_used) == (3, 3)
+
+
+def test_rate_limiter_waits_when_the_bucket_is_empty(monkeypatch):
+    # Orologio finto: sleep fa avanzare monotonic
+    clock, waits = [0.0], []
+
+    def sleep(seconds):
+        waits.append(seconds)
+        clock[0] += seconds
+    monkeypatch.setattr(youtube_api.time, 'monotonic', lambda: clock[0])
+    monkeypatch.setattr(youtube_api.time, 'sleep', sleep)
+
+    limiter = QuotaRateLimiter(requests_per_second=10.0, burst=2)
+    for _ in range(4):
+        limiter.acquire()
+    # I primi due token sono subito disponibili, poi uno ogni 1/10 di secondo
+    assert waits == pytest.approx([0.1, 0.1])
+    assert limiter.requests == 4